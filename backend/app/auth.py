@@ -38,6 +38,20 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return jwt.encode(to_encode, AUTH_SECRET_KEY, algorithm=ALGORITHM)
 
 
+def create_object_token(object_key: str, expires_delta: timedelta, action: str = "get") -> str:
+    """Sign a short-lived token that grants one action (get or put) on a single stored object"""
+    expire = datetime.utcnow() + expires_delta
+    return jwt.encode({"obj": object_key, "act": action, "exp": expire}, AUTH_SECRET_KEY, algorithm=ALGORITHM)
+
+
+def verify_object_token(token: str, object_key: str, action: str = "get") -> bool:
+    try:
+        payload = jwt.decode(token, AUTH_SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return False
+    return payload.get("obj") == object_key and payload.get("act", "get") == action
+
+
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
     token = credentials.credentials
     try:
@@ -50,3 +64,14 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
         return {"username": username, "role": role}
     except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
+
+
+def token_username(authorization: Optional[str]) -> Optional[str]:
+    """Username of a valid "Bearer <token>" header value, else None; does not authorize anything"""
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return None
+    try:
+        payload = jwt.decode(authorization[7:], AUTH_SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    return payload.get("sub")
@@ -1,42 +1,237 @@
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
-from app.models.file_models import Base
-from app.config.settings import DATABASE_URL
+import logging
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
 
-engine = create_engine(
+from fastapi import Request
+from sqlalchemy import Delete, Insert, Select, TextClause, Update, create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from app.config.pooling import engine_options, register_engine
+from app.services import event_service
+from app.config.settings import (
     DATABASE_URL,
-    pool_pre_ping=True
+    ASYNC_DATABASE_URL,
+    DATABASE_REPLICA_URLS,
+    DB_AUTO_MIGRATE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_SIZE,
+    DB_REPLICA_MAX_OVERFLOW,
+    DB_REPLICA_POOL_SIZE,
+    READ_YOUR_WRITES_SECONDS,
 )
 
+logger = logging.getLogger(__name__)
+
+ALEMBIC_INI = Path(__file__).parent.parent.parent / "alembic.ini"
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+
+def _async_url(url: str):
+    """Swap the sync driver of DATABASE_URL for its asyncio counterpart"""
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.drivername)
+    if driver is None:
+        raise RuntimeError(f"No async driver known for {parsed.drivername}; set ASYNC_DATABASE_URL")
+    return parsed.set(drivername=driver)
+
+
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL, "primary", DB_POOL_SIZE, DB_MAX_OVERFLOW))
+replica_engines = [
+    create_engine(url, **engine_options(url, f"replica{i}", DB_REPLICA_POOL_SIZE, DB_REPLICA_MAX_OVERFLOW))
+    for i, url in enumerate(DATABASE_REPLICA_URLS)
+]
+
+_async_primary_url = ASYNC_DATABASE_URL or _async_url(DATABASE_URL)
+async_engine = create_async_engine(
+    _async_primary_url,
+    **engine_options(_async_primary_url, "primary_async", DB_POOL_SIZE, DB_MAX_OVERFLOW, is_async=True)
+)
+async_replica_engines = [
+    create_async_engine(
+        _async_url(url),
+        **engine_options(_async_url(url), f"replica{i}_async", DB_REPLICA_POOL_SIZE, DB_REPLICA_MAX_OVERFLOW, is_async=True)
+    )
+    for i, url in enumerate(DATABASE_REPLICA_URLS)
+]
+
+register_engine("primary", engine)
+register_engine("primary_async", async_engine)
+for i, replica in enumerate(replica_engines):
+    register_engine(f"replica{i}", replica)
+for i, replica in enumerate(async_replica_engines):
+    register_engine(f"replica{i}_async", replica)
+
+# Session.info keys
+READ_REPLICA = "read_replica"  # reads may go to a replica
+REQUEST = "request"            # request whose routing is decided on the session's first query
+WROTE = "wrote"                # the session has sent writes to the primary
+USER = "user"                  # username behind the request, for read-your-writes
+
+# Event channel announcing to every worker (over pg_notify on PostgreSQL) that a user committed
+# a write, so their next GET stays on the primary whichever worker serves it
+WRITERS = "writers"
+
+_recent_writes: Dict[str, float] = {}
+_recent_writes_lock = threading.Lock()
+
+
+def _note_write(username: str) -> None:
+    now = time.monotonic()
+    with _recent_writes_lock:
+        _recent_writes[username] = now
+        if len(_recent_writes) > 10000:
+            for user, at in list(_recent_writes.items()):
+                if now - at > READ_YOUR_WRITES_SECONDS:
+                    del _recent_writes[user]
+
+
+def wrote_recently(username: Optional[str]) -> bool:
+    """Whether username committed a write, through any worker, within the read-your-writes window"""
+    if not username:
+        return False
+    at = _recent_writes.get(username)
+    return at is not None and time.monotonic() - at < READ_YOUR_WRITES_SECONDS
+
+
+def _is_write(clause) -> bool:
+    if isinstance(clause, (Insert, Update, Delete, TextClause)):
+        return True
+    return isinstance(clause, Select) and clause._for_update_arg is not None
+
+
+class RoutingSession(Session):
+    """
+    Session that sends reads to a replica when READ_REPLICA is set in its info, and everything
+    else to the primary. The first write, flush or SELECT ... FOR UPDATE moves the rest of the
+    session to the primary so it reads what it wrote. Each session sticks to one replica.
+
+    Sessions opened for a request decide on their first query, so requests that never query
+    pay nothing for routing.
+    """
+    primary: Engine = engine
+    replicas: List[Engine] = replica_engines
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        request = self.info.pop(REQUEST, None)
+        if request is not None:
+            _route_reads(self, request)
+        if self._flushing or _is_write(clause):
+            self.info[READ_REPLICA] = False
+            self.info[WROTE] = True
+        if self.info.get(READ_REPLICA) and self.replicas:
+            if "replica" not in self.info:
+                self.info["replica"] = random.choice(self.replicas)
+            return self.info["replica"]
+        return self.primary
+
+
+class AsyncRoutingSession(RoutingSession):
+    """The RoutingSession behind AsyncSession; routes between the async engines' sync facades"""
+    primary = async_engine.sync_engine
+    replicas = [replica.sync_engine for replica in async_replica_engines]
+
+
+# Inserted ahead of event_service's before_commit hook, which sends the event queued here
+@event.listens_for(Session, "before_commit", insert=True)
+def _announce_writer(session: Session) -> None:
+    if not session.info.get(USER) or not replica_engines:
+        return
+    # The flush commit would run next anyway; it marks the session WROTE if it has pending writes
+    session.flush()
+    if session.info.get(WROTE):
+        event_service.publish(session, WRITERS, "write", {"username": session.info[USER]})
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _remember_writer(session: Session) -> None:
+    # Noted here at once too: on PostgreSQL the event reaches this worker a moment after commit
+    if session.info.get(WROTE) and session.info.get(USER):
+        _note_write(session.info[USER])
+
+
+event_service.broker.add_handler(WRITERS, lambda payload: _note_write(payload["username"]))
+
+
+# Sessions route to the primary unless a read-only request opts them in; see _route_reads
 SessionLocal = sessionmaker(
+    class_=RoutingSession,
     autocommit=False,
     autoflush=False,
-    bind=engine
 )
 
+# expire_on_commit=False: attributes of committed rows must stay readable without lazy IO
+AsyncSessionLocal = async_sessionmaker(
+    sync_session_class=AsyncRoutingSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+
+def _route_reads(session: Session, request: Request) -> None:
+    """
+    Let GET and HEAD requests read from a replica, unless the caller wrote within
+    READ_YOUR_WRITES_SECONDS, in which case the replica may not have their write yet
+    """
+    from app.auth import token_username
+
+    username = token_username(request.headers.get("authorization"))
+    session.info[USER] = username
+    if request.method in ("GET", "HEAD") and not wrote_recently(username):
+        session.info[READ_REPLICA] = True
 
-def get_db():
-    db = SessionLocal()
+
+def get_db(request: Request):
+    db = SessionLocal(info={REQUEST: request})
     try:
         yield db
     finally:
         db.close()
 
 
-def init_db():
-    from app.models import file_models, notification_models, quote_models, quote_notification_models, user_models
-    from app.routes.pricing import MaterialPrice
-    Base.metadata.create_all(bind=engine)
+async def get_async_db(request: Request):
+    async with AsyncSessionLocal(info={REQUEST: request}) as db:
+        yield db
 
-    with engine.begin() as conn:
-        try:
-            conn.execute(text("ALTER TABLE files ADD COLUMN created_by VARCHAR"))
-        except Exception:
-            pass
-        try:
-            conn.execute(text("UPDATE files SET created_by = 'buyer' WHERE created_by IS NULL"))
-        except Exception:
-            pass
 
+async def get_async_primary_db():
+    """AsyncSession that reads from the primary, for reads that must not lag behind commits"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def _alembic_config():
+    from alembic.config import Config
+    config = Config(str(ALEMBIC_INI))
+    # Keep the application's logging setup when migrations run in-process
+    config.attributes["configure_logger"] = False
+    return config
 
 
+def init_db():
+    """
+    Check the schema is at the latest migration; no DDL runs at startup unless DB_AUTO_MIGRATE
+    is set, in which case pending migrations are applied first.
+    """
+    from alembic import command
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    config = _alembic_config()
+    if DB_AUTO_MIGRATE:
+        command.upgrade(config, "head")
+        return
+    head = ScriptDirectory.from_config(config).get_current_head()
+    with engine.connect() as conn:
+        current = MigrationContext.configure(conn).get_current_revision()
+    if current != head:
+        logger.warning(f"Database schema is at revision {current}, code expects {head}; run `alembic upgrade head`")
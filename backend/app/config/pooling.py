@@ -0,0 +1,123 @@
+"""
+Connection pool options and instrumentation for the database engines.
+
+Every engine gets a TimedQueuePool, which records how long callers wait to check out a
+connection, and registers with the pool gauges; together they show whether DB_POOL_SIZE and
+DB_MAX_OVERFLOW fit the number of concurrent requests a worker takes.
+"""
+import time
+from typing import Dict, List, Tuple
+
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app import metrics
+from app.config.settings import (
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE_SECONDS,
+    DB_POOL_TIMEOUT_SECONDS,
+    DB_STATEMENT_TIMEOUT_MS,
+)
+
+CHECKOUT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_checkout_seconds = metrics.histogram(
+    "db_pool_checkout_seconds", "Time waited to check a connection out of the pool", CHECKOUT_BUCKETS
+)
+_checkout_timeouts = metrics.counter(
+    "db_pool_checkout_timeouts_total", "Checkouts that gave up after DB_POOL_TIMEOUT_SECONDS"
+)
+
+_engines: List[Tuple[str, Engine]] = []
+
+
+class _Timed:
+    """
+    Mixin timing _do_get, the point where a checkout waits for a free connection. engine_name
+    is a class attribute so it survives the pool being recreated by Engine.dispose().
+    """
+    engine_name = "unknown"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            _checkout_timeouts.inc(engine=self.engine_name)
+            raise
+        finally:
+            _checkout_seconds.observe(time.perf_counter() - started, engine=self.engine_name)
+
+
+class TimedQueuePool(_Timed, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_Timed, AsyncAdaptedQueuePool):
+    pass
+
+
+def _connect_args(url) -> dict:
+    if not DB_STATEMENT_TIMEOUT_MS:
+        return {}
+    if url.get_backend_name() != "postgresql":
+        return {}
+    if url.get_driver_name() == "asyncpg":
+        return {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}}
+    return {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+
+
+def engine_options(url, name: str, pool_size: int, max_overflow: int, is_async: bool = False) -> dict:
+    """create_engine / create_async_engine keyword arguments for a pooled engine labelled name"""
+    url = make_url(url)
+    options = {"pool_pre_ping": DB_POOL_PRE_PING}
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return options
+    base = TimedAsyncQueuePool if is_async else TimedQueuePool
+    options["poolclass"] = type(f"{base.__name__}[{name}]", (base,), {"engine_name": name})
+    options.update(
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=DB_POOL_RECYCLE_SECONDS,
+    )
+    connect_args = _connect_args(url)
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+
+def register_engine(name: str, engine) -> None:
+    """Report engine's pool in the pool gauges; async engines are registered by their sync_engine"""
+    _engines.append((name, getattr(engine, "sync_engine", engine)))
+
+
+def _queue_pools():
+    for name, engine in _engines:
+        if isinstance(engine.pool, QueuePool):
+            yield name, engine.pool
+
+
+def _pool_states() -> Dict[tuple, float]:
+    values = {}
+    for name, pool in _queue_pools():
+        checked_out = pool.checkedout()
+        values[(("engine", name), ("state", "checked_out"))] = checked_out
+        values[(("engine", name), ("state", "idle"))] = pool.checkedin()
+        values[(("engine", name), ("state", "overflow"))] = max(pool.overflow(), 0)
+    return values
+
+
+def _pool_saturation() -> Dict[tuple, float]:
+    values = {}
+    for name, pool in _queue_pools():
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        values[(("engine", name),)] = pool.checkedout() / capacity if capacity else 0
+    return values
+
+
+metrics.gauge("db_pool_connections", "Pooled connections by state", callback=_pool_states)
+metrics.gauge(
+    "db_pool_saturation", "Checked out connections over pool_size + max_overflow", callback=_pool_saturation
+)
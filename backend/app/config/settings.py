@@ -11,9 +11,81 @@ MINIO_SECRET_KEY = os.getenv("MINIO_SECRET_KEY")
 MINIO_BUCKET = os.getenv("MINIO_BUCKET")
 MINIO_SECURE = os.getenv("MINIO_SECURE") == "true"
 
+# Object storage backend: "minio" or "filesystem"
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "minio")
+STORAGE_LOCAL_DIR = os.getenv("STORAGE_LOCAL_DIR")  # defaults to backend/uploads
+STORAGE_CACHE_ENABLED = os.getenv("STORAGE_CACHE_ENABLED", "true") == "true"
+STORAGE_CACHE_DIR = os.getenv("STORAGE_CACHE_DIR", str(Path(__file__).parent.parent.parent / ".cache" / "storage"))
+STORAGE_CACHE_MAX_MB = int(os.getenv("STORAGE_CACHE_MAX_MB", "2048"))
+STORAGE_CACHE_MAX_OBJECT_MB = int(os.getenv("STORAGE_CACHE_MAX_OBJECT_MB", "256"))
+
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Async driver URL for AsyncSession routes; derived from DATABASE_URL (asyncpg / aiosqlite) when unset
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+# Read replicas for GET requests, comma separated; reads go to DATABASE_URL when unset
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+# After a user's own write their reads stay on the primary this long, covering replication lag
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+# Connection pool per engine (primary and each replica; sync and async)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_REPLICA_POOL_SIZE = int(os.getenv("DB_REPLICA_POOL_SIZE", str(DB_POOL_SIZE)))
+DB_REPLICA_MAX_OVERFLOW = int(os.getenv("DB_REPLICA_MAX_OVERFLOW", str(DB_MAX_OVERFLOW)))
+DB_POOL_TIMEOUT_SECONDS = int(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+# Test each connection with a round trip on checkout; recycling usually retires stale ones first
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false") == "true"
+# PostgreSQL statement_timeout for every connection, in milliseconds (0 disables)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+# Fetch quote list pages and their status counts in one windowed query instead of page + GROUP BY
+QUOTE_COUNTS_WINDOW = os.getenv("QUOTE_COUNTS_WINDOW", "false") == "true"
+# Apply pending migrations at startup; otherwise run `alembic upgrade head` before deploying
+DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "false") == "true"
+# How often maintained counters are recomputed from the source tables to correct drift (0 disables)
+COUNTERS_RECONCILE_INTERVAL_MINUTES = int(os.getenv("COUNTERS_RECONCILE_INTERVAL_MINUTES", "30"))
+
+# Per-request SQL statistics: Server-Timing header, slow request logs and N+1 detection
+SQL_INSTRUMENTATION = os.getenv("SQL_INSTRUMENTATION", "true") == "true"
+# Flag a request running the same statement this many times (0 disables)
+SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+# Log requests spending at least this long in the database (0 disables)
+SQL_SLOW_REQUEST_MS = float(os.getenv("SQL_SLOW_REQUEST_MS", "500"))
+SQL_LOG_ALL_REQUESTS = os.getenv("SQL_LOG_ALL_REQUESTS", "false") == "true"
+SQL_SLOWEST_STATEMENTS = int(os.getenv("SQL_SLOWEST_STATEMENTS", "3"))
+
+# Read notifications older than this move to the archive tables (0 keeps them all)
+NOTIFICATION_RETENTION_DAYS = int(os.getenv("NOTIFICATION_RETENTION_DAYS", "90"))
+# How often the retention job runs; on PostgreSQL it also creates the upcoming monthly partitions
+NOTIFICATION_RETENTION_INTERVAL_MINUTES = int(os.getenv("NOTIFICATION_RETENTION_INTERVAL_MINUTES", "60"))
+# Rows moved per transaction, and transactions per run, so a backlog drains without long locks
+NOTIFICATION_ARCHIVE_BATCH_SIZE = int(os.getenv("NOTIFICATION_ARCHIVE_BATCH_SIZE", "1000"))
+NOTIFICATION_ARCHIVE_MAX_BATCHES = int(os.getenv("NOTIFICATION_ARCHIVE_MAX_BATCHES", "100"))
+# PostgreSQL: monthly partitions created ahead of time by the retention job
+NOTIFICATION_PARTITION_MONTHS_AHEAD = int(os.getenv("NOTIFICATION_PARTITION_MONTHS_AHEAD", "3"))
+# Notification change log (GET /notifications/changes): rows kept, and the most returned at once
+# before clients are told to reload instead
+NOTIFICATION_CHANGES_RETENTION_HOURS = int(os.getenv("NOTIFICATION_CHANGES_RETENTION_HOURS", "168"))
+NOTIFICATION_CHANGES_MAX_ROWS = int(os.getenv("NOTIFICATION_CHANGES_MAX_ROWS", "1000"))
+# Longest a long-polling GET /notifications/changes request may wait
+NOTIFICATION_CHANGES_MAX_WAIT_SECONDS = float(os.getenv("NOTIFICATION_CHANGES_MAX_WAIT_SECONDS", "60"))
+# A buyer's uploads to one RFQ within this many seconds of the first share one digest notification
+# (0 disables); uploads outside an RFQ always get a notification each
+NOTIFICATION_DIGEST_WINDOW_SECONDS = int(os.getenv("NOTIFICATION_DIGEST_WINDOW_SECONDS", "300"))
+
+# Event stream (GET /events/stream): idle keep-alive interval, and events buffered per slow client
+EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+
+# Outbox dispatcher: polling interval when no local commit wakes it, messages per transaction,
+# and attempts before a failing message is parked with failed_at set
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "5"))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
 
 MAX_FILE_SIZE_MB = int(os.getenv("MAX_FILE_SIZE_MB", "500"))
+# Server-side streaming uploads: multipart part size and parts uploaded concurrently
+UPLOAD_PART_SIZE_MB = int(os.getenv("UPLOAD_PART_SIZE_MB", "8"))
+UPLOAD_MAX_INFLIGHT_PARTS = int(os.getenv("UPLOAD_MAX_INFLIGHT_PARTS", "2"))
 ALLOWED_EXTENSIONS = [".stp", ".step", ".igs", ".iges", ".STP", ".STEP", ".IGS", ".IGES"]
 ALLOWED_CONTENT_TYPES = [
     "application/stp",
@@ -30,6 +102,7 @@ ALLOWED_CONTENT_TYPES = [
 CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*").split(",")
 API_TITLE = "Manufacturing STP File Storage API"
 API_VERSION = "2.0.0"
+PUBLIC_API_URL = os.getenv("PUBLIC_API_URL", "http://localhost:8000")
 
 AUTH_USERNAME = os.getenv("AUTH_USERNAME")
 AUTH_PASSWORD = os.getenv("AUTH_PASSWORD")
@@ -48,8 +121,19 @@ ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "480"
 
 # Live Material Pricing Configuration (Indian Market Rates in INR)
 MATERIAL_PRICE_CACHE_MINUTES = int(os.getenv("MATERIAL_PRICE_CACHE_MINUTES", "1440"))  # 24 hours
+# How often each worker compares its material price cache with the table's version stamp, catching
+# changes whose notification it missed (0 disables)
+MATERIAL_PRICE_CACHE_CHECK_SECONDS = int(os.getenv("MATERIAL_PRICE_CACHE_CHECK_SECONDS", "30"))
 DEFAULT_LABOR_COST_INR = float(os.getenv("DEFAULT_LABOR_COST_INR", "350"))  # ₹/hour
 DEFAULT_MACHINE_COST_INR = float(os.getenv("DEFAULT_MACHINE_COST_INR", "500"))  # ₹/hour
 
 # FreeCAD for mesh generation (set to FreeCADCmd or FreeCADCmd.exe)
 FREECAD_CMD = os.getenv("FREECAD_CMD", "FreeCADCmd")
+
+# Storage-side zstd compression tier for cold STEP objects
+STEP_COMPRESSION_ENABLED = os.getenv("STEP_COMPRESSION_ENABLED", "false") == "true"
+STEP_COMPRESSION_LEVEL = int(os.getenv("STEP_COMPRESSION_LEVEL", "10"))
+STEP_COMPRESSION_MIN_AGE_DAYS = int(os.getenv("STEP_COMPRESSION_MIN_AGE_DAYS", "7"))
+STEP_COMPRESSION_INTERVAL_MINUTES = int(os.getenv("STEP_COMPRESSION_INTERVAL_MINUTES", "60"))
+STEP_COMPRESSION_BATCH_SIZE = int(os.getenv("STEP_COMPRESSION_BATCH_SIZE", "100"))
+STEP_COMPRESSION_PREFIX = "stp/"
@@ -0,0 +1,54 @@
+"""
+Conditional GET for list endpoints.
+
+A list route first reads a cheap version of the data it shows: the change-log sequence for
+notifications, or the newest updated_at and the row count of the scope, with counts coming from
+the maintained counters where they exist. The ETag is a hash of that version, the path, the
+query parameters and the caller, so it is strong: equal tags mean an identical body. When
+If-None-Match carries the tag the route answers 304 without running the page query or encoding
+any JSON.
+
+The version is read before the page, so a write committed in between can only make the next
+request send the full body again, never serve a stale 304. Versions are not cached across
+requests: reading one costs a lookup or two on an index, and a cached version would answer 304
+right after a pushed event told the client to reload.
+"""
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response
+
+from app import metrics
+
+# Revalidate on every use; private because list contents depend on the caller
+CACHE_CONTROL = "private, no-cache"
+
+_not_modified = metrics.counter("etag_not_modified_total", "List requests answered 304 Not Modified")
+
+
+def compute_etag(request: Request, current_user: dict, *version) -> str:
+    parts = [request.url.path, sorted(request.query_params.multi_items()), current_user["username"], version]
+    digest = hashlib.sha256(repr(parts).encode()).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison: a W/ prefix added by a proxy still matches
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+
+def not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """
+    A 304 response when the client already has etag; otherwise None, after putting the ETag
+    on response for the full body the route goes on to build
+    """
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _matches(if_none_match, etag):
+        _not_modified.inc(path=request.url.path)
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -6,8 +6,20 @@ from app.routes.material_pricing import router as material_pricing_router
 from app.routes.pricing import router as pricing_router
 from app.routes.notifications import router as notification_router
 from app.routes.quotes import router as quote_router
-from app.config.database import init_db
-from app.config.settings import CORS_ORIGINS, API_TITLE, API_VERSION
+from app.routes.metrics import router as metrics_router
+from app.routes.events import router as events_router
+from app.config.database import async_engine, init_db
+from app.config.settings import (
+    CORS_ORIGINS,
+    API_TITLE,
+    API_VERSION,
+    COUNTERS_RECONCILE_INTERVAL_MINUTES,
+    NOTIFICATION_RETENTION_INTERVAL_MINUTES,
+    STEP_COMPRESSION_ENABLED,
+    STEP_COMPRESSION_INTERVAL_MINUTES,
+)
+from app.services import background_jobs, event_service, material_price_cache, material_pricing_live, outbox_service
+from app.sql_instrumentation import QueryStatsMiddleware
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -21,11 +33,58 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Next-Cursor"],
 )
+app.add_middleware(QueryStatsMiddleware)
+
+def _check_search_index():
+    """Log at startup, rather than on the first search, when SQLite cannot use its FTS5 index"""
+    from app.config.database import SessionLocal
+    from app.services.search_service import sqlite_fts_available
+
+    db = SessionLocal()
+    try:
+        if db.get_bind().dialect.name == "sqlite":
+            sqlite_fts_available(db)
+    finally:
+        db.close()
+
 
 @app.on_event("startup")
 async def startup_event():
     init_db()
+    _check_search_index()
+    app.state.event_listener = event_service.start_listener()
+    app.state.outbox_dispatcher = outbox_service.start_dispatcher()
+    app.state.material_price_cache = material_price_cache.start()
+    material_pricing_live.get_live_material_costs()
+    from app.services.counter_service import counters_missing, reconcile_counters
+    # Only a fresh database reconciles right away, so counters exist for rows written before they
+    # were maintained; the advisory lock keeps the other workers from scanning at the same time
+    background_jobs.schedule_periodic(
+        "counter-reconciliation", reconcile_counters, COUNTERS_RECONCILE_INTERVAL_MINUTES * 60,
+        initial_delay_seconds=0 if counters_missing() else None,
+    )
+    from app.services.retention_service import archive_read_notifications
+    background_jobs.schedule_periodic(
+        "notification-retention", archive_read_notifications, NOTIFICATION_RETENTION_INTERVAL_MINUTES * 60,
+        initial_delay_seconds=0,
+    )
+    if STEP_COMPRESSION_ENABLED:
+        from app.services.compression_service import compress_cold_objects
+        background_jobs.schedule_periodic(
+            "step-compression", compress_cold_objects, STEP_COMPRESSION_INTERVAL_MINUTES * 60
+        )
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await background_jobs.stop_all()
+    if app.state.event_listener is not None:
+        app.state.event_listener.cancel()
+    app.state.outbox_dispatcher.cancel()
+    app.state.material_price_cache.cancel()
+    await async_engine.dispose()
 
 app.include_router(auth_router)
 app.include_router(file_router)
@@ -33,6 +92,8 @@ app.include_router(material_pricing_router)
 app.include_router(pricing_router)
 app.include_router(notification_router)
 app.include_router(quote_router)
+app.include_router(metrics_router)
+app.include_router(events_router)
 
 if __name__ == "__main__":
     import uvicorn
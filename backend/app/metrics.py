@@ -0,0 +1,129 @@
+"""
+Minimal in-process metrics registry rendered in the Prometheus text format at GET /metrics
+"""
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+_lock = threading.Lock()
+_metrics: Dict[str, "_Metric"] = {}
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_text(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{k}="{v}"' for k, v in labels)
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+
+    def samples(self) -> List[Tuple[str, Tuple[Tuple[str, str], ...], float]]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, description: str):
+        super().__init__(name, description)
+        self._values: Dict[Tuple[Tuple[str, str], ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def samples(self):
+        if not self._values:
+            return [(self.name, (), 0)]
+        return [(self.name, key, value) for key, value in self._values.items()]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str, callback: Optional[Callable[[], Dict[tuple, float]]] = None):
+        super().__init__(name, description)
+        self._values: Dict[Tuple[Tuple[str, str], ...], float] = {}
+        self._callback = callback
+
+    def set(self, value: float, **labels) -> None:
+        with _lock:
+            self._values[tuple(sorted(labels.items()))] = value
+
+    def samples(self):
+        values = dict(self._values)
+        if self._callback:
+            for labels, value in self._callback().items():
+                values[tuple(sorted(dict(labels).items()))] = value
+        return [(self.name, key, value) for key, value in values.items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, description)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[Tuple[str, str], ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with _lock:
+            series = self._series.setdefault(key, [[0] * len(self.buckets), 0, 0.0])
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+            series[1] += 1
+            series[2] += value
+
+    def samples(self):
+        result = []
+        for key, (counts, count, total) in self._series.items():
+            for bound, bucket_count in zip(self.buckets, counts):
+                result.append((f"{self.name}_bucket", key + (("le", str(bound)),), bucket_count))
+            result.append((f"{self.name}_bucket", key + (("le", "+Inf"),), count))
+            result.append((f"{self.name}_count", key, count))
+            result.append((f"{self.name}_sum", key, total))
+        return result
+
+
+def _register(metric: _Metric) -> _Metric:
+    with _lock:
+        existing = _metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        _metrics[metric.name] = metric
+        return metric
+
+
+def counter(name: str, description: str) -> Counter:
+    return _register(Counter(name, description))
+
+
+def gauge(name: str, description: str, callback: Optional[Callable[[], Dict[tuple, float]]] = None) -> Gauge:
+    return _register(Gauge(name, description, callback))
+
+
+def histogram(name: str, description: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+    return _register(Histogram(name, description, buckets))
+
+
+def render() -> str:
+    lines = []
+    for metric in list(_metrics.values()):
+        lines.append(f"# HELP {metric.name} {metric.description}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{_label_text(labels)} {value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, String, BigInteger, DateTime
+from datetime import datetime
+
+from app.models.file_models import Base
+
+
+class Counter(Base):
+    """Incrementally maintained count, e.g. ("quote_notifications", "<buyer>", "unread")"""
+    __tablename__ = "counters"
+
+    scope = Column(String(64), primary_key=True)
+    owner = Column(String(255), primary_key=True)  # Username, or "*" for counts across all users
+    metric = Column(String(64), primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
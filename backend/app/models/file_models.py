@@ -1,8 +1,8 @@
 from pydantic import BaseModel, Field, validator
-from sqlalchemy import Column, String, DateTime, Integer, BigInteger, Text
+from sqlalchemy import Column, String, DateTime, Integer, BigInteger, Text, Index
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Literal, Optional
 
 Base = declarative_base()
 
@@ -11,16 +11,26 @@ class File(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     object_key = Column(String, unique=True, nullable=False, index=True)
-    original_name = Column(String, nullable=False, index=True)
+    original_name = Column(String, nullable=False, unique=True, index=True)
     content_type = Column(String, nullable=False)
     description = Column(String, nullable=True)
     material = Column(String, nullable=True)
     part_number = Column(String, nullable=True)
     quantity_unit = Column(String, default='pieces', nullable=True)
     created_by = Column(String, nullable=True)
+    rfq_id = Column(String(32), nullable=True, index=True)  # Request for quotation the file was uploaded in
+    # Digest notification announcing the upload; no foreign key, notifications is partitioned on PostgreSQL
+    notification_id = Column(Integer, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
+    __table_args__ = (
+        Index("ix_files_created_at_id", "created_at", "id"),
+        Index("ix_files_created_by_created_at_id", "created_by", "created_at", "id"),
+        Index("ix_files_updated_at", "updated_at"),
+        Index("ix_files_notification_id_created_at_id", "notification_id", "created_at", "id"),
+    )
+
 class UploadRequest(BaseModel):
     filename: str = Field(..., description="Name of the CAD file")
     content_type: str = Field(default="application/octet-stream", description="MIME type of the file")
@@ -39,6 +49,31 @@ class UploadRequest(BaseModel):
             raise ValueError(f'File must be a CAD format: {{", ".join(allowed_extensions)}}')
         return v
 
+# Most files accepted by one batch upload request
+MAX_BATCH_UPLOAD_FILES = 200
+
+class BatchUploadRequest(BaseModel):
+    rfq_id: Optional[str] = Field(None, max_length=32, description="RFQ to add the files to; omit to start a new one")
+    files: List[UploadRequest] = Field(..., min_length=1, max_length=MAX_BATCH_UPLOAD_FILES)
+
+    @validator('files')
+    def validate_unique_names(cls, v):
+        names = [upload.filename for upload in v]
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        if duplicates:
+            raise ValueError(f"Duplicate file names in request: {', '.join(duplicates)}")
+        return v
+
+class BatchUploadItem(BaseModel):
+    file_id: int
+    filename: str
+    upload_url: str
+    download_url: str
+
+class BatchUploadResponse(BaseModel):
+    rfq_id: str
+    files: List[BatchUploadItem]
+
 class FileResponse(BaseModel):
     id: int
     object_key: str
@@ -49,6 +84,7 @@ class FileResponse(BaseModel):
     part_number: Optional[str]
     quantity_unit: Optional[str]
     created_by: Optional[str]
+    rfq_id: Optional[str] = None
     created_at: datetime
     updated_at: datetime
     
@@ -56,12 +92,29 @@ class FileResponse(BaseModel):
         from_attributes = True
 
 class FileListResponse(BaseModel):
-    total: int
+    total: Optional[int]
     files: list[FileResponse]
+    next_cursor: Optional[str] = None
+    total_is_estimate: bool = False
     
 class FileSearchRequest(BaseModel):
-    query: Optional[str] = Field(None, description="Search in filename")
+    query: Optional[str] = Field(None, description="Search in filename, part number, material and description")
+    material: Optional[str] = Field(None, description="Only files of this material")
+    created_by: Optional[str] = Field(None, description="Only files uploaded by this user")
+    rfq_id: Optional[str] = Field(None, description="Only files of this RFQ")
     start_date: Optional[datetime] = Field(None, description="Filter files created after this date")
     end_date: Optional[datetime] = Field(None, description="Filter files created before this date")
     limit: int = Field(100, ge=1, le=500, description="Maximum number of results")
-    offset: int = Field(0, ge=0, description="Number of results to skip")
+    offset: int = Field(0, ge=0, description="Number of results to skip; prefer cursor")
+    cursor: Optional[str] = Field(None, description="next_cursor of the previous page")
+    count: Literal["exact", "estimate", "none"] = Field("estimate", description="How to compute total")
+    sort: Literal["relevance", "newest"] = Field("relevance", description="Order of results; relevance needs a query")
+    fuzzy: bool = Field(False, description="Also match misspelt words, where the database supports it")
+    facets: bool = Field(False, description="Return counts of matching files by material and uploader")
+
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+class FileSearchResponse(FileListResponse):
+    facets: Optional[Dict[str, List[FacetCount]]] = None
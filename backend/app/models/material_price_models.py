@@ -0,0 +1,22 @@
+from sqlalchemy import Column, String, Float, DateTime, Integer
+from datetime import datetime
+from app.models.file_models import Base
+
+
+class MaterialPrice(Base):
+    __tablename__ = "material_prices"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    material_name = Column(String, unique=True, nullable=False, index=True)
+    base_price_per_unit = Column(Float, nullable=False)
+    currency = Column(String, default='INR', nullable=False)
+    unit = Column(String, default='kg', nullable=False)
+    machining_complexity_factor = Column(Float, default=1.0, nullable=False)
+    minimum_order_quantity = Column(Integer, default=1, nullable=False)
+    bulk_discount_threshold = Column(Integer, default=10, nullable=False)
+    bulk_discount_percentage = Column(Float, default=5.0, nullable=False)
+    labor_cost_per_hour = Column(Float, default=500.0, nullable=False)
+    estimated_hours_per_unit = Column(Float, default=1.0, nullable=False)
+    markup_percentage = Column(Float, default=20.0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
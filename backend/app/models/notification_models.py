@@ -1,14 +1,18 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import and_, BigInteger, Column, Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.orm import foreign, relationship, synonym
 from datetime import datetime
 from typing import Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from app.models.file_models import Base
 
 
 class Notification(Base):
-    """Notification model for buyer file uploads"""
+    """
+    Notification of buyer file uploads: a digest of child_count uploads by created_by to one
+    RFQ, showing the first; the files list it with their notification_id. Notices of rejected
+    quotes count and list their parts' files in notification_files instead.
+    """
     __tablename__ = "notifications"
 
     id = Column(Integer, primary_key=True, index=True)
@@ -19,10 +23,103 @@ class Notification(Base):
     part_number = Column(String, nullable=True)  # Part number
     quantity_unit = Column(String, nullable=True)  # Quantity unit
     description = Column(String, nullable=True)  # File description
-    is_read = Column(Boolean, default=False, nullable=False)  # Notification read status
+    created_by = Column(String(255), nullable=True)  # Buyer who uploaded the files
+    rfq_id = Column(String(32), nullable=True)  # Their RFQ, when uploaded in one
+    child_count = Column(Integer, default=1, server_default="1", nullable=False)  # Files in this digest or notice
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_notifications_created_at_id", "created_at", "id"),
+        # The buyer's open digest: their newest notification within the digest window
+        Index("ix_notifications_created_by_created_at", "created_by", "created_at"),
+    )
+
+
+class NotificationInbox(Base):
+    """
+    A manufacturer's entry for a notification, holding that recipient's read state. Deleting a
+    notification removes the caller's entry only.
+    """
+    __tablename__ = "notification_inbox"
+
+    recipient = Column(String(255), primary_key=True)
+    # No foreign key: on PostgreSQL notifications is partitioned and keyed on (id, created_at)
+    notification_id = Column(Integer, primary_key=True)
+    created_at = Column(DateTime, nullable=False)  # The notification's, so pages are read from this table's indexes
+    read_at = Column(DateTime, nullable=True)
+
+    id = synonym("notification_id")  # Keyset pagination pages on (created_at, id)
+    notification = relationship(
+        Notification,
+        primaryjoin=lambda: and_(
+            foreign(NotificationInbox.notification_id) == Notification.id,
+            foreign(NotificationInbox.created_at) == Notification.created_at,
+        ),
+        viewonly=True,
+        lazy="joined",
+        innerjoin=True,
+    )
+
+    __table_args__ = (
+        Index("ix_notification_inbox_recipient_created_at", "recipient", "created_at", "notification_id"),
+        Index("ix_notification_inbox_recipient_read_at", "recipient", "read_at", "created_at", "notification_id"),
+        Index("ix_notification_inbox_notification_id", "notification_id"),
+    )
+
+
+class NotificationFile(Base):
+    """
+    A file listed by a notice that is not an upload digest, such as one for a batch of quote
+    rejections; digests list their uploads with files.notification_id instead
+    """
+    __tablename__ = "notification_files"
+
+    # No foreign key, as for notification_inbox
+    notification_id = Column(Integer, primary_key=True)
+    file_id = Column(Integer, ForeignKey("files.id"), primary_key=True, index=True)
+
+
+class NotificationArchive(Base):
+    """Notifications read by every recipient, moved out of notifications by the retention job"""
+    __tablename__ = "notifications_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    file_id = Column(Integer, nullable=False, index=True)
+    object_key = Column(String, nullable=False)
+    part_name = Column(String, nullable=False)
+    material = Column(String, nullable=True)
+    part_number = Column(String, nullable=True)
+    quantity_unit = Column(String, nullable=True)
+    description = Column(String, nullable=True)
+    created_by = Column(String(255), nullable=True)
+    rfq_id = Column(String(32), nullable=True)
+    child_count = Column(Integer, server_default="1", nullable=False)
+    created_at = Column(DateTime, nullable=False, index=True)
+    updated_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class NotificationChange(Base):
+    """
+    Change log read by GET /notifications/changes: one row per notification or quote notification
+    created, updated or deleted, numbered by the sequence of the transaction that changed it
+    """
+    __tablename__ = "notification_changes"
+
+    id = Column(Integer, primary_key=True)
+    sequence = Column(BigInteger, nullable=False)
+    kind = Column(String(32), nullable=False)  # notification, quote_notification
+    owner = Column(String(255), nullable=False)  # The notification's recipient
+    entity_id = Column(Integer, nullable=False)
+    operation = Column(String(16), nullable=False)  # created, updated, deleted
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+    __table_args__ = (
+        Index("ix_notification_changes_owner_sequence", "owner", "sequence"),
+        Index("ix_notification_changes_sequence", "sequence"),
+    )
+
 
 class NotificationResponse(BaseModel):
     """Response model for notifications"""
@@ -34,16 +131,49 @@ class NotificationResponse(BaseModel):
     part_number: Optional[str]
     quantity_unit: Optional[str]
     description: Optional[str]
-    is_read: bool
+    created_by: Optional[str] = None
+    rfq_id: Optional[str] = None
+    child_count: int = 1
+    is_read: bool = False  # The caller's read state, from their inbox entry
     created_at: datetime
     updated_at: datetime
 
     class Config:
         from_attributes = True
 
+    @classmethod
+    def for_recipient(cls, notification: "Notification", read_at: Optional[datetime]) -> "NotificationResponse":
+        return cls.from_orm(notification).model_copy(update={"is_read": read_at is not None})
+
+
+# Most ids accepted by one batch mark-read or delete request
+MAX_BATCH_IDS = 1000
+
+
+class NotificationIdsRequest(BaseModel):
+    """Notifications to mark read or delete in one statement"""
+    ids: list[int] = Field(..., min_length=1, max_length=MAX_BATCH_IDS)
+
+
+class ChangeSet(BaseModel):
+    """Ids changed since the cursor, each in the list of its latest change"""
+    created: list[int] = []
+    updated: list[int] = []
+    deleted: list[int] = []
+
+
+class NotificationChangesResponse(BaseModel):
+    """Response for GET /notifications/changes"""
+    cursor: int
+    reset: bool = False  # changes since the cursor are no longer all known; reload the lists
+    unread_count: int
+    notifications: ChangeSet = ChangeSet()
+    quote_notifications: ChangeSet = ChangeSet()
+
 
 class NotificationListResponse(BaseModel):
     """Response for listing notifications"""
     total: int
     unread_count: int
     notifications: list[NotificationResponse]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Text, Index
+from datetime import datetime
+
+from app.models.file_models import Base
+
+
+class OutboxMessage(Base):
+    """Side effect recorded with the change that causes it, carried out by app.services.outbox_service"""
+    __tablename__ = "outbox"
+
+    id = Column(Integer, primary_key=True)
+    topic = Column(String(64), nullable=False)  # e.g. "notification.create"
+    payload = Column(JSON, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    available_at = Column(DateTime, default=datetime.utcnow, nullable=False)  # Retry backoff
+    last_error = Column(Text, nullable=True)
+    failed_at = Column(DateTime, nullable=True)  # Set when attempts ran out; kept for inspection
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_outbox_failed_at_available_at_id", "failed_at", "available_at", "id"),
+    )
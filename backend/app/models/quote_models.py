@@ -1,15 +1,15 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
 from app.models.file_models import Base
 
 class Quote(Base):
     __tablename__ = 'quotes'
 
     id = Column(Integer, primary_key=True)
-    notification_id = Column(Integer, nullable=False)  # Reference to notification
+    notification_id = Column(Integer, nullable=False, index=True)  # Reference to notification
     file_id = Column(Integer, nullable=False)  # Reference to uploaded file
     part_name = Column(String(255), nullable=False)
     part_number = Column(String(100))
@@ -33,6 +33,14 @@ class Quote(Base):
     rejected_at = Column(DateTime, nullable=True)
     rejection_reason = Column(Text, nullable=True)
 
+    __table_args__ = (
+        Index("ix_quotes_created_at_id", "created_at", "id"),
+        Index("ix_quotes_created_by_created_at_id", "created_by", "created_at", "id"),
+        Index("ix_quotes_created_by_status_created_at_id", "created_by", "status", "created_at", "id"),
+        Index("ix_quotes_created_by_updated_at", "created_by", "updated_at"),
+        Index("ix_quotes_file_id_created_at_id", "file_id", "created_at", "id"),
+    )
+
 
 class QuoteCreate(BaseModel):
     notification_id: int
@@ -51,6 +59,23 @@ class QuoteUpdate(BaseModel):
     status: str  # accepted, rejected
     rejection_reason: Optional[str] = None
 
+# Most quotes created or updated by one batch request
+MAX_BATCH_QUOTES = 200
+
+class QuoteBatchCreate(BaseModel):
+    """The lines of an RFQ, quoted in one request"""
+    quotes: list[QuoteCreate] = Field(..., min_length=1, max_length=MAX_BATCH_QUOTES)
+
+class QuoteBatchUpdate(BaseModel):
+    """Quotes to accept or reject in one statement"""
+    ids: list[int] = Field(..., min_length=1, max_length=MAX_BATCH_QUOTES)
+    status: Literal['accepted', 'rejected']
+    rejection_reason: Optional[str] = None
+
+class QuoteBatchUpdateResponse(BaseModel):
+    status: str
+    ids: list[int]  # Quotes whose status changed; others were not the caller's or already had it
+
 class QuoteResponse(BaseModel):
     """Schema for quote API response"""
     id: int
@@ -87,3 +112,4 @@ class QuoteListResponse(BaseModel):
     sent_count: int
     accepted_count: int
     rejected_count: int
+    next_cursor: Optional[str] = None
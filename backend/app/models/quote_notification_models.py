@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from typing import Optional
@@ -21,6 +21,31 @@ class QuoteNotification(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_quote_notifications_sent_to_created_at_id", "sent_to", "created_at", "id"),
+        Index("ix_quote_notifications_sent_to_is_read", "sent_to", "is_read"),
+    )
+
+
+class QuoteNotificationArchive(Base):
+    """Read quote notifications moved out of quote_notifications by the retention job"""
+    __tablename__ = "quote_notifications_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    quote_id = Column(Integer, nullable=False, index=True)
+    file_id = Column(Integer, nullable=False)
+    sent_by = Column(String, nullable=False)
+    sent_to = Column(String, nullable=False)
+    part_name = Column(String, nullable=False)
+    is_read = Column(Boolean, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_quote_notifications_archive_sent_to_created_at", "sent_to", "created_at"),
+    )
+
 
 class QuoteNotificationResponse(BaseModel):
     """Response model for quote notifications"""
@@ -43,3 +68,4 @@ class QuoteNotificationListResponse(BaseModel):
     total: int
     unread_count: int
     notifications: list[QuoteNotificationResponse]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,47 @@
+import asyncio
+import json
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+
+from app.auth import get_current_user
+from app.config.settings import EVENTS_HEARTBEAT_SECONDS
+from app.services.event_service import broker, channels_for
+
+router = APIRouter(prefix="/events", tags=["Events"])
+
+# Client reconnect delay after the stream drops, in milliseconds
+RETRY_MS = 5000
+
+
+async def _event_stream(channels: list[str]):
+    queue = broker.subscribe(channels)
+    try:
+        # "ready" on every (re)connect tells the client to reload whatever it may have missed
+        yield f"retry: {RETRY_MS}\nevent: ready\ndata: {{}}\n\n"
+        while True:
+            try:
+                payload = await asyncio.wait_for(queue.get(), EVENTS_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                # Comment line: keeps proxies from closing an idle stream and detects dead clients
+                yield ": ping\n\n"
+                continue
+            yield f"event: {payload['type']}\ndata: {json.dumps(payload, default=str)}\n\n"
+    finally:
+        broker.unsubscribe(queue, channels)
+
+
+@router.get("/stream", summary="Server-Sent Events stream of notifications and quote updates")
+async def stream_events(current_user: dict = Depends(get_current_user)):
+    """
+    Pushes notification.created, and notification.updated when uploads join a digest, to
+    manufacturers, quote.created to the buyer a quote is for and
+    quote.accepted / quote.rejected to the manufacturer who sent it, replacing polling. Batch
+    requests push one quotes.created, quotes.accepted or quotes.rejected per recipient, with
+    the quote_ids.
+    """
+    return StreamingResponse(
+        _event_stream(channels_for(current_user)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
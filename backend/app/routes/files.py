@@ -1,18 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import List, Optional
 from app.config.database import get_db
-from app.auth import get_current_user
-from app.models.file_models import UploadRequest, FileResponse, FileListResponse, FileSearchRequest
+from app.auth import get_current_user, verify_object_token
+from app.etag import compute_etag, not_modified
+from app.models.file_models import BatchUploadRequest, BatchUploadResponse, UploadRequest, FileResponse, FileListResponse, FileSearchRequest, FileSearchResponse
 from app.services.file_service import (
     generate_upload_url,
+    generate_upload_urls,
     generate_download_url,
     list_files,
+    files_version,
     search_files,
     get_file_by_id,
+    get_file_by_object_key,
     delete_file,
+    reserve_object_key,
+    register_file,
+    FileNameConflictError,
 )
 from app.services.simple_mesh_service import generate_mesh_url
+from app.services.pagination import InvalidCursorError, Page
+from app.storage.base import ObjectNotFoundError
+from app.services.content_service import serve_object
+from app.services.export_service import MAX_EXPORT_FILES, get_export_files, build_export_entries, iter_zip
+from app.storage.factory import get_storage
+from app.services.upload_stream_service import discard_object, stream_to_storage, UploadTooLargeError
+from app.config.settings import MAX_FILE_SIZE_MB
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
 
 router = APIRouter(prefix="/files", tags=["Files"])
 
@@ -39,25 +57,102 @@ def request_upload_url(
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.post("/upload/batch", response_model=BatchUploadResponse, summary="Request upload URLs for the files of an RFQ")
+def request_upload_urls(
+    data: BatchUploadRequest,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Register up to MAX_BATCH_UPLOAD_FILES files in one transaction and return their presigned
+    upload URLs, in request order, under one RFQ id; manufacturers get one digest notification.
+    409 when a concurrent upload takes one of the names first.
+    """
+    try:
+        rfq_id, files = generate_upload_urls(db, data.files, current_user['username'], data.rfq_id)
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except FileNameConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"rfq_id": rfq_id, "files": files}
+
+
+def _file_list_response(page: Page) -> dict:
+    return {
+        "total": page.total,
+        "total_is_estimate": page.total_is_estimate,
+        "next_cursor": page.next_cursor,
+        "files": [FileResponse.from_orm(f) for f in page.items],
+    }
+
+
 @router.get("/list", response_model=FileListResponse)
 def list_files_endpoint(
+    request: Request,
+    response: Response,
     limit: int = Query(50, ge=1, le=500),
-    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    offset: int = Query(0, ge=0, description="Deprecated; use cursor"),
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user),
 ):
-    files, total = list_files(db, limit=limit, offset=offset)
-    return {"total": total, "files": [FileResponse.from_orm(f) for f in files]}
+    cached = not_modified(request, response, compute_etag(request, current_user, files_version(db)))
+    if cached is not None:
+        return cached
+    try:
+        page = list_files(db, limit=limit, offset=offset, cursor=cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _file_list_response(page)
 
 
-@router.post("/search", response_model=FileListResponse)
+@router.post("/search", response_model=FileSearchResponse)
 def search_files_endpoint(
     search_params: FileSearchRequest,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user),
 ):
-    files, total = search_files(search_params, db)
-    return {"total": total, "files": [FileResponse.from_orm(f) for f in files]}
+    try:
+        page, facets = search_files(search_params, db)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {**_file_list_response(page), "facets": facets}
+
+
+@router.get("/export", summary="Stream a ZIP of many CAD files")
+def export_files(
+    file_ids: Optional[List[int]] = Query(None, description="Files to include"),
+    buyer: Optional[str] = Query(None, description="Include every file uploaded by this buyer"),
+    include_meshes: bool = Query(False, description="Add generated GLB meshes where available"),
+    include_manifest: bool = Query(True, description="Add a CSV manifest of file metadata"),
+    store_only: bool = Query(False, description="Store STEP files without deflate compression"),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    if not file_ids and not buyer:
+        raise HTTPException(status_code=400, detail="Provide file_ids or buyer")
+    if file_ids and len(file_ids) > MAX_EXPORT_FILES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_EXPORT_FILES} files per export")
+    if current_user['role'] == 'buyer':
+        buyer = current_user['username']
+
+    files = get_export_files(db, file_ids=file_ids, created_by=buyer)
+    if not files:
+        raise HTTPException(status_code=404, detail="No files to export")
+
+    entries = build_export_entries(
+        files,
+        include_meshes=include_meshes,
+        include_manifest=include_manifest,
+        store_only=store_only,
+    )
+    return StreamingResponse(
+        iter_zip(entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="cad-export.zip"'},
+    )
 
 
 @router.get("/metadata/{file_id}", response_model=FileResponse)
@@ -75,16 +170,139 @@ def get_metadata(
 @router.get("/download/{object_key:path}")
 def request_download_url(
     object_key: str,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user),
 ):
     try:
-        download_url, file_record = generate_download_url(object_key, db)
+        download_url, file_record = generate_download_url(
+            object_key, db, accept_encoding=request.headers.get("accept-encoding")
+        )
         return {"download_url": download_url, "file": FileResponse.from_orm(file_record)}
     except Exception as e:
         raise HTTPException(status_code=404, detail=str(e))
 
 
+@router.api_route("/content/{object_key:path}", methods=["GET", "HEAD"])
+def stream_content(
+    object_key: str,
+    request: Request,
+    token: str = Query(..., description="Signed object token from /files/download"),
+    db: Session = Depends(get_db),
+):
+    """Serve a stored object with Range, ETag/If-None-Match and zero-copy file transfer support"""
+    if not verify_object_token(token, object_key):
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    try:
+        stat = get_storage().stat(object_key)
+    except ObjectNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
+    file_record = get_file_by_object_key(object_key, db)
+    return serve_object(request, object_key, stat, filename=file_record.original_name if file_record else None)
+
+
+@router.put("/content/{object_key:path}")
+async def upload_content(
+    object_key: str,
+    request: Request,
+    token: str = Query(..., description="Signed upload token from /files/upload"),
+):
+    """Presigned upload target for storage backends without their own upload endpoint"""
+    if not verify_object_token(token, object_key, action="put"):
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    try:
+        await stream_to_storage(
+            request.stream(),
+            object_key,
+            request.headers.get("content-type", "application/octet-stream"),
+            MAX_FILE_SIZE_MB * 1024 * 1024,
+        )
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    return {"success": True}
+
+
+@router.put("/stream/{filename}", summary="Upload a CAD file in one streamed request")
+async def stream_upload(
+    filename: str,
+    request: Request,
+    description: Optional[str] = Query(None, max_length=500),
+    material: Optional[str] = Query(None),
+    part_number: Optional[str] = Query(None),
+    quantity_unit: Optional[str] = Query("pieces"),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Single-request upload for ERP/PLM integrations: the body is forwarded to storage as it
+    arrives and produces the same File row and notification as /files/upload. The object is
+    deleted again if the upload fails or cannot be registered, e.g. because a concurrent
+    upload took the name (409).
+    """
+    try:
+        data = UploadRequest(
+            filename=filename,
+            content_type=request.headers.get("content-type", "application/octet-stream"),
+            description=description,
+            material=material,
+            part_number=part_number,
+            quantity_unit=quantity_unit,
+        )
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    max_bytes = MAX_FILE_SIZE_MB * 1024 * 1024
+    declared_length = request.headers.get("content-length")
+    if declared_length and declared_length.isdigit() and int(declared_length) > max_bytes:
+        raise HTTPException(status_code=413, detail=f"File exceeds the maximum size of {MAX_FILE_SIZE_MB} MB")
+
+    try:
+        object_key = await run_in_threadpool(reserve_object_key, data.filename, db, True)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        upload = await stream_to_storage(request.stream(), object_key, data.content_type, max_bytes)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    expected_sha256 = request.headers.get("x-content-sha256")
+    if expected_sha256 and expected_sha256.lower() != upload.sha256:
+        await discard_object(object_key)
+        raise HTTPException(status_code=400, detail="SHA-256 of the received data does not match X-Content-SHA256")
+
+    try:
+        file_record = await run_in_threadpool(
+            register_file,
+            db,
+            object_key,
+            data.filename,
+            data.content_type,
+            current_user['username'],
+            data.description,
+            data.material,
+            data.part_number,
+            data.quantity_unit,
+        )
+    except IntegrityError:
+        await run_in_threadpool(db.rollback)
+        await discard_object(object_key)
+        raise HTTPException(
+            status_code=409,
+            detail=f"File '{data.filename}' already exists. Please rename the file or delete the existing one.",
+        )
+    except BaseException:
+        await run_in_threadpool(db.rollback)
+        await discard_object(object_key)
+        raise
+    return {
+        "file_id": file_record.id,
+        "object_key": object_key,
+        "size_bytes": upload.size,
+        "sha256": upload.sha256,
+    }
+
+
 @router.get("/mesh/{object_key:path}")
 def request_mesh_url(
     object_key: str,
@@ -1,16 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import Optional
-from app.config.database import get_db
+from app.config.database import get_async_primary_db, get_db
+from app.config.settings import NOTIFICATION_CHANGES_MAX_WAIT_SECONDS
 from app.auth import get_current_user
-from app.models.notification_models import NotificationListResponse, NotificationResponse
+from app.etag import compute_etag, not_modified
+from app.models.notification_models import (
+    NotificationChangesResponse,
+    NotificationIdsRequest,
+    NotificationListResponse,
+    NotificationResponse,
+)
+from app.services.event_service import broker, channels_for
 from app.services.notification_service import (
+    get_notification_changes,
     get_notifications,
+    notifications_version,
     mark_as_read,
     mark_all_as_read,
+    mark_read,
     get_notification_with_file,
+    get_notification_files,
+    delete_notification as delete_notification_record,
+    delete_notifications,
+    clear_notifications,
 )
-from app.models.file_models import FileResponse
+from app.models.file_models import FileListResponse, FileResponse
+from app.services.pagination import InvalidCursorError
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,33 +38,82 @@ router = APIRouter(prefix="/notifications", tags=["Notifications"])
 
 @router.get("/", response_model=NotificationListResponse, summary="Get notifications for manufacturer")
 def list_notifications(
+    request: Request,
+    response: Response,
     limit: int = 50,
     offset: int = 0,
     unread_only: bool = False,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user),
 ):
-    """Get list of notifications for file uploads"""
+    """
+    Get the caller's notifications for file uploads; pass next_cursor back as cursor for the next
+    page. Answers 304 to If-None-Match with the ETag of an unchanged list.
+    """
     try:
-        total, unread_count, notifications = get_notifications(db, limit, offset, unread_only)
+        cached = not_modified(request, response, compute_etag(request, current_user, *notifications_version(db, current_user["username"])))
+        if cached is not None:
+            return cached
+        page, unread_count = get_notifications(db, current_user["username"], limit, offset, unread_only, cursor)
         return NotificationListResponse(
-            total=total,
+            total=page.total,
             unread_count=unread_count,
-            notifications=[NotificationResponse.from_orm(n) for n in notifications],
+            notifications=[NotificationResponse.for_recipient(e.notification, e.read_at) for e in page.items],
+            next_cursor=page.next_cursor,
         )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching notifications: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to fetch notifications")
 
 
+@router.get("/changes", response_model=NotificationChangesResponse, summary="Notification changes since a cursor")
+async def notification_changes(
+    since: Optional[int] = None,
+    timeout: float = Query(0, ge=0, le=NOTIFICATION_CHANGES_MAX_WAIT_SECONDS),
+    # A lagging replica could answer with a cursor ahead of the changes it has applied
+    db: AsyncSession = Depends(get_async_primary_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Ids of the notifications (manufacturers) or quote notifications (buyers) created, updated or
+    deleted after cursor since, with the cursor to pass next time and the unread count. Omit since
+    to get the current cursor. With timeout, long-polls: waits up to that many seconds for a change
+    before answering, holding no database connection while it waits.
+    """
+    channels = channels_for(current_user)
+    # Subscribe before the first check so a change committed in between still wakes us
+    queue = broker.subscribe(channels) if timeout else None
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    try:
+        while True:
+            changes = await db.run_sync(get_notification_changes, since, current_user)
+            changed = changes["reset"] or changes["notifications"] or changes["quote_notifications"]
+            remaining = deadline - loop.time()
+            if since is None or changed or remaining <= 0:
+                return changes
+            # Ends the read transaction, returning the connection to the pool while we wait
+            await db.rollback()
+            try:
+                await asyncio.wait_for(queue.get(), remaining)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        if queue is not None:
+            broker.unsubscribe(queue, channels)
+
+
 @router.post("/{notification_id}/read", summary="Mark notification as read")
 def mark_notification_read(
     notification_id: int,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user),
 ):
-    """Mark a notification as read"""
-    success = mark_as_read(db, notification_id)
+    """Mark a notification as read for the caller"""
+    success = mark_as_read(db, current_user["username"], notification_id)
     if not success:
         raise HTTPException(status_code=404, detail="Notification not found")
 
@@ -58,11 +125,38 @@ def mark_all_notifications_read(
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user),
 ):
-    """Mark all unread notifications as read"""
-    count = mark_all_as_read(db)
+    """Mark all of the caller's unread notifications as read"""
+    count = mark_all_as_read(db, current_user["username"])
     return {"message": f"Marked {count} notifications as read"}
 
 
+@router.post("/read", summary="Mark a list of notifications as read")
+def mark_notifications_read(
+    data: NotificationIdsRequest,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """Mark the given notifications as read for the caller in one statement; returns the ids it changed"""
+    ids = mark_read(db, current_user["username"], data.ids)
+    return {"message": f"Marked {len(ids)} notifications as read", "ids": ids}
+
+
+@router.post("/delete", summary="Delete a list of notifications")
+def delete_notifications_batch(
+    data: NotificationIdsRequest,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """Remove the given notifications from the caller's inbox in one statement"""
+    try:
+        count = delete_notifications(db, current_user["username"], data.ids)
+        return {"message": f"Deleted {count} notifications"}
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error deleting notifications: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to delete notifications")
+
+
 @router.get("/{notification_id}/details", summary="Get notification with file details")
 def get_notification_details(
     notification_id: int,
@@ -71,39 +165,57 @@ def get_notification_details(
 ):
     """Get notification details with associated file metadata"""
     try:
-        result = get_notification_with_file(db, notification_id)
+        result = get_notification_with_file(db, current_user["username"], notification_id)
         if not result:
             raise HTTPException(status_code=404, detail="Notification not found")
 
-        notification, file = result
-        mark_as_read(db, notification_id)
-
-        return {
-            "notification": NotificationResponse.from_orm(notification),
+        entry, file = result
+        response = {
+            "notification": NotificationResponse.for_recipient(entry.notification, entry.read_at),
             "file": FileResponse.from_orm(file) if file else None,
         }
+        # Serialized first: the commit in mark_as_read would expire both rows and reload them
+        if entry.read_at is None:
+            mark_as_read(db, current_user["username"], notification_id)
+            response["notification"].is_read = True
+        return response
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error fetching notification details: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to fetch notification details")
 
+@router.get("/{notification_id}/files", response_model=FileListResponse, summary="Files announced by a notification")
+def list_notification_files(
+    notification_id: int,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """The uploads merged into a digest notification, or the parts of a rejection notice, newest first; total is its child_count"""
+    try:
+        page = get_notification_files(db, current_user["username"], notification_id, limit, cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if page is None:
+        raise HTTPException(status_code=404, detail="Notification not found")
+    return FileListResponse(
+        total=page.total,
+        files=[FileResponse.from_orm(f) for f in page.items],
+        next_cursor=page.next_cursor,
+    )
+
 @router.delete("/{notification_id}", summary="Delete a notification")
 def delete_notification(
     notification_id: int,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user),
 ):
-    """Delete a specific notification"""
+    """Delete a notification from the caller's inbox"""
     try:
-        from app.models.notification_models import Notification
-        
-        notification = db.query(Notification).filter(Notification.id == notification_id).first()
-        if not notification:
+        if not delete_notification_record(db, current_user["username"], notification_id):
             raise HTTPException(status_code=404, detail="Notification not found")
-        
-        db.delete(notification)
-        db.commit()
         return {"message": "Notification deleted successfully"}
     except HTTPException:
         raise
@@ -119,10 +231,7 @@ def clear_all_notifications(
 ):
     """Delete all notifications for the user"""
     try:
-        from app.models.notification_models import Notification
-        
-        count = db.query(Notification).delete(synchronize_session=False)
-        db.commit()
+        count = clear_notifications(db, current_user["username"])
         return {"message": f"Deleted {count} notifications"}
     except Exception as e:
         db.rollback()
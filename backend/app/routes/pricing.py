@@ -1,34 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from pydantic import BaseModel, Field
-from sqlalchemy import Column, String, Float, DateTime, Integer
-from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import Session
 from datetime import datetime
 from typing import Optional, List
 from app.config.database import get_db
 from app.auth import get_current_user
-
-Base = declarative_base()
-
-# ============= ORM Models =============
-class MaterialPrice(Base):
-    __tablename__ = "material_prices"
-    
-    id = Column(Integer, primary_key=True, index=True)
-    material_name = Column(String, unique=True, nullable=False, index=True)
-    base_price_per_unit = Column(Float, nullable=False)
-    currency = Column(String, default='INR', nullable=False)
-    unit = Column(String, default='kg', nullable=False)
-    machining_complexity_factor = Column(Float, default=1.0, nullable=False)
-    minimum_order_quantity = Column(Integer, default=1, nullable=False)
-    bulk_discount_threshold = Column(Integer, default=10, nullable=False)
-    bulk_discount_percentage = Column(Float, default=5.0, nullable=False)
-    labor_cost_per_hour = Column(Float, default=500.0, nullable=False)
-    estimated_hours_per_unit = Column(Float, default=1.0, nullable=False)
-    markup_percentage = Column(Float, default=20.0, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
-
+from app.etag import compute_etag, not_modified
+from app.models.material_price_models import MaterialPrice
+from app.services import material_price_cache
+from app.services.material_price_cache import material_prices_version
 
 # ============= Pydantic Schemas =============
 class MaterialPriceCreate(BaseModel):
@@ -98,6 +79,34 @@ class PricingCalculationResponse(BaseModel):
     estimated_delivery_days: int
 
 
+DEFAULT_MATRIX_QUANTITIES = [1, 10, 50, 100, 500, 1000]
+
+
+class PriceMatrixRequest(BaseModel):
+    materials: Optional[List[str]] = Field(None, min_length=1, max_length=50, description="Material names; omit for all")
+    quantities: List[int] = Field(default=DEFAULT_MATRIX_QUANTITIES, min_length=1, max_length=50, description="Quantity breaks")
+    complexity_factors: Optional[List[float]] = Field(
+        None, min_length=1, max_length=10,
+        description="Part complexity multipliers (0.5-3.0); omit for each material's own factor",
+    )
+
+
+class MaterialPriceCurve(BaseModel):
+    material: str
+    currency: str
+    minimum_order_quantity: int
+    bulk_discount_threshold: int
+    complexity_factors: List[float]
+    # [quantity][complexity]; None below the minimum order quantity
+    total_price: List[List[Optional[float]]]
+    price_per_unit: List[List[Optional[float]]]
+
+
+class PriceMatrixResponse(BaseModel):
+    quantities: List[int]
+    materials: List[MaterialPriceCurve]
+
+
 # ============= Service Functions =============
 def create_material_price(db: Session, material_name: str, base_price_per_unit: float, 
                          machining_complexity_factor: float = 1.0, labor_cost_per_hour: float = 500.0,
@@ -114,7 +123,9 @@ def create_material_price(db: Session, material_name: str, base_price_per_unit:
         bulk_discount_percentage=bulk_discount_percentage
     )
     db.add(db_price)
+    material_price_cache.changed(db, material_name)
     db.commit()
+    material_price_cache.invalidate()
     db.refresh(db_price)
     return db_price
 
@@ -136,7 +147,9 @@ def update_material_price(db: Session, material_name: str, **kwargs):
         if value is not None and hasattr(db_price, key):
             setattr(db_price, key, value)
     
+    material_price_cache.changed(db, material_name)
     db.commit()
+    material_price_cache.invalidate()
     db.refresh(db_price)
     return db_price
 
@@ -146,12 +159,14 @@ def delete_material_price(db: Session, material_name: str) -> bool:
     if not db_price:
         return False
     db.delete(db_price)
+    material_price_cache.changed(db, material_name)
     db.commit()
+    material_price_cache.invalidate()
     return True
 
 
 def calculate_quote_price(db: Session, request: PricingCalculationRequest) -> PricingCalculationResponse:
-    material_price = get_material_price(db, request.material)
+    material_price = material_price_cache.get(db, request.material)
     if not material_price:
         raise ValueError(f"Material '{request.material}' not found in pricing database")
     
@@ -199,6 +214,67 @@ def calculate_quote_price(db: Session, request: PricingCalculationRequest) -> Pr
     )
 
 
+def calculate_price_matrix(db: Session, request: PriceMatrixRequest) -> PriceMatrixResponse:
+    """
+    Price every material x quantity x complexity combination the way calculate_quote_price
+    prices one, as array operations over the whole grid
+    """
+    if request.materials is None:
+        materials = material_price_cache.get_all(db)
+    else:
+        names = sorted(set(request.materials))
+        materials = [material_price_cache.get(db, name) for name in names]
+        missing = [name for name, material in zip(names, materials) if material is None]
+        if missing:
+            raise ValueError(f"Materials not found in pricing database: {', '.join(missing)}")
+    if any(not 0.5 <= factor <= 3.0 for factor in request.complexity_factors or []):
+        raise ValueError("Complexity factors must be between 0.5 and 3.0")
+    if any(quantity < 1 for quantity in request.quantities):
+        raise ValueError("Quantities must be at least 1")
+
+    def column(name: str) -> np.ndarray:
+        # One value per material, shaped (materials, 1, 1) to broadcast over quantities and complexities
+        return np.array([getattr(m, name) for m in materials], dtype=float).reshape(-1, 1, 1)
+
+    quantities = np.array(request.quantities, dtype=float).reshape(1, -1, 1)
+    if request.complexity_factors is not None:
+        complexity = np.array(request.complexity_factors, dtype=float).reshape(1, 1, -1)
+    else:
+        complexity = column("machining_complexity_factor")
+
+    base_material_cost = column("base_price_per_unit") * quantities * complexity
+    labor_cost = column("labor_cost_per_hour") * column("estimated_hours_per_unit") * quantities
+    subtotal = base_material_cost + labor_cost
+    bulk_discount = np.where(
+        quantities >= column("bulk_discount_threshold"), subtotal * column("bulk_discount_percentage") / 100, 0.0
+    )
+    subtotal_after_discount = subtotal - bulk_discount
+    total_price = subtotal_after_discount * (1 + column("markup_percentage") / 100)
+    price_per_unit = total_price / quantities
+
+    # Below the minimum order quantity there is no price, as calculate_quote_price refuses it
+    orderable = np.broadcast_to(quantities >= column("minimum_order_quantity"), total_price.shape)
+    total_price = np.where(orderable, np.round(total_price, 2), np.nan)
+    price_per_unit = np.where(orderable, np.round(price_per_unit, 2), np.nan)
+
+    def grid(values: np.ndarray) -> List[List[Optional[float]]]:
+        return [[None if np.isnan(v) else float(v) for v in row] for row in values]
+
+    curves = []
+    for i, material in enumerate(materials):
+        factors = request.complexity_factors or [material.machining_complexity_factor]
+        curves.append(MaterialPriceCurve(
+            material=material.material_name,
+            currency=material.currency,
+            minimum_order_quantity=material.minimum_order_quantity,
+            bulk_discount_threshold=material.bulk_discount_threshold,
+            complexity_factors=factors,
+            total_price=grid(total_price[i]),
+            price_per_unit=grid(price_per_unit[i]),
+        ))
+    return PriceMatrixResponse(quantities=request.quantities, materials=curves)
+
+
 # ============= API Routes =============
 router = APIRouter(prefix="/pricing", tags=["Pricing"])
 
@@ -229,11 +305,16 @@ def create_material(
 
 @router.get("/materials", response_model=List[MaterialPriceResponse])
 def list_materials(
+    request: Request,
+    response: Response,
     limit: int = 50,
     offset: int = 0,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user),
 ):
+    cached = not_modified(request, response, compute_etag(request, current_user, material_prices_version(db)))
+    if cached is not None:
+        return cached
     materials = get_all_material_prices(db, limit=limit, offset=offset)
     return materials
 
@@ -243,7 +324,7 @@ def get_material(
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user),
 ):
-    material = get_material_price(db, material_name)
+    material = material_price_cache.get(db, material_name)
     if not material:
         raise HTTPException(status_code=404, detail="Material not found")
     return material
@@ -293,3 +374,15 @@ def calculate_price(
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/calculate/matrix", response_model=PriceMatrixResponse)
+def calculate_price_matrix_endpoint(
+    request: PriceMatrixRequest,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """Price curves: the total and unit price of every material at every quantity break and complexity"""
+    try:
+        return calculate_price_matrix(db, request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
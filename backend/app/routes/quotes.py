@@ -1,20 +1,50 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from app.config.database import get_db
-from app.models.quote_models import Quote, QuoteCreate, QuoteUpdate, QuoteResponse, QuoteListResponse
-from app.services.quote_service import QuoteService
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.database import get_async_db
+from app.models.quote_models import (
+    QuoteBatchCreate,
+    QuoteBatchUpdate,
+    QuoteBatchUpdateResponse,
+    QuoteCreate,
+    QuoteListResponse,
+    QuoteResponse,
+    QuoteUpdate,
+)
+from app.models.quote_notification_models import QuoteNotificationListResponse
+from app.services.pagination import InvalidCursorError, Page
+from app.services.quote_service import AsyncQuoteService, buyer_quotes_query, manufacturer_quotes_query, quotes_version
+from app.services.counter_service import BUYER_QUOTES, MANUFACTURER_QUOTES
 from app.auth import get_current_user
+from app.etag import compute_etag, not_modified
 
 router = APIRouter(prefix="/quotes", tags=["quotes"])
 
+
+def _quote_list_response(page: Page, counts) -> dict:
+    return {
+        "quotes": page.items,
+        "total_count": page.total,
+        "next_cursor": page.next_cursor,
+        **counts.as_list_counts(),
+    }
+
+
+def _owner_quotes(current_user: dict):
+    """The caller's quotes query and the counters holding its status counts"""
+    if current_user['role'] == 'buyer':
+        return buyer_quotes_query(current_user['username']), (BUYER_QUOTES, current_user['username'])
+    return manufacturer_quotes_query(current_user['username']), (MANUFACTURER_QUOTES, current_user['username'])
+
+
 @router.post("", response_model=QuoteResponse, status_code=status.HTTP_201_CREATED)
 async def create_quote(
     quote_data: QuoteCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
     try:
-        quote = QuoteService.create_quote(db, quote_data, current_user['username'])
+        quote = await AsyncQuoteService.create_quote(db, quote_data, current_user['username'])
         return quote
     except Exception as e:
         raise HTTPException(
@@ -22,18 +52,54 @@ async def create_quote(
             detail=f"Failed to create quote: {str(e)}"
         )
 
+@router.post("/batch", response_model=list[QuoteResponse], status_code=status.HTTP_201_CREATED)
+async def create_quotes(
+    data: QuoteBatchCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Quote every line of an RFQ at once; buyers get one quotes.created event for the batch"""
+    try:
+        return await AsyncQuoteService.create_quotes(db, data.quotes, current_user['username'])
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Failed to create quotes: {str(e)}"
+        )
+
+@router.post("/batch/status", response_model=QuoteBatchUpdateResponse)
+async def update_quote_statuses(
+    data: QuoteBatchUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Accept or reject many of the caller's quotes in one statement; each manufacturer gets one
+    quotes.accepted or quotes.rejected event listing theirs, and a rejection posts one
+    notification for the whole batch
+    """
+    if current_user['role'] != 'buyer':
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Buyer access only")
+    ids = await AsyncQuoteService.set_status(
+        db, current_user['username'], data.ids, data.status, data.rejection_reason
+    )
+    return {"status": data.status, "ids": ids}
+
 @router.get("/manufacturer/stats", response_model=dict)
 async def get_manufacturer_stats(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
-    stats = QuoteService.get_quote_stats(db, current_user['username'])
+    stats = await AsyncQuoteService.get_quote_stats(db, current_user['username'])
     return stats
 
 @router.get("/status/{status_filter}", response_model=list[QuoteResponse])
 async def get_quotes_by_status(
     status_filter: str,
-    db: Session = Depends(get_db),
+    response: Response,
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
     valid_statuses = ['all', 'pending', 'sent', 'accepted', 'rejected']
@@ -43,91 +109,92 @@ async def get_quotes_by_status(
             detail=f"Invalid status. Must be one of: {valid_statuses}"
         )
 
-    if current_user['role'] == 'buyer':
-        quotes, _ = QuoteService.get_buyer_quotes(db, current_user['username'], status=status_filter)
-    else:
-        quotes, _ = QuoteService.get_manufacturer_quotes(db, current_user['username'], status=status_filter)
-    return quotes
+    query, counter_key = _owner_quotes(current_user)
+    try:
+        page, _ = await AsyncQuoteService.list_quotes(db, query, status_filter, limit, 0, counter_key, cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    return page.items
 
 @router.get("/notification/{notification_id}", response_model=list[QuoteResponse])
 async def get_quotes_by_notification(
     notification_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
-    quotes = QuoteService.get_quotes_by_notification(db, notification_id)
+    quotes = await AsyncQuoteService.get_quotes_by_notification(db, notification_id)
     return quotes
 
 @router.get("", response_model=QuoteListResponse)
 async def get_quotes(
-    status: str = Query(None, alias="status"),
+    request: Request,
+    response: Response,
+    status_filter: Optional[str] = Query(None, alias="status"),
     limit: int = Query(50, ge=1, le=100),
-    offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    offset: int = Query(0, ge=0, description="Deprecated; use cursor"),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
     valid_statuses = ['pending', 'sent', 'accepted', 'rejected']
-    if status and status not in valid_statuses:
+    if status_filter and status_filter not in valid_statuses:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Invalid status. Must be one of: {valid_statuses}"
         )
 
-    if current_user['role'] == 'buyer':
-        quotes, total_count = QuoteService.get_buyer_quotes(db, current_user['username'], limit, offset, status)
-        from app.models.file_models import File
-        all_quotes_query = db.query(Quote).join(File, Quote.file_id == File.id).filter(File.created_by == current_user['username'])
-    else:
-        quotes, total_count = QuoteService.get_manufacturer_quotes(db, current_user['username'], limit, offset, status)
-        all_quotes_query = db.query(Quote).filter(Quote.created_by == current_user['username'])
-
-    return {
-        "quotes": quotes,
-        "total_count": total_count,
-        "pending_count": all_quotes_query.filter(Quote.status == 'pending').count(),
-        "sent_count": all_quotes_query.filter(Quote.status == 'sent').count(),
-        "accepted_count": all_quotes_query.filter(Quote.status == 'accepted').count(),
-        "rejected_count": all_quotes_query.filter(Quote.status == 'rejected').count(),
-    }
+    query, counter_key = _owner_quotes(current_user)
+    version = await db.run_sync(quotes_version, query, counter_key)
+    cached = not_modified(request, response, compute_etag(request, current_user, version))
+    if cached is not None:
+        return cached
+    try:
+        page, counts = await AsyncQuoteService.list_quotes(db, query, status_filter, limit, offset, counter_key, cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return _quote_list_response(page, counts)
 
 @router.get("/buyer", response_model=QuoteListResponse)
 async def get_buyer_quotes(
-    status: str = Query(None, alias="status"),
+    request: Request,
+    response: Response,
+    status_filter: Optional[str] = Query(None, alias="status"),
     limit: int = Query(50, ge=1, le=100),
-    offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    offset: int = Query(0, ge=0, description="Deprecated; use cursor"),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
     if current_user['role'] != 'buyer':
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Buyer access only")
 
     valid_statuses = ['all', 'pending', 'sent', 'accepted', 'rejected']
-    if status and status not in valid_statuses:
+    if status_filter and status_filter not in valid_statuses:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Invalid status. Must be one of: {valid_statuses}"
         )
 
-    quotes, total_count = QuoteService.get_buyer_quotes(db, current_user['username'], limit, offset, status)
-    from app.models.file_models import File
-    all_quotes_query = db.query(Quote).join(File, Quote.file_id == File.id).filter(File.created_by == current_user['username'])
-
-    return {
-        "quotes": quotes,
-        "total_count": total_count,
-        "pending_count": all_quotes_query.filter(Quote.status == 'pending').count(),
-        "sent_count": all_quotes_query.filter(Quote.status == 'sent').count(),
-        "accepted_count": all_quotes_query.filter(Quote.status == 'accepted').count(),
-        "rejected_count": all_quotes_query.filter(Quote.status == 'rejected').count(),
-    }
+    query, counter_key = _owner_quotes(current_user)
+    version = await db.run_sync(quotes_version, query, counter_key)
+    cached = not_modified(request, response, compute_etag(request, current_user, version))
+    if cached is not None:
+        return cached
+    try:
+        page, counts = await AsyncQuoteService.list_quotes(db, query, status_filter, limit, offset, counter_key, cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return _quote_list_response(page, counts)
 
 @router.get("/{quote_id}", response_model=QuoteResponse)
 async def get_quote(
     quote_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
-    quote = QuoteService.get_quote(db, quote_id)
+    quote = await AsyncQuoteService.get_quote(db, quote_id)
     if not quote:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -139,10 +206,10 @@ async def get_quote(
 async def update_quote_status(
     quote_id: int,
     update_data: QuoteUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
-    quote = QuoteService.get_quote(db, quote_id)
+    quote = await AsyncQuoteService.get_quote(db, quote_id)
     if not quote:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -151,9 +218,9 @@ async def update_quote_status(
     
     try:
         if update_data.status == 'accepted':
-            quote = QuoteService.accept_quote(db, quote_id)
+            quote = await AsyncQuoteService.accept_quote(db, quote_id)
         elif update_data.status == 'rejected':
-            quote = QuoteService.reject_quote(db, quote_id, update_data.rejection_reason)
+            quote = await AsyncQuoteService.reject_quote(db, quote_id, update_data.rejection_reason)
         else:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -169,11 +236,11 @@ async def update_quote_status(
 @router.delete("/{quote_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_quote(
     quote_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
     try:
-        quote = QuoteService.get_quote(db, quote_id)
+        quote = await AsyncQuoteService.get_quote(db, quote_id)
         if not quote:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -186,7 +253,7 @@ async def delete_quote(
                 detail="You can only delete your own quotes"
             )
         
-        success = QuoteService.delete_quote(db, quote_id)
+        success = await AsyncQuoteService.delete_quote(db, quote_id)
         if not success:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -200,33 +267,36 @@ async def delete_quote(
             detail=f"Error deleting quote: {str(e)}"
         )
 
-@router.get("/buyer/notifications", response_model=dict)
+@router.get("/buyer/notifications", response_model=QuoteNotificationListResponse)
 async def get_buyer_quote_notifications(
     limit: int = Query(50, ge=1, le=100),
-    offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    offset: int = Query(0, ge=0, description="Deprecated; use cursor"),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
-    from app.models.quote_notification_models import QuoteNotification, QuoteNotificationListResponse
-    
-    notifications, total_count = QuoteService.get_buyer_quote_notifications(
-        db, current_user['username'], limit, offset
-    )
-    unread_count = QuoteService.get_unread_quote_notifications_count(db, current_user['username'])
+    try:
+        page = await AsyncQuoteService.get_buyer_quote_notifications(
+            db, current_user['username'], limit, offset, cursor
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    unread_count = await AsyncQuoteService.get_unread_quote_notifications_count(db, current_user['username'])
     
     return {
-        "notifications": notifications,
-        "total": total_count,
-        "unread_count": unread_count
+        "notifications": page.items,
+        "total": page.total,
+        "unread_count": unread_count,
+        "next_cursor": page.next_cursor,
     }
 
 @router.put("/buyer/notifications/{notification_id}/read")
 async def mark_quote_notification_read(
     notification_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
-    success = QuoteService.mark_quote_notification_as_read(db, notification_id)
+    success = await AsyncQuoteService.mark_quote_notification_as_read(db, notification_id, current_user['username'])
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -236,42 +306,29 @@ async def mark_quote_notification_read(
 
 @router.get("/buyer/notifications/unread/count", response_model=dict)
 async def get_unread_count(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
-    unread_count = QuoteService.get_unread_quote_notifications_count(db, current_user['username'])
+    unread_count = await AsyncQuoteService.get_unread_quote_notifications_count(db, current_user['username'])
     return {"unread_count": unread_count}
 
+# Declared before /buyer/notifications/{notification_id}, which would otherwise match "all"
+@router.delete("/buyer/notifications/all", status_code=status.HTTP_204_NO_CONTENT)
+async def clear_all_quote_notifications(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(get_current_user)
+):
+    await AsyncQuoteService.clear_buyer_quote_notifications(db, current_user['username'])
+
 @router.delete("/buyer/notifications/{notification_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_quote_notification(
     notification_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
-    from app.models.quote_notification_models import QuoteNotification
-    
-    notification = db.query(QuoteNotification).filter(
-        QuoteNotification.id == notification_id,
-        QuoteNotification.sent_to == current_user['username']
-    ).first()
-    
-    if not notification:
+    deleted = await AsyncQuoteService.delete_buyer_quote_notification(db, notification_id, current_user['username'])
+    if not deleted:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Notification not found"
         )
-    
-    db.delete(notification)
-    db.commit()
-
-@router.delete("/buyer/notifications/all", status_code=status.HTTP_204_NO_CONTENT)
-async def clear_all_quote_notifications(
-    db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
-):
-    from app.models.quote_notification_models import QuoteNotification
-    
-    db.query(QuoteNotification).filter(
-        QuoteNotification.sent_to == current_user['username']
-    ).delete(synchronize_session=False)
-    db.commit()
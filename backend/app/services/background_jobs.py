@@ -0,0 +1,45 @@
+import asyncio
+import logging
+from typing import Callable, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+_tasks: List[asyncio.Task] = []
+
+
+def schedule_periodic(
+    name: str,
+    func: Callable[[], object],
+    interval_seconds: float,
+    initial_delay_seconds: Optional[float] = None,
+) -> None:
+    """
+    Run a blocking job in the threadpool every interval_seconds on the current event loop.
+    The first run waits initial_delay_seconds, one full interval by default.
+    """
+    if interval_seconds <= 0:
+        logger.info(f"Background job '{name}' disabled")
+        return
+
+    async def runner():
+        delay = interval_seconds if initial_delay_seconds is None else initial_delay_seconds
+        while True:
+            await asyncio.sleep(delay)
+            delay = interval_seconds
+            try:
+                await run_in_threadpool(func)
+            except Exception as e:
+                logger.error(f"Background job '{name}' failed: {e}")
+
+    _tasks.append(asyncio.create_task(runner(), name=name))
+    logger.info(f"Scheduled background job '{name}' every {interval_seconds}s")
+
+
+async def stop_all() -> None:
+    """Cancel every scheduled job"""
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
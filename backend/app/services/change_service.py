@@ -0,0 +1,179 @@
+"""
+Notification change log behind GET /notifications/changes.
+
+Writers record the ids they create, update or delete with record_rows or record; the rows are
+held on the session and written to notification_changes when it commits. Every transaction that
+recorded changes takes one sequence value, in before_commit after flushing everything else.
+
+On PostgreSQL values come from the notification_change_sequence sequence, so writers do not
+queue behind each other. Each writer holds a shared advisory lock from taking its value until it
+commits; get_changes reads the head under the exclusive lock, which waits out those writers, so
+every value up to the head is committed and a client that has seen everything up to its cursor
+never misses a change committed later with a lower number. Elsewhere the value is the CHANGES
+sequence counter, whose row lock orders commits the same way; SQLite runs one write transaction
+at a time anyway. Cursors are only meaningful against the primary, which /notifications/changes
+reads from.
+
+Changes are also pushed as a "changes" event so long-polling clients wake up; see
+event_service. The retention job prunes old rows; clients behind the pruned horizon get
+reset=True and reload their lists.
+"""
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, event, func, insert, select, text
+from sqlalchemy.orm import Session
+
+from app.config.settings import NOTIFICATION_CHANGES_MAX_ROWS
+from app.models.counter_models import Counter
+from app.models.notification_models import NotificationChange
+from app.services import counter_service, event_service
+from app.services.counter_service import ALL_OWNERS, CHANGES
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATION = "notification"
+QUOTE_NOTIFICATION = "quote_notification"
+
+CREATED = "created"
+UPDATED = "updated"
+DELETED = "deleted"
+
+SEQUENCE = "sequence"
+PRUNED = "pruned"
+
+PENDING = "pending_changes"
+
+SEQUENCE_NAME = "notification_change_sequence"
+# Advisory lock key: writers hold it shared from taking a sequence value until they commit
+SEQUENCE_LOCK = 0x6368616E676573
+
+
+def _channel(owner: str) -> str:
+    return event_service.MANUFACTURERS if owner == ALL_OWNERS else event_service.user_channel(owner)
+
+
+def _uses_sequence(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def _next_sequence(session: Session) -> int:
+    if not _uses_sequence(session):
+        return counter_service.next_value(session, CHANGES, ALL_OWNERS, SEQUENCE)
+    session.execute(text("SELECT pg_advisory_xact_lock_shared(:key)"), {"key": SEQUENCE_LOCK})
+    return session.execute(text(f"SELECT nextval('{SEQUENCE_NAME}')")).scalar_one()
+
+
+def _head(db: Session, counts: Dict[str, int]) -> int:
+    """The highest sequence value below which every change is committed"""
+    if not _uses_sequence(db):
+        return counts.get(SEQUENCE, 0)
+    conn = db.connection()
+    # Session-level, so it is released right after the read instead of at the end of the request
+    conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": SEQUENCE_LOCK})
+    try:
+        last_value, is_called = conn.execute(text(f"SELECT last_value, is_called FROM {SEQUENCE_NAME}")).one()
+    finally:
+        conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": SEQUENCE_LOCK})
+    return last_value if is_called else 0
+
+
+# Inserted ahead of event_service's before_commit hook, which sends the "changes" events queued here
+@event.listens_for(Session, "before_commit", insert=True)
+def _write_changes(session):
+    if not session.info.get(PENDING):
+        return
+    # Flushed first so no lock is taken after the sequence's
+    session.flush()
+    pending = session.info.pop(PENDING)
+    sequence = _next_sequence(session)
+    for change in pending:
+        change["sequence"] = sequence
+    session.execute(insert(NotificationChange), pending)
+    for owner in {change["owner"] for change in pending}:
+        event_service.publish(session, _channel(owner), "changes", {"cursor": sequence})
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop(PENDING, None)
+
+
+def record_rows(db: Session, kind: str, rows: Iterable[Tuple[str, int]], operation: str) -> None:
+    """Log operation on (owner, id) rows when db commits, e.g. those RETURNING from a bulk write"""
+    now = datetime.utcnow()
+    db.info.setdefault(PENDING, []).extend(
+        {"kind": kind, "owner": owner, "entity_id": entity_id, "operation": operation, "created_at": now}
+        for owner, entity_id in rows
+        if owner is not None
+    )
+
+
+def record(db: Session, kind: str, owner: Optional[str], entity_ids: Iterable[int], operation: str) -> None:
+    """Log operation on entity_ids, all belonging to owner"""
+    record_rows(db, kind, [(owner, entity_id) for entity_id in entity_ids], operation)
+
+
+def get_changes(
+    db: Session, since: Optional[int], owners: List[str]
+) -> Tuple[int, bool, Dict[str, Dict[str, List[int]]]]:
+    """
+    Changes visible to owners after cursor since, as (cursor, reset, {kind: {operation: ids}}).
+    Without since, only the current cursor. An id appears once, under its latest operation,
+    except that an id created and then updated stays under created.
+    """
+    counts = counter_service.get_counts(db, CHANGES, ALL_OWNERS)
+    head = _head(db, counts)
+    if since is None or since == head:
+        return head, False, {}
+    if since > head or since < counts.get(PRUNED, 0):
+        return head, True, {}
+
+    # sequence <= head keeps the answer consistent with the cursor returned
+    rows = db.execute(
+        select(NotificationChange.kind, NotificationChange.entity_id, NotificationChange.operation)
+        .where(
+            NotificationChange.owner.in_(owners),
+            NotificationChange.sequence > since,
+            NotificationChange.sequence <= head,
+        )
+        .order_by(NotificationChange.sequence, NotificationChange.id)
+        .limit(NOTIFICATION_CHANGES_MAX_ROWS + 1)
+    ).all()
+    if len(rows) > NOTIFICATION_CHANGES_MAX_ROWS:
+        return head, True, {}
+
+    latest: Dict[str, Dict[int, str]] = {}
+    for kind, entity_id, operation in rows:
+        operations = latest.setdefault(kind, {})
+        if not (operation == UPDATED and operations.get(entity_id) == CREATED):
+            operations[entity_id] = operation
+
+    changes: Dict[str, Dict[str, List[int]]] = {}
+    for kind, operations in latest.items():
+        grouped = changes.setdefault(kind, {CREATED: [], UPDATED: [], DELETED: []})
+        for entity_id, operation in operations.items():
+            grouped[operation].append(entity_id)
+    return head, False, changes
+
+
+def prune_changes(db: Session, older_than: datetime) -> int:
+    """Delete change rows recorded before older_than and advance the pruned horizon past them"""
+    horizon = db.execute(
+        select(func.max(NotificationChange.sequence)).where(NotificationChange.created_at < older_than)
+    ).scalar()
+    if horizon is None:
+        return 0
+    pruned = db.execute(
+        select(Counter.value)
+        .where(Counter.scope == CHANGES, Counter.owner == ALL_OWNERS, Counter.metric == PRUNED)
+        .with_for_update()
+    ).scalar() or 0
+    if horizon > pruned:
+        counter_service.increment(db, CHANGES, ALL_OWNERS, PRUNED, horizon - pruned)
+    deleted = db.execute(delete(NotificationChange).where(NotificationChange.sequence <= horizon)).rowcount
+    db.commit()
+    if deleted:
+        logger.info(f"Pruned {deleted} notification changes up to sequence {horizon}")
+    return deleted
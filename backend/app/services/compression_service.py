@@ -0,0 +1,77 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+from app.config.settings import (
+    STEP_COMPRESSION_LEVEL,
+    STEP_COMPRESSION_MIN_AGE_DAYS,
+    STEP_COMPRESSION_BATCH_SIZE,
+    STEP_COMPRESSION_PREFIX,
+)
+from app.storage.base import CHUNK_SIZE
+from app.storage.codecs import CODEC_META_KEY, ORIGINAL_SIZE_META_KEY, ZSTD, get_codec, zstd_module
+from app.storage.factory import get_storage
+
+logger = logging.getLogger(__name__)
+
+
+def compress_object(object_key: str) -> bool:
+    """Recompress a stored object with zstd in place; returns False when skipped"""
+    storage = get_storage()
+    stat = storage.stat(object_key)
+    if get_codec(stat):
+        return False
+
+    tmp_key = f"tmp/zstd/{uuid4()}"
+    handle = storage.get(object_key)
+    try:
+        compressor = zstd_module().ZstdCompressor(level=STEP_COMPRESSION_LEVEL)
+        with compressor.stream_reader(handle, read_size=CHUNK_SIZE) as reader:
+            storage.put(tmp_key, reader, length=-1, content_type=stat.content_type)
+    finally:
+        handle.close()
+
+    try:
+        # Skip the swap if the object was re-uploaded while we were compressing it
+        if storage.stat(object_key).etag != stat.etag:
+            logger.info(f"Skipped compression of {object_key}: object changed during compression")
+            return False
+
+        storage.copy(
+            tmp_key,
+            object_key,
+            metadata={
+                **stat.metadata,
+                CODEC_META_KEY: ZSTD,
+                ORIGINAL_SIZE_META_KEY: str(stat.size),
+            },
+        )
+    finally:
+        storage.delete(tmp_key)
+
+    logger.info(f"Compressed {object_key} with zstd ({stat.size} bytes before)")
+    return True
+
+
+def compress_cold_objects(
+    min_age_days: int = STEP_COMPRESSION_MIN_AGE_DAYS,
+    batch_size: int = STEP_COMPRESSION_BATCH_SIZE,
+) -> int:
+    """Recompress up to batch_size stp/ objects that have not been modified for min_age_days"""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=min_age_days)
+    compressed = 0
+
+    for stat in get_storage().list(STEP_COMPRESSION_PREFIX):
+        if compressed >= batch_size:
+            break
+        if not stat.last_modified or stat.last_modified > cutoff or get_codec(stat):
+            continue
+        try:
+            if compress_object(stat.key):
+                compressed += 1
+        except Exception as e:
+            logger.error(f"Failed to compress {stat.key}: {e}")
+
+    if compressed:
+        logger.info(f"Compressed {compressed} cold STEP objects")
+    return compressed
@@ -0,0 +1,169 @@
+import os
+import re
+from email.utils import format_datetime
+from secrets import token_hex
+from typing import Iterator, List, Optional, Tuple
+from urllib.parse import quote
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+from app.storage.base import ObjectStat
+from app.storage.codecs import get_codec, iter_decoded
+from app.storage.factory import get_cache, get_storage
+
+RANGE_PATTERN = re.compile(r"^(\d*)-(\d*)$")
+# Ranges a request may ask for before it is answered with the whole object instead
+MAX_RANGES = 16
+
+
+def _etag(stat: ObjectStat) -> str:
+    # Decoded responses of compressed objects are a different representation of the stored bytes
+    value = stat.etag.strip('"')
+    if get_codec(stat):
+        value = f"{value}-decoded"
+    return f'"{value}"'
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def _content_disposition(filename: str) -> str:
+    """attachment header naming filename, with an ASCII fallback for clients ignoring filename*"""
+    fallback = re.sub(r'[^\x20-\x7e]|["\\]', "_", filename)
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
+def _parse_ranges(range_header: Optional[str], size: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    Parse a Range header into sorted inclusive (start, end) ranges, merging overlapping and
+    adjacent ones; None means serve everything. Raises ValueError when no range is satisfiable.
+    """
+    if not range_header:
+        return None
+    unit, _, specs = range_header.strip().partition("=")
+    if unit.strip().lower() != "bytes":
+        return None
+    specs = [spec.strip() for spec in specs.split(",") if spec.strip()]
+    if not specs or len(specs) > MAX_RANGES:
+        return None
+
+    ranges = []
+    for spec in specs:
+        match = RANGE_PATTERN.match(spec)
+        if not match or not any(match.groups()):
+            return None
+        start, end = match.groups()
+        if start == "":
+            length = int(end)
+            if length:
+                ranges.append((max(size - length, 0), size - 1))
+            continue
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+        if start <= end:
+            ranges.append((start, end))
+    if not ranges:
+        raise ValueError("Range not satisfiable")
+
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _multipart_ranges(ranges: List[Tuple[int, int]], size: int, content_type: str) -> Tuple[str, List[bytes], int]:
+    """Boundary, part headers (with the closing delimiter last) and total length of a multipart/byteranges body"""
+    boundary = token_hex(16)
+    headers = [
+        (
+            f"--{boundary}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n"
+        ).encode("latin-1")
+        for start, end in ranges
+    ]
+    headers.append(f"--{boundary}--\r\n".encode("latin-1"))
+    # Every part's data is followed by CRLF before the next delimiter
+    length = sum(map(len, headers)) + sum(end - start + 1 + 2 for start, end in ranges)
+    return boundary, headers, length
+
+
+def _iter_multipart(storage, object_key: str, ranges: List[Tuple[int, int]], part_headers: List[bytes]) -> Iterator[bytes]:
+    for (start, end), header in zip(ranges, part_headers):
+        yield header
+        yield from storage.stream(object_key, offset=start, length=end - start + 1)
+        yield b"\r\n"
+    yield part_headers[-1]
+
+
+def serve_object(request: Request, object_key: str, stat: ObjectStat, filename: Optional[str] = None) -> Response:
+    """
+    Serve the decoded bytes of an object with ETag, If-None-Match and Range support, including
+    multiple ranges as multipart/byteranges.
+
+    Files on local disk (filesystem backend or the read-through cache) go through FileResponse,
+    which handles ranges and hands whole-file transfers to the server via the ASGI pathsend
+    extension where available. Remote objects too large to cache are streamed with the ranges
+    forwarded to the backend.
+    """
+    etag = _etag(stat)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if stat.last_modified:
+        headers["Last-Modified"] = format_datetime(stat.last_modified, usegmt=True)
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    storage = get_storage()
+    codec = get_codec(stat)
+    path = storage.local_path(object_key) if not codec else None
+    if path is None and get_cache() is not None:
+        path = get_cache().get_path(object_key)
+
+    if filename:
+        headers["Content-Disposition"] = _content_disposition(filename)
+    if path is not None:
+        return FileResponse(path, media_type=stat.content_type, headers=headers, stat_result=os.stat(path))
+
+    if codec:
+        # Compressed objects cannot be sliced without decoding them from the start
+        headers["Accept-Ranges"] = "none"
+        return StreamingResponse(iter_decoded(storage, object_key, stat), media_type=stat.content_type, headers=headers)
+
+    headers["Accept-Ranges"] = "bytes"
+    if_range = request.headers.get("if-range")
+    try:
+        ranges = _parse_ranges(request.headers.get("range"), stat.size) if not if_range or if_range == etag else None
+    except ValueError:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{stat.size}"})
+
+    if ranges is None:
+        headers["Content-Length"] = str(stat.size)
+        return StreamingResponse(storage.stream(object_key), media_type=stat.content_type, headers=headers)
+
+    if len(ranges) > 1:
+        boundary, part_headers, length = _multipart_ranges(ranges, stat.size, stat.content_type)
+        headers["Content-Length"] = str(length)
+        return StreamingResponse(
+            _iter_multipart(storage, object_key, ranges, part_headers),
+            status_code=206,
+            media_type=f"multipart/byteranges; boundary={boundary}",
+            headers=headers,
+        )
+
+    start, end = ranges[0]
+    headers["Content-Range"] = f"bytes {start}-{end}/{stat.size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        storage.stream(object_key, offset=start, length=end - start + 1),
+        status_code=206,
+        media_type=stat.content_type,
+        headers=headers,
+    )
@@ -0,0 +1,275 @@
+"""
+Per-user counters for badges and dashboard stats.
+
+Writers adjust counters in the same transaction as the rows they count, so a committed change
+and its counter move together and reads are primary-key lookups. reconcile_counters recomputes
+everything from the source tables periodically and corrects any drift; on PostgreSQL an
+advisory lock lets one process at a time scan, and the others skip the pass. It can also run
+from cron with `python -m app.services.counter_service`.
+
+Functions take a sync Session; AsyncSession callers go through AsyncSession.run_sync.
+"""
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Select, and_, func, literal, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app import metrics
+from app.config.database import SessionLocal, engine
+from app.models.counter_models import Counter
+from app.models.file_models import File
+from app.models.notification_models import NotificationInbox
+from app.models.quote_models import Quote
+from app.models.quote_notification_models import QuoteNotification
+
+logger = logging.getLogger(__name__)
+
+ALL_OWNERS = "*"
+
+# Scopes: owner -> metric
+FILES = "files"                              # uploader (and "*") -> "total"
+NOTIFICATIONS = "notifications"              # manufacturer (inbox recipient) -> "total" / "unread"
+QUOTE_NOTIFICATIONS = "quote_notifications"  # buyer -> "total" / "unread"
+MANUFACTURER_QUOTES = "manufacturer_quotes"  # manufacturer -> quote status
+BUYER_QUOTES = "buyer_quotes"                # buyer (uploader of the quoted file) -> quote status
+CHANGES = "changes"                          # "*" -> "pruned" (and "sequence" off PostgreSQL); not reconciled, see change_service
+
+TOTAL = "total"
+UNREAD = "unread"
+
+_drift = metrics.counter("counters_drift_total", "Counters corrected by reconciliation")
+
+Key = Tuple[str, str]  # (owner, metric)
+
+# pg_try_advisory_lock key held while reconciling
+RECONCILE_LOCK = 0x636F756E74657273
+
+
+def _insert(db: Session):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(Counter)
+    if dialect == "sqlite":
+        return sqlite.insert(Counter)
+    raise RuntimeError(f"Counters need an upsert; unsupported dialect {dialect}")
+
+
+def adjust(db: Session, scope: str, deltas: Dict[Key, int]) -> None:
+    """Add deltas to counters in the session's open transaction, creating missing rows"""
+    rows = [
+        {"scope": scope, "owner": owner, "metric": metric, "value": delta, "updated_at": datetime.utcnow()}
+        for (owner, metric), delta in deltas.items()
+        if owner is not None and metric is not None and delta
+    ]
+    if not rows:
+        return
+    stmt = _insert(db)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[Counter.scope, Counter.owner, Counter.metric],
+            set_={"value": Counter.value + stmt.excluded.value, "updated_at": stmt.excluded.updated_at},
+        ),
+        rows,
+    )
+
+
+def next_value(db: Session, scope: str, owner: str, metric: str) -> int:
+    """
+    Add one to a counter and return the new value. The row stays locked until the transaction
+    ends, so concurrent callers get values in commit order.
+    """
+    stmt = _insert(db)
+    return db.execute(
+        stmt.values(scope=scope, owner=owner, metric=metric, value=1, updated_at=datetime.utcnow())
+        .on_conflict_do_update(
+            index_elements=[Counter.scope, Counter.owner, Counter.metric],
+            set_={"value": Counter.value + 1, "updated_at": stmt.excluded.updated_at},
+        )
+        .returning(Counter.value)
+    ).scalar_one()
+
+
+def increment(db: Session, scope: str, owner: Optional[str], metric: str, delta: int = 1) -> None:
+    adjust(db, scope, {(owner, metric): delta})
+
+
+def move(db: Session, scope: str, owner: Optional[str], old_metric: Optional[str], new_metric: str) -> None:
+    """Move one unit between metrics, e.g. from one quote status to another"""
+    if old_metric == new_metric:
+        return
+    adjust(db, scope, {(owner, old_metric): -1, (owner, new_metric): 1})
+
+
+def subtract_grouped(db: Session, scope: str, grouped: Select) -> None:
+    """Decrement counters by (owner, metric, count) rows, for bulk deletes of counted rows"""
+    deltas: Dict[Key, int] = {}
+    for owner, metric, count in db.execute(grouped).all():
+        deltas[(owner, metric)] = deltas.get((owner, metric), 0) - count
+    adjust(db, scope, deltas)
+
+
+def get_counts(db: Session, scope: str, owner: str) -> Dict[str, int]:
+    rows = db.execute(
+        select(Counter.metric, Counter.value).where(Counter.scope == scope, Counter.owner == owner)
+    ).all()
+    return {metric: max(value, 0) for metric, value in rows}
+
+
+def get_count(db: Session, scope: str, owner: str, metric: str) -> int:
+    value = db.execute(
+        select(Counter.value).where(Counter.scope == scope, Counter.owner == owner, Counter.metric == metric)
+    ).scalar_one_or_none()
+    return max(value or 0, 0)
+
+
+# Queries computing each scope from the source tables, as (owner, metric, count) rows
+
+def _files_source() -> List[Select]:
+    return [
+        select(File.created_by, literal(TOTAL), func.count()).where(File.created_by.isnot(None)).group_by(File.created_by),
+        select(literal(ALL_OWNERS), literal(TOTAL), func.count()).select_from(File),
+    ]
+
+
+def _notifications_source() -> List[Select]:
+    return [
+        select(NotificationInbox.recipient, literal(TOTAL), func.count()).group_by(NotificationInbox.recipient),
+        select(NotificationInbox.recipient, literal(UNREAD), func.count())
+        .where(NotificationInbox.read_at.is_(None))
+        .group_by(NotificationInbox.recipient),
+    ]
+
+
+def _quote_notifications_source() -> List[Select]:
+    return [
+        select(QuoteNotification.sent_to, literal(TOTAL), func.count()).group_by(QuoteNotification.sent_to),
+        select(QuoteNotification.sent_to, literal(UNREAD), func.count())
+        .where(QuoteNotification.is_read == False)
+        .group_by(QuoteNotification.sent_to),
+    ]
+
+
+def _manufacturer_quotes_source() -> List[Select]:
+    return [
+        select(Quote.created_by, Quote.status, func.count())
+        .where(Quote.status.isnot(None))
+        .group_by(Quote.created_by, Quote.status),
+    ]
+
+
+def _buyer_quotes_source() -> List[Select]:
+    return [
+        select(File.created_by, Quote.status, func.count())
+        .join(File, Quote.file_id == File.id)
+        .where(File.created_by.isnot(None), Quote.status.isnot(None))
+        .group_by(File.created_by, Quote.status),
+    ]
+
+
+SOURCES: Dict[str, Callable[[], List[Select]]] = {
+    FILES: _files_source,
+    NOTIFICATIONS: _notifications_source,
+    QUOTE_NOTIFICATIONS: _quote_notifications_source,
+    MANUFACTURER_QUOTES: _manufacturer_quotes_source,
+    BUYER_QUOTES: _buyer_quotes_source,
+}
+
+
+def reconcile_scope(db: Session, scope: str) -> int:
+    """
+    Bring one scope's counters in line with the source tables; returns the number corrected.
+
+    Stored values are read before counting and written back with compare-and-set, so an
+    increment committed by a concurrent writer makes the correction a no-op instead of being
+    overwritten; any drift left behind is fixed by the next pass.
+    """
+    stored: Dict[Key, int] = {
+        (owner, metric): value
+        for owner, metric, value in db.execute(
+            select(Counter.owner, Counter.metric, Counter.value).where(Counter.scope == scope)
+        ).all()
+    }
+    actual: Dict[Key, int] = {}
+    for query in SOURCES[scope]():
+        for owner, metric, count in db.execute(query).all():
+            actual[(owner, metric)] = count
+
+    corrected = 0
+    now = datetime.utcnow()
+    for key in stored.keys() | actual.keys():
+        owner, metric = key
+        expected = actual.get(key, 0)
+        if key in stored:
+            if stored[key] == expected:
+                continue
+            result = db.execute(
+                update(Counter)
+                .where(and_(
+                    Counter.scope == scope,
+                    Counter.owner == owner,
+                    Counter.metric == metric,
+                    Counter.value == stored[key],
+                ))
+                .values(value=expected, updated_at=now)
+            )
+            corrected += result.rowcount
+        elif expected:
+            result = db.execute(
+                _insert(db).on_conflict_do_nothing().values(
+                    scope=scope, owner=owner, metric=metric, value=expected, updated_at=now
+                )
+            )
+            corrected += result.rowcount
+    db.commit()
+    if corrected:
+        _drift.inc(corrected, scope=scope)
+        logger.info(f"Reconciled {corrected} '{scope}' counters")
+    return corrected
+
+
+@contextmanager
+def _reconcile_lock():
+    """Yield whether this process may reconcile; the lock is session-level, so it spans commits"""
+    if engine.dialect.name != "postgresql":
+        yield True
+        return
+    with engine.connect() as conn:
+        acquired = conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": RECONCILE_LOCK}).scalar()
+        conn.commit()
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": RECONCILE_LOCK})
+                conn.commit()
+
+
+def reconcile_counters(scopes: Optional[Iterable[str]] = None) -> int:
+    """Reconcile scopes, all by default; skipped while another process holds the lock"""
+    with _reconcile_lock() as acquired:
+        if not acquired:
+            logger.info("Counter reconciliation already running elsewhere; skipped")
+            return 0
+        db = SessionLocal()
+        try:
+            return sum(reconcile_scope(db, scope) for scope in (scopes or SOURCES))
+        finally:
+            db.close()
+
+
+def counters_missing() -> bool:
+    """True until counters have been computed once, e.g. on a fresh database"""
+    db = SessionLocal()
+    try:
+        return db.execute(select(Counter.scope).where(Counter.scope.in_(SOURCES)).limit(1)).first() is None
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(f"Corrected {reconcile_counters()} counters")
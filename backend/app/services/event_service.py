@@ -0,0 +1,193 @@
+"""
+Push events for the notification stream (GET /events/stream).
+
+Writers call publish(db, channel, type, data) in the transaction that makes the change. The
+event goes out only if that transaction commits:
+
+- on PostgreSQL it is sent with pg_notify inside the transaction, which PostgreSQL delivers on
+  commit to every worker's listener (start_listener), and each listener hands it to its broker
+- elsewhere (SQLite, a single worker) it is handed to this process's broker after commit
+
+The broker fans events out to the asyncio queues of the streams subscribed to the channel.
+Channels are MANUFACTURERS, shared by every manufacturer like their notifications, and
+user_channel(username) for events addressed to one user. Workers can also handle a channel's
+events in process (Broker.add_handler), as database does to learn of other workers' writes.
+"""
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+from app import metrics
+from app.config.settings import DATABASE_URL, EVENTS_QUEUE_SIZE
+
+logger = logging.getLogger(__name__)
+
+PG_CHANNEL = "app_events"
+MANUFACTURERS = "manufacturers"
+# Sent to a stream whose queue overflowed: events were dropped and the client should reload
+RESYNC = {"type": "resync"}
+
+PENDING = "pending_events"
+
+_published = metrics.counter("events_published_total", "Events delivered to this worker's broker")
+_dropped = metrics.counter("events_dropped_total", "Streams that fell behind and were told to resync")
+
+
+def user_channel(username: str) -> str:
+    return f"user:{username}"
+
+
+def channels_for(current_user: dict) -> list[str]:
+    """Channels carrying the events current_user may see"""
+    channels = [user_channel(current_user["username"])]
+    if current_user["role"] == "manufacturer":
+        channels.append(MANUFACTURERS)
+    return channels
+
+
+class Broker:
+    """In-process pub/sub; deliver is thread safe, subscribe and unsubscribe run on the event loop"""
+
+    def __init__(self, queue_size: int = EVENTS_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self._handlers: Dict[str, List[Callable[[dict], None]]] = defaultdict(list)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def subscribe(self, channels: Iterable[str]) -> asyncio.Queue:
+        self._loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(self.queue_size)
+        for channel in channels:
+            self._subscribers[channel].add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue, channels: Iterable[str]) -> None:
+        for channel in channels:
+            subscribers = self._subscribers.get(channel)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[channel]
+
+    def add_handler(self, channel: str, handler: Callable[[dict], None]) -> None:
+        """Call handler(payload), on the event loop, for every event delivered on channel"""
+        self._handlers[channel].append(handler)
+
+    def deliver(self, channel: str, payload: dict) -> None:
+        loop = self._loop
+        if loop is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._deliver(channel, payload)
+            return
+        try:
+            loop.call_soon_threadsafe(self._deliver, channel, payload)
+        except RuntimeError:
+            pass  # loop closed at shutdown
+
+    def _deliver(self, channel: str, payload: dict) -> None:
+        _published.inc(type=payload.get("type", ""))
+        for handler in self._handlers.get(channel, ()):
+            try:
+                handler(payload)
+            except Exception:
+                # Runs after the writer committed: one failing handler must not starve the streams
+                logger.exception(f"Event handler for '{channel}' failed")
+        for queue in list(self._subscribers.get(channel, ())):
+            try:
+                queue.put_nowait(payload)
+            except asyncio.QueueFull:
+                # A stalled client: replace its backlog with one resync instead of blocking others
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC)
+                _dropped.inc()
+
+
+broker = Broker()
+
+
+def _is_postgres(session: Session) -> bool:
+    return session.get_bind().dialect.name == "postgresql"
+
+
+def publish(db, channel: str, type_: str, data: dict) -> None:
+    """Queue an event on db (a Session or AsyncSession) for delivery when it commits"""
+    session = getattr(db, "sync_session", db)
+    session.info.setdefault(PENDING, []).append({"channel": channel, "event": {"type": type_, **data}})
+
+
+@event.listens_for(Session, "before_commit")
+def _notify_in_transaction(session):
+    if not session.info.get(PENDING) or not _is_postgres(session):
+        return
+    for pending in session.info.pop(PENDING):
+        session.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": PG_CHANNEL, "payload": json.dumps(pending, default=str)},
+        )
+
+
+@event.listens_for(Session, "after_commit")
+def _deliver_after_commit(session):
+    for pending in session.info.pop(PENDING, ()):
+        broker.deliver(pending["channel"], pending["event"])
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop(PENDING, None)
+
+
+async def _listen(dsn: str) -> None:
+    import asyncpg
+
+    def on_notify(connection, pid, channel, payload):
+        try:
+            pending = json.loads(payload)
+        except ValueError:
+            logger.error(f"Ignored malformed event: {payload[:200]}")
+            return
+        broker.deliver(pending["channel"], pending["event"])
+
+    delay = 1
+    while True:
+        connection = None
+        try:
+            connection = await asyncpg.connect(dsn)
+            await connection.add_listener(PG_CHANNEL, on_notify)
+            logger.info(f"Listening for '{PG_CHANNEL}' events")
+            delay = 1
+            # add_listener delivers through callbacks; this loop only notices a dropped connection
+            while not connection.is_closed():
+                await asyncio.sleep(5)
+                await connection.execute("SELECT 1")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Event listener disconnected: {e}; retrying in {delay}s")
+        finally:
+            if connection is not None and not connection.is_closed():
+                await connection.close()
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 30)
+
+
+def start_listener() -> Optional[asyncio.Task]:
+    """Relay pg_notify events to this worker's broker; only needed on PostgreSQL"""
+    broker._loop = asyncio.get_running_loop()
+    url = make_url(DATABASE_URL)
+    if url.get_backend_name() != "postgresql":
+        return None
+    dsn = url.set(drivername="postgresql").render_as_string(hide_password=False)
+    return asyncio.create_task(_listen(dsn), name="event-listener")
@@ -0,0 +1,193 @@
+import csv
+import io
+import logging
+import re
+import zipfile
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.models.file_models import File
+from app.services.simple_mesh_service import mesh_object_key
+from app.storage.base import ObjectNotFoundError
+from app.storage.codecs import decoded_size, iter_decoded
+from app.storage.factory import get_storage
+
+logger = logging.getLogger(__name__)
+
+MAX_EXPORT_FILES = 1000
+MANIFEST_COLUMNS = [
+    "id",
+    "object_key",
+    "original_name",
+    "content_type",
+    "description",
+    "material",
+    "part_number",
+    "quantity_unit",
+    "created_by",
+    "created_at",
+    "size_bytes",
+]
+
+
+@dataclass
+class ZipEntry:
+    name: str
+    chunks: Callable[[], Iterable[bytes]]
+    size: Optional[int]
+    compress_type: int
+    modified: datetime
+
+
+class _ZipSink(io.RawIOBase):
+    """Non-seekable write target that hands every written byte back to the response generator"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip(entries: Iterable[ZipEntry]) -> Iterator[bytes]:
+    """
+    Stream a ZIP archive without temp files or seeking: local headers are followed by data
+    descriptors, and entries of unknown or large size are written as ZIP64.
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, mode="w", allowZip64=True) as archive:
+        for entry in entries:
+            info = zipfile.ZipInfo(entry.name, date_time=entry.modified.timetuple()[:6])
+            info.compress_type = entry.compress_type
+            force_zip64 = entry.size is None or entry.size >= zipfile.ZIP64_LIMIT
+            if entry.size is not None:
+                info.file_size = entry.size
+            with archive.open(info, mode="w", force_zip64=force_zip64) as dest:
+                for chunk in entry.chunks():
+                    dest.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            yield sink.drain()
+    yield sink.drain()
+
+
+def _safe_entry_name(name: str, fallback: str) -> str:
+    """name reduced to a bare file name: no directories, drive prefix, '..' or control characters"""
+    name = re.split(r"[\\/]", name)[-1]
+    name = re.sub(r"^[A-Za-z]:", "", name)
+    name = re.sub(r"[\x00-\x1f\x7f]", "", name).strip()
+    return fallback if name.strip(".") == "" else name
+
+
+def _object_entry(name: str, object_key: str, compress_type: int, modified: datetime) -> Optional[ZipEntry]:
+    storage = get_storage()
+    try:
+        stat = storage.stat(object_key)
+    except ObjectNotFoundError:
+        return None
+    return ZipEntry(
+        name=name,
+        chunks=lambda: iter_decoded(storage, object_key, stat),
+        size=decoded_size(stat),
+        compress_type=compress_type,
+        modified=modified,
+    )
+
+
+def _manifest_entry(rows: List[dict]) -> ZipEntry:
+    def chunks():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=MANIFEST_COLUMNS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue().encode()
+
+    return ZipEntry("manifest.csv", chunks, None, zipfile.ZIP_DEFLATED, datetime.utcnow())
+
+
+def get_export_files(
+    db: Session,
+    file_ids: Optional[List[int]] = None,
+    created_by: Optional[str] = None,
+) -> List[File]:
+    query = db.query(File)
+    if file_ids:
+        query = query.filter(File.id.in_(file_ids))
+    if created_by:
+        query = query.filter(File.created_by == created_by)
+    return query.order_by(File.created_at.asc()).limit(MAX_EXPORT_FILES).all()
+
+
+def build_export_entries(
+    files: List[File],
+    include_meshes: bool = False,
+    include_manifest: bool = True,
+    store_only: bool = False,
+) -> Iterator[ZipEntry]:
+    """
+    ZIP entries for the given files. Rows are copied to plain dicts up front so the archive
+    can be streamed after the request's DB session has closed.
+    """
+    rows = [
+        {column: getattr(f, column) for column in MANIFEST_COLUMNS if column != "size_bytes"}
+        for f in files
+    ]
+    step_compression = zipfile.ZIP_STORED if store_only else zipfile.ZIP_DEFLATED
+    used_names = set()
+
+    def unique_name(row: dict, folder: str, suffix: str = "") -> str:
+        # Upload names are only checked for their extension; an entry must not climb out of its folder
+        name = _safe_entry_name(row["original_name"], f"file_{row['id']}") + suffix
+        path = f"{folder}/{name}"
+        if path in used_names:
+            path = f"{folder}/{row['id']}_{name}"
+        used_names.add(path)
+        return path
+
+    def entries() -> Iterator[ZipEntry]:
+        for row in rows:
+            entry = _object_entry(
+                unique_name(row, "files"),
+                row["object_key"],
+                step_compression,
+                row["created_at"],
+            )
+            if entry is None:
+                logger.warning(f"Skipping {row['object_key']} in export: object missing from storage")
+                row["size_bytes"] = None
+                continue
+            row["size_bytes"] = entry.size
+            yield entry
+
+            if include_meshes:
+                # GLB is already compact binary; deflating it costs CPU for little gain
+                mesh_entry = _object_entry(
+                    unique_name(row, "meshes", ".glb"),
+                    mesh_object_key(row["object_key"]),
+                    zipfile.ZIP_STORED,
+                    row["created_at"],
+                )
+                if mesh_entry is not None:
+                    yield mesh_entry
+
+        if include_manifest:
+            yield _manifest_entry(rows)
+
+    return entries()
@@ -1,52 +1,82 @@
 from uuid import uuid4
 from datetime import datetime, timedelta
+from functools import lru_cache
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
-from typing import Optional, List
-from app.storage.minio_client import minio_client, ensure_bucket
+from sqlalchemy import or_, and_, delete, func, insert, literal, select
+from typing import Dict, Optional, List, Tuple
 from app.config.settings import MINIO_BUCKET
-from app.models.file_models import File, FileSearchRequest
-from app.models.notification_models import Notification
+from app.storage.base import ObjectNotFoundError
+from app.storage.codecs import get_codec, accepts_zstd, ZSTD
+from app.storage.factory import get_storage, invalidate_cached
+from app.storage.local_storage import signed_content_url
+from app.services.pagination import (
+    Page, count_total, decode_offset_cursor, encode_offset_cursor, paginate, split_page,
+)
+from app.services.search_service import facet_counts, text_match
+from app.models.file_models import File, FileSearchRequest, UploadRequest
+from app.models.notification_models import Notification, NotificationArchive
 from app.models.quote_models import Quote
+from app.services import change_service, counter_service, outbox_service
+from app.services.change_service import DELETED, NOTIFICATION, QUOTE_NOTIFICATION
+from app.services.notification_service import delete_inbox_entries, detach_file, detach_from_notices, part_name_for
+from app.services.counter_service import (
+    ALL_OWNERS, BUYER_QUOTES, FILES, MANUFACTURER_QUOTES, QUOTE_NOTIFICATIONS, TOTAL, UNREAD,
+)
 import socket
 
-def generate_upload_url(
-    filename: str, 
-    content_type: str, 
+
+class FileNameConflictError(ValueError):
+    """Another upload registered one of the file names first"""
+
+
+@lru_cache(maxsize=1)
+def _host_address() -> str:
+    """This host's address, which prefixes object keys; resolved once instead of per upload"""
+    return socket.gethostbyname(socket.gethostname())
+
+
+def _object_key(filename: str) -> str:
+    return f"stp/{_host_address()}_{filename}"
+
+
+def reserve_object_key(filename: str, db: Session, unique: bool = False) -> str:
+    """
+    Reject duplicate file names and return the storage key for a new upload. unique gives the
+    key a random prefix, for uploads written before their File row: a concurrent upload of the
+    same name then never shares, and on losing deletes, the winner's object.
+    """
+    existing_file = db.query(File).filter(File.original_name == filename).first()
+    if existing_file:
+        raise ValueError(f"File '{filename}' already exists. Please rename the file or delete the existing one.")
+    
+    return _object_key(f"{uuid4().hex}_{filename}" if unique else filename)
+
+
+def _notification_payload(file_id: int, object_key: str, filename: str, upload) -> dict:
+    return {
+        "file_id": file_id,
+        "object_key": object_key,
+        "part_name": part_name_for(filename),
+        "material": upload.material,
+        "part_number": upload.part_number,
+        "quantity_unit": upload.quantity_unit,
+        "description": upload.description,
+    }
+
+
+def register_file(
     db: Session,
+    object_key: str,
+    filename: str,
+    content_type: str,
     created_by: str,
     description: Optional[str] = None,
     material: Optional[str] = None,
     part_number: Optional[str] = None,
     quantity_unit: Optional[str] = None
-):
-    existing_file = db.query(File).filter(File.original_name == filename).first()
-    if existing_file:
-        raise ValueError(f"File '{filename}' already exists. Please rename the file or delete the existing one.")
-    
-    ip_address = socket.gethostbyname(socket.gethostname())
-    object_key = f"stp/{ip_address}_{filename}"
-    
-    upload_url = None
-    download_url = object_key
-    
-    try:
-        ensure_bucket()
-        upload_url = minio_client.presigned_put_object(
-            MINIO_BUCKET,
-            object_key,
-            expires=timedelta(minutes=15)
-        )
-        download_url = minio_client.presigned_get_object(
-            MINIO_BUCKET,
-            object_key,
-            expires=timedelta(days=7)
-        )
-    except Exception as e:
-        print(f"MinIO error (non-critical): {e}")
-        upload_url = f"http://localhost:9000/{MINIO_BUCKET}/{object_key}"
-        download_url = object_key
-
+) -> File:
+    """Create the File row for an upload and queue the manufacturer notification with it"""
     file_record = File(
         object_key=object_key,
         original_name=filename,
@@ -60,39 +90,172 @@ def generate_upload_url(
         updated_at=datetime.utcnow()
     )
     db.add(file_record)
+    counter_service.adjust(db, FILES, {(created_by, TOTAL): 1, (ALL_OWNERS, TOTAL): 1})
+    db.flush()
+    outbox_service.enqueue(
+        db, outbox_service.NOTIFICATION_CREATE,
+        _notification_payload(file_record.id, object_key, filename, file_record),
+    )
     db.commit()
     db.refresh(file_record)
+    return file_record
 
-    from app.services.notification_service import create_notification
-    create_notification(
-        db=db,
-        file_id=file_record.id,
-        object_key=object_key,
-        part_name=filename.replace('.stp', '').replace('.step', '').replace('.igs', '').replace('.iges', ''),
+
+def _presign_upload(object_key: str) -> Tuple[str, str]:
+    """Upload and download URLs for a new object"""
+    try:
+        storage = get_storage()
+        upload_url = storage.presign_put(object_key, expires=timedelta(minutes=15))
+        download_url = storage.presign_get(object_key, expires=timedelta(days=7))
+    except Exception as e:
+        print(f"Storage error (non-critical): {e}")
+        upload_url = f"http://localhost:9000/{MINIO_BUCKET}/{object_key}"
+        download_url = object_key
+    return upload_url, download_url
+
+
+def generate_upload_url(
+    filename: str, 
+    content_type: str, 
+    db: Session,
+    created_by: str,
+    description: Optional[str] = None,
+    material: Optional[str] = None,
+    part_number: Optional[str] = None,
+    quantity_unit: Optional[str] = None
+):
+    object_key = reserve_object_key(filename, db)
+    upload_url, download_url = _presign_upload(object_key)
+
+    file_record = register_file(
+        db,
+        object_key,
+        filename,
+        content_type,
+        created_by,
+        description=description,
         material=material,
         part_number=part_number,
         quantity_unit=quantity_unit,
-        description=description,
     )
 
     return upload_url, download_url, file_record.id
 
 
-def generate_download_url(object_key: str, db: Session):
+def _existing_names(db: Session, filenames: List[str]) -> List[str]:
+    return sorted(db.execute(
+        select(File.original_name).where(File.original_name.in_(filenames))
+    ).scalars().all())
+
+
+def generate_upload_urls(
+    db: Session,
+    uploads: List[UploadRequest],
+    created_by: str,
+    rfq_id: Optional[str] = None,
+) -> Tuple[str, List[dict]]:
+    """
+    Register many uploads under one RFQ in one transaction: one IN query for name collisions,
+    one INSERT for the File rows and one for their notification messages, which the outbox
+    dispatcher merges into a single digest notification. Returns the RFQ id and, per upload in
+    order, its file id and presigned URLs. rfq_id adds the files to one of created_by's RFQs.
+    """
+    filenames = [upload.filename for upload in uploads]
+    existing = _existing_names(db, filenames)
+    if existing:
+        raise ValueError(
+            f"Files already exist: {', '.join(existing)}. Please rename the files or delete the existing ones."
+        )
+    if rfq_id is None:
+        rfq_id = uuid4().hex
+    elif db.execute(
+        select(File.id).where(File.rfq_id == rfq_id, File.created_by != created_by).limit(1)
+    ).first() is not None:
+        raise PermissionError(f"RFQ '{rfq_id}' belongs to another user")
+
+    now = datetime.utcnow()
+    object_keys = [_object_key(filename) for filename in filenames]
+    # Ids come back keyed by the unique object key: asking for them in parameter order makes
+    # SQLAlchemy fall back to one INSERT per row where it has no sentinel column to sort on
+    try:
+        inserted = db.execute(
+            insert(File).returning(File.object_key, File.id),
+            [
+                {
+                    "object_key": object_key,
+                    "original_name": upload.filename,
+                    "content_type": upload.content_type,
+                    "description": upload.description,
+                    "material": upload.material,
+                    "part_number": upload.part_number,
+                    "quantity_unit": upload.quantity_unit,
+                    "created_by": created_by,
+                    "rfq_id": rfq_id,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for object_key, upload in zip(object_keys, uploads)
+            ],
+        ).all()
+        ids_by_key = dict(inserted)
+        file_ids = [ids_by_key[object_key] for object_key in object_keys]
+        counter_service.adjust(db, FILES, {(created_by, TOTAL): len(file_ids), (ALL_OWNERS, TOTAL): len(file_ids)})
+        outbox_service.enqueue_many(db, outbox_service.NOTIFICATION_CREATE, [
+            _notification_payload(file_id, object_key, upload.filename, upload)
+            for file_id, object_key, upload in zip(file_ids, object_keys, uploads)
+        ])
+        db.commit()
+    except IntegrityError:
+        # Another upload registered one of the names between the check above and the INSERT
+        db.rollback()
+        raise FileNameConflictError(
+            f"Files already exist: {', '.join(_existing_names(db, filenames))}. "
+            "Please rename the files or delete the existing ones."
+        )
+
+    results = []
+    for file_id, object_key, upload in zip(file_ids, object_keys, uploads):
+        upload_url, download_url = _presign_upload(object_key)
+        results.append({
+            "file_id": file_id,
+            "filename": upload.filename,
+            "upload_url": upload_url,
+            "download_url": download_url,
+        })
+    return rfq_id, results
+
+
+def get_decoded_content_url(object_key: str, expires: timedelta = timedelta(hours=1)) -> str:
+    """URL of the backend route that streams an object decompressed, for clients without zstd support"""
+    return signed_content_url(object_key, expires)
+
+
+def generate_download_url(object_key: str, db: Session, accept_encoding: Optional[str] = None):
     file_record = db.query(File).filter(File.object_key == object_key).first()
     if not file_record:
         raise ValueError(f"STP file not found in database: {object_key}")
     
     download_url = None
     try:
-        ensure_bucket()
-        download_url = minio_client.presigned_get_object(
-            MINIO_BUCKET,
+        storage = get_storage()
+        try:
+            codec = get_codec(storage.stat(object_key))
+        except ObjectNotFoundError:
+            codec = None
+
+        response_headers = None
+        if codec == ZSTD:
+            if not accepts_zstd(accept_encoding):
+                return get_decoded_content_url(object_key), file_record
+            response_headers = {"response-content-encoding": ZSTD}
+
+        download_url = storage.presign_get(
             object_key,
-            expires=timedelta(hours=1)
+            expires=timedelta(hours=1),
+            response_headers=response_headers,
         )
     except Exception as e:
-        print(f"MinIO error: {e}")
+        print(f"Storage error: {e}")
         download_url = f"http://localhost:9000/{MINIO_BUCKET}/{object_key}"
     
     return download_url if download_url else object_key, file_record
@@ -109,60 +272,152 @@ def get_file_by_object_key(object_key: str, db: Session) -> Optional[File]:
 def list_files(
     db: Session,
     limit: int = 100,
-    offset: int = 0
-) -> tuple[List[File], int]:
-    query = db.query(File)
-    
-    total = query.count()
-    files = query.order_by(File.created_at.desc()).offset(offset).limit(limit).all()
-    
-    return files, total
+    offset: int = 0,
+    cursor: Optional[str] = None
+) -> Page:
+    rows = db.execute(paginate(select(File), File, limit, cursor, offset)).scalars().all()
+    files, next_cursor = split_page(rows, limit)
+    total = counter_service.get_count(db, FILES, ALL_OWNERS, TOTAL)
+    return Page(files, next_cursor, total)
 
 
-def search_files(search_params: FileSearchRequest, db: Session) -> tuple[List[File], int]:
-    query = db.query(File)
-    
-    if search_params.query:
-        query = query.filter(File.original_name.ilike(f"%{search_params.query}%"))
-    
+def files_version(db: Session) -> tuple:
+    """Version of the file list: the newest updated_at and the file count"""
+    newest = db.execute(select(func.max(File.updated_at))).scalar()
+    return newest, counter_service.get_count(db, FILES, ALL_OWNERS, TOTAL)
+
+
+def _search_filters(search_params: FileSearchRequest, exclude: Optional[str] = None) -> list:
+    """Conditions of the non-text search parameters; exclude leaves out the one a facet counts"""
+    conditions = []
+    if search_params.material and exclude != 'material':
+        conditions.append(File.material == search_params.material)
+    if search_params.created_by and exclude != 'created_by':
+        conditions.append(File.created_by == search_params.created_by)
+    if search_params.rfq_id:
+        conditions.append(File.rfq_id == search_params.rfq_id)
     if search_params.start_date:
-        query = query.filter(File.created_at >= search_params.start_date)
+        conditions.append(File.created_at >= search_params.start_date)
     if search_params.end_date:
-        query = query.filter(File.created_at <= search_params.end_date)
+        conditions.append(File.created_at <= search_params.end_date)
+    return conditions
+
+
+def search_files(search_params: FileSearchRequest, db: Session) -> Tuple[Page, Optional[Dict[str, list]]]:
+    """
+    A page of files matching search_params, best match first when there is a query, and when
+    asked the facet counts of the matches. Each facet ignores its own filter so the counts show
+    what choosing another value would return.
+    """
+    matched = faceted = select(File)
+    rank = None
+    if search_params.query and search_params.query.strip():
+        matched, rank = text_match(db, matched, search_params.query, search_params.fuzzy)
+        if search_params.facets:
+            faceted, _ = text_match(db, faceted, search_params.query, search_params.fuzzy, scan_common=False)
+    query = matched.where(*_search_filters(search_params))
     
-    total = query.count()
-    files = query.order_by(File.created_at.desc()).offset(search_params.offset).limit(search_params.limit).all()
+    total, total_is_estimate = count_total(db, query, search_params.count)
+    limit = search_params.limit
+    if rank is not None and search_params.sort == 'relevance':
+        offset = decode_offset_cursor(search_params.cursor) if search_params.cursor else search_params.offset
+        rows = db.execute(
+            query.order_by(rank.desc(), File.id.desc()).offset(offset).limit(limit + 1)
+        ).scalars().all()
+        files = rows[:limit]
+        next_cursor = encode_offset_cursor(offset + limit) if len(rows) > limit else None
+    else:
+        rows = db.execute(paginate(query, File, limit, search_params.cursor, search_params.offset)).scalars().all()
+        files, next_cursor = split_page(rows, limit)
     
-    return files, total
+    facets = None
+    if search_params.facets:
+        facets = {
+            facet: facet_counts(db, faceted.where(*_search_filters(search_params, exclude=facet)), getattr(File, facet))
+            for facet in ('material', 'created_by')
+        }
+    return Page(files, next_cursor, total, total_is_estimate), facets
+
+
+def _count_deleted_file(db: Session, file_record: File, quote_ids: List[int]) -> None:
+    """Take a file and the quotes and quote notifications deleted along with it off the counters"""
+    from app.models.quote_notification_models import QuoteNotification
+
+    counter_service.adjust(db, FILES, {(file_record.created_by, TOTAL): -1, (ALL_OWNERS, TOTAL): -1})
+
+    quotes = and_(Quote.file_id == file_record.id, Quote.status.isnot(None))
+    counter_service.subtract_grouped(
+        db, MANUFACTURER_QUOTES,
+        select(Quote.created_by, Quote.status, func.count()).where(quotes).group_by(Quote.created_by, Quote.status),
+    )
+    counter_service.subtract_grouped(
+        db, BUYER_QUOTES,
+        select(literal(file_record.created_by), Quote.status, func.count()).where(quotes).group_by(Quote.status),
+    )
+
+    if quote_ids:
+        quote_notifications = QuoteNotification.quote_id.in_(quote_ids)
+        counter_service.subtract_grouped(
+            db, QUOTE_NOTIFICATIONS,
+            select(QuoteNotification.sent_to, literal(TOTAL), func.count())
+            .where(quote_notifications).group_by(QuoteNotification.sent_to),
+        )
+        counter_service.subtract_grouped(
+            db, QUOTE_NOTIFICATIONS,
+            select(QuoteNotification.sent_to, literal(UNREAD), func.count())
+            .where(quote_notifications, QuoteNotification.is_read == False).group_by(QuoteNotification.sent_to),
+        )
+
 
 
 def delete_file(object_key: str, db: Session) -> bool:
     try:
-        from app.models.quote_notification_models import QuoteNotification
+        from app.models.quote_notification_models import QuoteNotification, QuoteNotificationArchive
         
         file_record = db.query(File).filter(File.object_key == object_key).first()
         if not file_record:
             return False
         
         quote_ids = [q[0] for q in db.query(Quote.id).filter(Quote.file_id == file_record.id).all()]
+
+        _count_deleted_file(db, file_record, quote_ids)
         
         if quote_ids:
-            db.query(QuoteNotification).filter(QuoteNotification.quote_id.in_(quote_ids)).delete(synchronize_session=False)
+            deleted_quote_notifications = db.execute(
+                delete(QuoteNotification).where(QuoteNotification.quote_id.in_(quote_ids))
+                .returning(QuoteNotification.sent_to, QuoteNotification.id)
+            ).all()
+            change_service.record_rows(db, QUOTE_NOTIFICATION, deleted_quote_notifications, DELETED)
+            db.query(QuoteNotificationArchive).filter(
+                QuoteNotificationArchive.quote_id.in_(quote_ids)
+            ).delete(synchronize_session=False)
             db.flush()
         
         db.query(Quote).filter(Quote.file_id == file_record.id).delete(synchronize_session=False)
         db.flush()
         
-        db.query(Notification).filter(Notification.file_id == file_record.id).delete(synchronize_session=False)
+        # A digest of several uploads, or a notice of several rejected parts, moves on to another
+        # of its files; the notifications still showing this one go
+        detach_file(db, file_record)
+        detach_from_notices(db, file_record)
+        # Write the moves to their next files before the DELETE below matches on file_id
+        db.flush()
+        notifications = Notification.file_id == file_record.id
+        deleted_entries = delete_inbox_entries(db, notifications)
+        change_service.record_rows(db, NOTIFICATION, deleted_entries, DELETED)
+        db.execute(delete(Notification).where(notifications))
+        db.query(NotificationArchive).filter(NotificationArchive.file_id == file_record.id).delete(synchronize_session=False)
 
-        try:
-            minio_client.remove_object(MINIO_BUCKET, object_key)
-        except Exception as e:
-            print(f"Warning: Failed to delete from MinIO: {e}")
-        
         db.delete(file_record)
         db.commit()
         
+        # Only once the row is gone for good: a rolled back delete keeps its object
+        try:
+            get_storage().delete(object_key)
+            invalidate_cached(object_key)
+        except Exception as e:
+            print(f"Warning: Failed to delete from storage: {e}")
+        
         return True
     except Exception as e:
         db.rollback()
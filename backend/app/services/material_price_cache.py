@@ -0,0 +1,136 @@
+"""
+In-memory copy of the material_prices table shared by the requests of a worker.
+
+Pricing reads (calculate_quote_price, the price matrix, GET /pricing/materials/{name}) go to
+the cache instead of the database. It is loaded at startup (start) and reloaded whole on the
+first read after it is invalidated; the table is small and changes rarely.
+
+Writers call changed(db, material) in the transaction that modifies a material and
+invalidate() after it commits:
+
+- invalidate() drops this worker's copy at once, so the writer's next read sees its change
+- changed() publishes a CHANNEL event, which reaches every worker's broker after commit (through
+  pg_notify and the event listener on PostgreSQL) and makes each worker invalidate its copy
+- a periodic check compares the table's version stamp (newest updated_at, row count) with the
+  loaded one, bounding staleness when a notification is missed or a write bypasses the API
+"""
+import asyncio
+import logging
+import threading
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app import metrics
+from app.config.database import SessionLocal
+from app.config.settings import MATERIAL_PRICE_CACHE_CHECK_SECONDS
+from app.models.material_price_models import MaterialPrice
+from app.services import background_jobs, event_service
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "material_prices"
+
+_reloads = metrics.counter("material_price_cache_reloads_total", "Material price cache reloads from the database")
+
+_lock = threading.Lock()
+_materials: Optional[Dict[str, SimpleNamespace]] = None
+_version: Optional[tuple] = None
+# Bumped by every invalidation so a reload that read the table before it does not install stale rows
+_generation = 0
+
+
+def material_prices_version(db: Session) -> tuple:
+    """Version of the material list: the newest updated_at and the material count"""
+    return tuple(db.execute(select(func.max(MaterialPrice.updated_at), func.count(MaterialPrice.id))).one())
+
+
+def _snapshot(row: MaterialPrice) -> SimpleNamespace:
+    # Plain attribute copies: safe to share between threads and sessions, unlike ORM instances
+    return SimpleNamespace(**{column.key: getattr(row, column.key) for column in MaterialPrice.__table__.columns})
+
+
+def _load(db: Session) -> Dict[str, SimpleNamespace]:
+    global _materials, _version
+    with _lock:
+        generation = _generation
+    version = material_prices_version(db)
+    rows = db.execute(select(MaterialPrice)).scalars().all()
+    materials = {row.material_name: _snapshot(row) for row in rows}
+    _reloads.inc()
+    with _lock:
+        if generation == _generation:
+            _materials, _version = materials, version
+    return materials
+
+
+def _current(db: Session) -> Dict[str, SimpleNamespace]:
+    materials = _materials
+    return materials if materials is not None else _load(db)
+
+
+def get(db: Session, material_name: str) -> Optional[SimpleNamespace]:
+    """The material's pricing parameters, with the attributes of MaterialPrice"""
+    return _current(db).get(material_name)
+
+
+def get_all(db: Session) -> List[SimpleNamespace]:
+    """Every material, ordered by name"""
+    materials = _current(db)
+    return [materials[name] for name in sorted(materials)]
+
+
+def invalidate() -> None:
+    global _materials, _version, _generation
+    with _lock:
+        _materials, _version = None, None
+        _generation += 1
+
+
+def changed(db, material_name: str) -> None:
+    """Tell every worker, once db commits, that material_name was created, updated or deleted"""
+    event_service.publish(db, CHANNEL, "material_price.changed", {"material": material_name})
+
+
+def check_version() -> None:
+    """Reload if the table changed without this worker hearing about it"""
+    if _materials is None:
+        return
+    db = SessionLocal()
+    try:
+        if material_prices_version(db) != _version:
+            logger.info("Material prices changed; reloading the cache")
+            invalidate()
+            _load(db)
+    finally:
+        db.close()
+
+
+async def _follow(queue: asyncio.Queue) -> None:
+    while True:
+        # Any message, including a resync after an overflow, means the copy may be stale
+        await queue.get()
+        invalidate()
+
+
+def start() -> Optional[asyncio.Task]:
+    """Load the cache in the background and keep it in step with other workers' writes"""
+    queue = event_service.broker.subscribe([CHANNEL])
+    background_jobs.schedule_periodic(
+        "material-price-cache-check", check_version, MATERIAL_PRICE_CACHE_CHECK_SECONDS
+    )
+
+    async def warm():
+        db = SessionLocal()
+        try:
+            await run_in_threadpool(_load, db)
+        except Exception as e:
+            logger.error(f"Material price cache warm-up failed: {e}")
+        finally:
+            db.close()
+        await _follow(queue)
+
+    return asyncio.create_task(warm(), name="material-price-cache")
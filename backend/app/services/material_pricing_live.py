@@ -1,3 +1,5 @@
+import logging
+import threading
 from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Optional
 
@@ -7,6 +9,8 @@ from app.config.settings import (
     DEFAULT_MACHINE_COST_INR,
 )
 
+logger = logging.getLogger(__name__)
+
 BASE_INR_PRICES_PER_KG: Dict[str, float] = {
     "Steel": 55.00,
     "Aluminum": 225.00,
@@ -23,27 +27,20 @@ DEFAULT_MIN_ORDER: Dict[str, int] = {
     "Brass": 15,
 }
 
+# The full payload for every material; requests filter it. Once it expires it is still served
+# while one background refresh replaces it (stale-while-revalidate).
 _cache: Dict[str, Optional[object]] = {
     "expires_at": None,
     "payload": None,
+    "refreshing": False,
 }
+_lock = threading.Lock()
 
 
-def get_live_material_costs(materials: Optional[List[str]] = None) -> Dict[str, object]:
+def _build_payload() -> Dict[str, object]:
     now = datetime.now(timezone.utc)
-    expires_at = _cache.get("expires_at")
-    payload = _cache.get("payload")
-
-    if payload and isinstance(expires_at, datetime) and now < expires_at:
-        if materials:
-            filtered_items = [item for item in payload["items"] if item["material"] in materials]
-            return {**payload, "items": filtered_items}
-        return payload
-
     items = []
     for index, (material, inr_price) in enumerate(BASE_INR_PRICES_PER_KG.items(), start=1):
-        if materials and material not in materials:
-            continue
         items.append({
             "id": index,
             "material": material,
@@ -53,14 +50,52 @@ def get_live_material_costs(materials: Optional[List[str]] = None) -> Dict[str,
             "minimumOrder": DEFAULT_MIN_ORDER.get(material, 10),
         })
 
-    payload = {
+    return {
         "updated_at": now.isoformat(),
         "source": "indian-market-rates",
         "currency": "INR",
         "items": items,
     }
 
-    _cache["payload"] = payload
-    _cache["expires_at"] = now + timedelta(minutes=MATERIAL_PRICE_CACHE_MINUTES)
 
+def _refresh() -> Dict[str, object]:
+    try:
+        payload = _build_payload()
+        with _lock:
+            _cache["payload"] = payload
+            _cache["expires_at"] = datetime.now(timezone.utc) + timedelta(minutes=MATERIAL_PRICE_CACHE_MINUTES)
+        return payload
+    finally:
+        with _lock:
+            _cache["refreshing"] = False
+
+
+def _revalidate() -> None:
+    try:
+        _refresh()
+    except Exception as e:
+        # The stale payload keeps being served; the next request retries
+        logger.error(f"Live material cost refresh failed: {e}")
+
+
+def get_live_material_costs(materials: Optional[List[str]] = None) -> Dict[str, object]:
+    now = datetime.now(timezone.utc)
+    with _lock:
+        payload = _cache.get("payload")
+        expires_at = _cache.get("expires_at")
+        revalidate = (
+            payload is not None and isinstance(expires_at, datetime) and now >= expires_at
+            and not _cache["refreshing"]
+        )
+        if revalidate:
+            _cache["refreshing"] = True
+
+    if payload is None:
+        payload = _refresh()
+    elif revalidate:
+        threading.Thread(target=_revalidate, name="live-material-costs", daemon=True).start()
+
+    if materials:
+        filtered_items = [item for item in payload["items"] if item["material"] in materials]
+        return {**payload, "items": filtered_items}
     return payload
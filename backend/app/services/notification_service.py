@@ -1,14 +1,45 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from typing import Optional, List
-from datetime import datetime
-from app.models.notification_models import Notification
+from sqlalchemy.orm import Session, contains_eager
+from sqlalchemy import Select, delete, func, insert, literal, null, or_, select, update
+from typing import Dict, Optional, List, Tuple
+from collections import defaultdict
+from datetime import datetime, timedelta
+from app.config.settings import NOTIFICATION_DIGEST_WINDOW_SECONDS
+from app.models.notification_models import Notification, NotificationChange, NotificationFile, NotificationInbox
 from app.models.file_models import File
+from app.models.user_models import User
+from app.services import change_service, counter_service, event_service, outbox_service
+from app.services.change_service import CREATED, DELETED, NOTIFICATION, QUOTE_NOTIFICATION, UPDATED
+from app.services.pagination import Page, paginate, split_page
+from app.services.counter_service import NOTIFICATIONS, QUOTE_NOTIFICATIONS, TOTAL, UNREAD
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def part_name_for(filename: str) -> str:
+    """Name a notification shows for an uploaded file"""
+    return filename.replace('.stp', '').replace('.step', '').replace('.igs', '').replace('.iges', '')
+
+
+def _manufacturers() -> Select:
+    return select(User.username).where(User.role == "manufacturer", User.is_active == True)
+
+
+def _add_entries(db: Session, source: Select) -> List[tuple]:
+    """Insert unread inbox entries from (recipient, notification_id, created_at) rows; returns them as (recipient, id)"""
+    entries = db.execute(
+        insert(NotificationInbox)
+        .from_select(["recipient", "notification_id", "created_at", "read_at"], source)
+        .returning(NotificationInbox.recipient, NotificationInbox.notification_id)
+    ).all()
+    deltas = {}
+    for recipient, _ in entries:
+        deltas[(recipient, TOTAL)] = deltas.get((recipient, TOTAL), 0) + 1
+        deltas[(recipient, UNREAD)] = deltas.get((recipient, UNREAD), 0) + 1
+    counter_service.adjust(db, NOTIFICATIONS, deltas)
+    return entries
+
+
 def create_notification(
     db: Session,
     file_id: int,
@@ -18,8 +49,14 @@ def create_notification(
     part_number: Optional[str],
     quantity_unit: Optional[str],
     description: Optional[str],
+    created_by: Optional[str] = None,
+    rfq_id: Optional[str] = None,
+    child_count: int = 1,
 ) -> Notification:
-    """Create a new notification for manufacturer when buyer uploads file"""
+    """
+    Add a notification to db's transaction with an unread inbox entry for every active
+    manufacturer; the outbox dispatcher commits it
+    """
     notification = Notification(
         file_id=file_id,
         object_key=object_key,
@@ -28,62 +65,382 @@ def create_notification(
         part_number=part_number,
         quantity_unit=quantity_unit,
         description=description,
-        is_read=False,
+        created_by=created_by,
+        rfq_id=rfq_id,
+        child_count=child_count,
     )
     db.add(notification)
-    db.commit()
-    db.refresh(notification)
-    logger.info(f"Created notification for file_id: {file_id}")
+    db.flush()
+    entries = _add_entries(
+        db, _manufacturers().add_columns(literal(notification.id), literal(notification.created_at), null())
+    )
+    change_service.record_rows(db, NOTIFICATION, entries, CREATED)
+    event_service.publish(
+        db, event_service.MANUFACTURERS, "notification.created",
+        {"id": notification.id, "file_id": file_id, "part_name": part_name, "child_count": child_count},
+    )
+    logger.info(f"Created notification for file_id: {file_id} for {len(entries)} recipients")
     return notification
 
 
+def _open_digest(db: Session, buyer: Optional[str], rfq_id: Optional[str]) -> Optional[Notification]:
+    """
+    buyer's notification for rfq_id still taking uploads, if any, locked so that dispatchers add
+    to it one at a time. Uploads outside an RFQ are unrelated and never share a digest.
+    """
+    if buyer is None or rfq_id is None or NOTIFICATION_DIGEST_WINDOW_SECONDS <= 0:
+        return None
+    opened_after = datetime.utcnow() - timedelta(seconds=NOTIFICATION_DIGEST_WINDOW_SECONDS)
+    return db.execute(
+        select(Notification)
+        .where(
+            Notification.created_by == buyer,
+            Notification.rfq_id == rfq_id,
+            Notification.created_at >= opened_after,
+        )
+        .order_by(Notification.created_at.desc())
+        .limit(1)
+        .with_for_update()
+    ).scalars().first()
+
+
+def _entries_of(db: Session, notification_id: int) -> List[tuple]:
+    return db.execute(
+        select(NotificationInbox.recipient, NotificationInbox.notification_id)
+        .where(NotificationInbox.notification_id == notification_id)
+    ).all()
+
+
+def _add_to_digest(db: Session, digest: Notification, count: int) -> None:
+    """Count count more uploads in digest and put it back, unread, in every manufacturer's inbox"""
+    digest.child_count += count
+    reopened = db.execute(
+        update(NotificationInbox)
+        .where(NotificationInbox.notification_id == digest.id, NotificationInbox.read_at.isnot(None))
+        .values(read_at=None)
+        .returning(NotificationInbox.recipient)
+    ).scalars().all()
+    counter_service.adjust(db, NOTIFICATIONS, {(recipient, UNREAD): 1 for recipient in reopened})
+    change_service.record_rows(db, NOTIFICATION, _entries_of(db, digest.id), UPDATED)
+    # Manufacturers who had deleted it, or joined since it was created, get it again
+    missing = ~select(NotificationInbox.notification_id).where(
+        NotificationInbox.recipient == User.username, NotificationInbox.notification_id == digest.id
+    ).exists()
+    added = _add_entries(
+        db, _manufacturers().where(missing).add_columns(literal(digest.id), literal(digest.created_at), null())
+    )
+    change_service.record_rows(db, NOTIFICATION, added, CREATED)
+    event_service.publish(
+        db, event_service.MANUFACTURERS, "notification.updated",
+        {"id": digest.id, "file_id": digest.file_id, "part_name": digest.part_name, "child_count": digest.child_count},
+    )
+
+
+@outbox_service.handler(outbox_service.NOTIFICATION_CREATE, batch=True)
+def _create_notifications_from_outbox(db: Session, payloads: List[dict]) -> None:
+    """
+    Announce a batch of uploads. A buyer's uploads to an RFQ go into their open digest for it,
+    or into a new notification that stays open for NOTIFICATION_DIGEST_WINDOW_SECONDS, so a
+    burst of uploads costs one notification and one inbox entry per manufacturer.
+    """
+    uploaders = {
+        file_id: (buyer, rfq_id)
+        for file_id, buyer, rfq_id in db.execute(
+            select(File.id, File.created_by, File.rfq_id)
+            .where(File.id.in_([payload["file_id"] for payload in payloads]))
+        )
+    }
+    bursts: Dict[tuple, List[dict]] = defaultdict(list)
+    for position, payload in enumerate(payloads):
+        file_id = payload["file_id"]
+        if file_id not in uploaders:
+            logger.info(f"Skipped notification for deleted file_id: {file_id}")
+            continue
+        buyer, rfq_id = uploaders[file_id]
+        if (
+            payload.get("upload", True) and buyer is not None and rfq_id is not None
+            and NOTIFICATION_DIGEST_WINDOW_SECONDS > 0
+        ):
+            bursts[(buyer, rfq_id)].append(payload)
+        else:
+            # Other notices (such as quote rejections), uploads without a buyer or outside an RFQ,
+            # and every upload while digests are turned off stand alone
+            bursts[(buyer, rfq_id, position)].append(payload)
+
+    for key, burst in bursts.items():
+        buyer, rfq_id = key[:2]
+        uploads = [payload["file_id"] for payload in burst if payload.get("upload", True)]
+        digest = _open_digest(db, buyer, rfq_id) if len(key) == 2 else None
+        if digest is None:
+            # A notice may carry its own rfq_id and child_count, as one for a batch of rejections does
+            fields = {"rfq_id": rfq_id, "child_count": len(burst), **burst[0]}
+            fields.pop("upload", None)
+            listed = fields.pop("file_ids", None) or [fields["file_id"]]
+            digest = create_notification(
+                # Only upload notifications name the buyer, so only they are found as open digests
+                db, **fields, created_by=buyer if uploads else None
+            )
+            if not uploads:
+                db.execute(insert(NotificationFile), [
+                    {"notification_id": digest.id, "file_id": file_id} for file_id in listed
+                ])
+        else:
+            _add_to_digest(db, digest, len(burst))
+        if uploads:
+            db.execute(
+                update(File)
+                .where(File.id.in_(uploads))
+                # Bookkeeping, not an edit: keep updated_at, which versions the file list
+                .values(notification_id=digest.id, updated_at=File.updated_at)
+            )
+
+
+def detach_file(db: Session, file: File) -> bool:
+    """
+    Take a file that is being deleted out of the digest announcing it, which then shows the
+    next of its files if it showed this one. False when the digest announces only this file
+    (or has been archived) and should be deleted along with it.
+    """
+    if file.notification_id is None:
+        return False
+    digest = db.execute(
+        select(Notification).where(Notification.id == file.notification_id).with_for_update()
+    ).scalars().first()
+    if digest is None or digest.child_count <= 1:
+        return False
+    if digest.file_id == file.id:
+        successor = db.execute(
+            select(File).where(File.notification_id == digest.id, File.id != file.id)
+            .order_by(File.created_at, File.id).limit(1)
+        ).scalars().first()
+        if successor is None:
+            return False
+        _show_file(digest, successor)
+        digest.description = successor.description
+    digest.child_count -= 1
+    change_service.record_rows(db, NOTIFICATION, _entries_of(db, digest.id), UPDATED)
+    return True
+
+
+def _show_file(notification: Notification, file: File) -> None:
+    notification.file_id = file.id
+    notification.object_key = file.object_key
+    notification.part_name = part_name_for(file.original_name)
+    notification.material = file.material
+    notification.part_number = file.part_number
+    notification.quantity_unit = file.quantity_unit
+
+
+def rejection_description(count: int) -> str:
+    return "Quote rejected by buyer" if count == 1 else f"{count} parts rejected by buyer"
+
+
+def detach_from_notices(db: Session, file: File) -> None:
+    """
+    Take a file that is being deleted off the notices listing it in notification_files, as
+    detach_file does for digests. Notices listing only this file are left to be deleted with it.
+    """
+    notices = db.execute(
+        select(Notification)
+        .join(NotificationFile, NotificationFile.notification_id == Notification.id)
+        .where(NotificationFile.file_id == file.id)
+        .with_for_update(of=Notification)
+    ).scalars().all()
+    for notice in notices:
+        if notice.child_count <= 1:
+            continue
+        if notice.file_id == file.id:
+            successor = db.execute(
+                select(File)
+                .join(NotificationFile, NotificationFile.file_id == File.id)
+                .where(NotificationFile.notification_id == notice.id, File.id != file.id)
+                .order_by(File.created_at, File.id).limit(1)
+            ).scalars().first()
+            if successor is None:
+                continue
+            _show_file(notice, successor)
+        notice.child_count -= 1
+        notice.description = rejection_description(notice.child_count)
+        change_service.record_rows(db, NOTIFICATION, _entries_of(db, notice.id), UPDATED)
+    db.execute(delete(NotificationFile).where(NotificationFile.file_id == file.id))
+
+
+def add_recipient(db: Session, username: str) -> int:
+    """Give a new manufacturer unread entries for the notifications already in the table"""
+    entries = _add_entries(
+        db,
+        select(literal(username), Notification.id, Notification.created_at, null()).where(
+            ~select(NotificationInbox.notification_id).where(
+                NotificationInbox.recipient == username, NotificationInbox.notification_id == Notification.id
+            ).exists()
+        ),
+    )
+    db.commit()
+    return len(entries)
+
+
 def get_notifications(
     db: Session,
+    recipient: str,
     limit: int = 50,
     offset: int = 0,
     unread_only: bool = False,
-) -> tuple[int, int, List[Notification]]:
-    """Get notifications for manufacturer"""
-    query = db.query(Notification).order_by(desc(Notification.created_at))
+    cursor: Optional[str] = None,
+) -> tuple[Page, int]:
+    """
+    Get a page of recipient's inbox entries, each with its notification loaded, and their
+    unread count
+    """
+    query = select(NotificationInbox).where(NotificationInbox.recipient == recipient)
 
     if unread_only:
-        query = query.filter(Notification.is_read == False)
+        query = query.where(NotificationInbox.read_at.is_(None))
 
-    total = query.count()
-    unread_count = db.query(Notification).filter(Notification.is_read == False).count()
+    counts = counter_service.get_counts(db, NOTIFICATIONS, recipient)
+    unread_count = counts.get(UNREAD, 0)
+    total = unread_count if unread_only else counts.get(TOTAL, 0)
 
-    notifications = query.offset(offset).limit(limit).all()
-    return total, unread_count, notifications
+    rows = db.execute(paginate(query, NotificationInbox, limit, cursor, offset)).scalars().all()
+    entries, next_cursor = split_page(rows, limit)
+    return Page(entries, next_cursor, total), unread_count
 
 
-def mark_as_read(db: Session, notification_id: int) -> bool:
-    """Mark notification as read"""
-    notification = db.query(Notification).filter(Notification.id == notification_id).first()
-    if not notification:
-        return False
+def notifications_version(db: Session, recipient: str) -> Tuple[int, Optional[int]]:
+    """
+    Version of recipient's notification list: the number of their change-log rows and the highest
+    sequence among them. Every write to the list logs a row, and the count also moves when a
+    change with a lower sequence commits after a higher one, which the highest alone would miss.
+    """
+    return tuple(db.execute(
+        select(func.count(), func.max(NotificationChange.sequence)).where(NotificationChange.owner == recipient)
+    ).one())
 
-    notification.is_read = True
-    notification.updated_at = datetime.utcnow()
-    db.commit()
-    logger.info(f"Marked notification {notification_id} as read")
-    return True
 
+def get_notification_changes(db: Session, since: Optional[int], current_user: dict) -> dict:
+    """
+    NotificationChangesResponse fields for current_user: manufacturers follow their notification
+    inbox, buyers their quote notifications
+    """
+    owner = current_user["username"]
+    scope = NOTIFICATIONS if current_user["role"] == "manufacturer" else QUOTE_NOTIFICATIONS
+    cursor, reset, changes = change_service.get_changes(db, since, [owner])
+    return {
+        "cursor": cursor,
+        "reset": reset,
+        "unread_count": counter_service.get_count(db, scope, owner, UNREAD),
+        "notifications": changes.get(NOTIFICATION, {}),
+        "quote_notifications": changes.get(QUOTE_NOTIFICATION, {}),
+    }
 
-def mark_all_as_read(db: Session) -> int:
-    """Mark all unread notifications as read"""
-    count = db.query(Notification).filter(Notification.is_read == False).update(
-        {"is_read": True, "updated_at": datetime.utcnow()}
+
+def mark_read(db: Session, recipient: str, notification_ids: Optional[List[int]] = None) -> List[int]:
+    """
+    Mark recipient's unread entries for notification_ids, or all of them, as read in one UPDATE.
+    Returns the ids this call marked, so the unread counter moves exactly once per entry.
+    """
+    query = update(NotificationInbox).where(
+        NotificationInbox.recipient == recipient, NotificationInbox.read_at.is_(None)
     )
+    if notification_ids is not None:
+        query = query.where(NotificationInbox.notification_id.in_(notification_ids))
+    ids = db.execute(
+        query.values(read_at=datetime.utcnow()).returning(NotificationInbox.notification_id)
+    ).scalars().all()
+    if ids:
+        counter_service.increment(db, NOTIFICATIONS, recipient, UNREAD, -len(ids))
+        change_service.record(db, NOTIFICATION, recipient, ids, UPDATED)
+    db.commit()
+    logger.info(f"Marked {len(ids)} notifications as read for {recipient}")
+    return ids
+
+
+def mark_as_read(db: Session, recipient: str, notification_id: int) -> bool:
+    """Mark one notification as read for recipient; False if it is not in their inbox"""
+    if mark_read(db, recipient, [notification_id]):
+        return True
+    return db.get(NotificationInbox, (recipient, notification_id)) is not None
+
+
+def mark_all_as_read(db: Session, recipient: str) -> int:
+    """Mark all of recipient's unread notifications as read"""
+    return len(mark_read(db, recipient))
+
+
+def delete_notifications(db: Session, recipient: str, notification_ids: Optional[List[int]] = None) -> int:
+    """
+    Remove recipient's entries for notification_ids, or all of them, in one DELETE. Other
+    recipients keep theirs; the retention job archives notifications nobody has unread.
+    """
+    query = delete(NotificationInbox).where(NotificationInbox.recipient == recipient)
+    if notification_ids is not None:
+        query = query.where(NotificationInbox.notification_id.in_(notification_ids))
+    deleted = db.execute(
+        query.returning(NotificationInbox.notification_id, NotificationInbox.read_at)
+    ).all()
+    unread = sum(1 for _, read_at in deleted if read_at is None)
+    counter_service.adjust(db, NOTIFICATIONS, {(recipient, TOTAL): -len(deleted), (recipient, UNREAD): -unread})
+    change_service.record(db, NOTIFICATION, recipient, [notification_id for notification_id, _ in deleted], DELETED)
     db.commit()
-    logger.info(f"Marked {count} notifications as read")
-    return count
+    logger.info(f"Deleted {len(deleted)} notifications for {recipient}")
+    return len(deleted)
+
+
+def delete_notification(db: Session, recipient: str, notification_id: int) -> bool:
+    """Delete a notification from recipient's inbox"""
+    return delete_notifications(db, recipient, [notification_id]) > 0
 
 
-def get_notification_with_file(db: Session, notification_id: int) -> Optional[tuple[Notification, File]]:
-    """Get notification with associated file details"""
-    notification = db.query(Notification).filter(Notification.id == notification_id).first()
-    if not notification:
+def clear_notifications(db: Session, recipient: str) -> int:
+    """Delete every notification in recipient's inbox"""
+    return delete_notifications(db, recipient)
+
+
+def get_notification_with_file(
+    db: Session, recipient: str, notification_id: int
+) -> Optional[tuple[NotificationInbox, Optional[File]]]:
+    """Get recipient's entry for a notification, with the notification and its file, in one query"""
+    return db.execute(
+        select(NotificationInbox, File)
+        .join(NotificationInbox.notification)
+        .outerjoin(File, File.id == Notification.file_id)
+        .options(contains_eager(NotificationInbox.notification))
+        .where(NotificationInbox.recipient == recipient, NotificationInbox.notification_id == notification_id)
+    ).first()
+
+
+def get_notification_files(
+    db: Session, recipient: str, notification_id: int, limit: int = 100, cursor: Optional[str] = None
+) -> Optional[Page]:
+    """A page of the files a notification in recipient's inbox announces; None if it is not there"""
+    entry = db.get(NotificationInbox, (recipient, notification_id))
+    if entry is None:
         return None
+    listed = select(NotificationFile.file_id).where(NotificationFile.notification_id == notification_id)
+    rows = db.execute(paginate(
+        select(File).where(or_(File.notification_id == notification_id, File.id.in_(listed))), File, limit, cursor
+    )).scalars().all()
+    files, next_cursor = split_page(rows, limit)
+    return Page(files, next_cursor, entry.notification.child_count)
 
-    file = db.query(File).filter(File.id == notification.file_id).first()
-    return notification, file
+
+def delete_inbox_entries(db: Session, notifications) -> List[tuple]:
+    """
+    Delete the inbox entries of the notifications matching the notifications condition, taking
+    them off their recipients' counters; returns the (recipient, id) rows for the change log
+    """
+    entries = NotificationInbox.notification_id.in_(select(Notification.id).where(notifications))
+    counter_service.subtract_grouped(
+        db, NOTIFICATIONS,
+        select(NotificationInbox.recipient, literal(TOTAL), func.count()).where(entries)
+        .group_by(NotificationInbox.recipient),
+    )
+    counter_service.subtract_grouped(
+        db, NOTIFICATIONS,
+        select(NotificationInbox.recipient, literal(UNREAD), func.count())
+        .where(entries, NotificationInbox.read_at.is_(None))
+        .group_by(NotificationInbox.recipient),
+    )
+    return db.execute(
+        delete(NotificationInbox).where(entries)
+        .returning(NotificationInbox.recipient, NotificationInbox.notification_id)
+    ).all()
@@ -5,9 +5,8 @@ from typing import Tuple
 
 from sqlalchemy.orm import Session
 
-from app.config.settings import MINIO_BUCKET
 from app.models.file_models import File
-from app.storage.minio_client import minio_client, ensure_bucket
+from app.storage.factory import get_storage, local_copy
 
 
 def _mesh_object_key(object_key: str) -> str:
@@ -20,17 +19,12 @@ def generate_mesh_url(object_key: str, db: Session) -> Tuple[str, str]:
     if not file_record:
         raise ValueError(f"STP file not found in database: {object_key}")
 
-    ensure_bucket()
+    storage = get_storage()
     mesh_key = _mesh_object_key(object_key)
 
     try:
-        minio_client.stat_object(MINIO_BUCKET, mesh_key)
-        mesh_url = minio_client.presigned_get_object(
-            MINIO_BUCKET,
-            mesh_key,
-            expires=timedelta(hours=1)
-        )
-        return mesh_url, mesh_key
+        if storage.exists(mesh_key):
+            return storage.presign_get(mesh_key, expires=timedelta(hours=1)), mesh_key
     except Exception:
         pass
 
@@ -39,14 +33,8 @@ def generate_mesh_url(object_key: str, db: Session) -> Tuple[str, str]:
         stl_path = os.path.join(tmpdir, "mesh.stl")
         glb_path = os.path.join(tmpdir, "mesh.glb")
 
-        # Download the STEP file from MinIO
-        response = minio_client.get_object(MINIO_BUCKET, object_key)
-        try:
-            with open(step_path, "wb") as handle:
-                handle.write(response.read())
-        finally:
-            response.close()
-            response.release_conn()
+        # Resolve a local copy of the STEP file: the stored file, a cache entry or a fresh download
+        step_path = local_copy(object_key, step_path)
 
         try:
             # Use OpenCascade to convert STEP to STL
@@ -163,18 +151,8 @@ convertStepToStl().catch(console.error);
         with open(glb_path, "wb") as handle:
             handle.write(glb_bytes)
 
-        # Upload GLB to MinIO
-        minio_client.fput_object(
-            MINIO_BUCKET,
-            mesh_key,
-            glb_path,
-            content_type="model/gltf-binary"
-        )
-
-        mesh_url = minio_client.presigned_get_object(
-            MINIO_BUCKET,
-            mesh_key,
-            expires=timedelta(hours=1)
-        )
+        # Upload GLB to object storage
+        storage.put_file(mesh_key, glb_path, content_type="model/gltf-binary")
+        mesh_url = storage.presign_get(mesh_key, expires=timedelta(hours=1))
 
     return mesh_url, mesh_key
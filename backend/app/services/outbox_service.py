@@ -0,0 +1,211 @@
+"""
+Transactional outbox.
+
+A request that causes a side effect, such as a manufacturer notification for an upload, calls
+enqueue(db, topic, payload) before its single commit, so the message exists exactly when the
+change does. The dispatcher (start_dispatcher) drains the outbox in batches: each batch is one
+transaction that claims messages with FOR UPDATE SKIP LOCKED, so every worker can run a
+dispatcher, runs the handler registered for each topic and deletes the messages. Handlers
+write in that transaction and push events with event_service.publish, which go out on its
+commit. A handler registered with batch=True gets the payloads of all the batch's messages of
+its topic in one call, so it can merge them.
+
+A batch that fails is retried one message per transaction, so a bad message does not hold
+back the others. A message whose handler keeps failing is retried with backoff and parked with
+failed_at set after OUTBOX_MAX_ATTEMPTS.
+
+A commit that enqueued messages wakes this process's dispatcher at once; messages written by
+other workers are picked up within OUTBOX_POLL_SECONDS.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import delete, event, insert, select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app import metrics
+from app.config.database import SessionLocal
+from app.config.settings import OUTBOX_BATCH_SIZE, OUTBOX_MAX_ATTEMPTS, OUTBOX_POLL_SECONDS
+from app.models.outbox_models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+# Topics
+NOTIFICATION_CREATE = "notification.create"
+
+ENQUEUED = "outbox_enqueued"
+
+Handler = Callable[[Session, dict], None]
+BatchHandler = Callable[[Session, List[dict]], None]
+_handlers: Dict[str, Handler] = {}
+_batch_handlers: Dict[str, BatchHandler] = {}
+
+_dispatched = metrics.counter("outbox_dispatched_total", "Outbox messages handled")
+_failures = metrics.counter("outbox_failures_total", "Outbox message attempts that failed")
+
+_wakeup: Optional[asyncio.Event] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def handler(topic: str, batch: bool = False) -> Callable:
+    """
+    Register the function that carries out messages of topic, in the dispatcher's transaction;
+    with batch, it takes the list of payloads claimed together
+    """
+    def register(func):
+        (_batch_handlers if batch else _handlers)[topic] = func
+        return func
+    return register
+
+
+def enqueue(db, topic: str, payload: dict) -> None:
+    """Add a message to db's (a Session or AsyncSession) transaction"""
+    db.add(OutboxMessage(topic=topic, payload=payload))
+    getattr(db, "sync_session", db).info[ENQUEUED] = True
+
+
+def enqueue_many(db: Session, topic: str, payloads: List[dict]) -> None:
+    """Add a message per payload to db's transaction in one INSERT"""
+    if not payloads:
+        return
+    now = datetime.utcnow()
+    db.execute(insert(OutboxMessage), [
+        {"topic": topic, "payload": payload, "attempts": 0, "available_at": now, "created_at": now}
+        for payload in payloads
+    ])
+    db.info[ENQUEUED] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_dispatcher(session):
+    if session.info.pop(ENQUEUED, False) and _loop is not None:
+        try:
+            _loop.call_soon_threadsafe(_wakeup.set)
+        except RuntimeError:
+            pass  # loop closed at shutdown
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_enqueued(session):
+    session.info.pop(ENQUEUED, None)
+
+
+def _claim(db: Session, limit: int, ids: Optional[List[int]] = None) -> List[OutboxMessage]:
+    query = select(OutboxMessage).where(
+        OutboxMessage.failed_at.is_(None), OutboxMessage.available_at <= datetime.utcnow()
+    )
+    if ids is not None:
+        query = query.where(OutboxMessage.id.in_(ids))
+    return db.execute(
+        query.order_by(OutboxMessage.available_at, OutboxMessage.id).limit(limit).with_for_update(skip_locked=True)
+    ).scalars().all()
+
+
+def _handle(db: Session, messages: List[OutboxMessage]) -> None:
+    batches: Dict[str, List[dict]] = {}
+    for message in messages:
+        if message.topic in _batch_handlers:
+            batches.setdefault(message.topic, []).append(message.payload)
+        elif message.topic in _handlers:
+            _handlers[message.topic](db, message.payload)
+        else:
+            raise LookupError(f"No outbox handler for topic '{message.topic}'")
+    for topic, payloads in batches.items():
+        _batch_handlers[topic](db, payloads)
+
+
+def _record_failure(db: Session, message_id: int, error: Exception) -> None:
+    message = db.get(OutboxMessage, message_id)
+    if message is None:
+        return
+    message.attempts += 1
+    message.last_error = str(error)[:2000]
+    _failures.inc(topic=message.topic)
+    if message.attempts >= OUTBOX_MAX_ATTEMPTS:
+        message.failed_at = datetime.utcnow()
+        logger.error(f"Outbox message {message.id} ({message.topic}) failed {message.attempts} times: {error}")
+    else:
+        message.available_at = datetime.utcnow() + timedelta(seconds=min(2 ** message.attempts, 600))
+        logger.warning(f"Outbox message {message.id} ({message.topic}) failed, will retry: {error}")
+    db.commit()
+
+
+def _dispatch_one(db: Session, message_id: int) -> int:
+    messages = _claim(db, 1, [message_id])
+    if not messages:
+        db.rollback()
+        return 0
+    message = messages[0]
+    topic = message.topic
+    try:
+        _handle(db, [message])
+        db.delete(message)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        _record_failure(db, message_id, e)
+        return 0
+    _dispatched.inc(topic=topic)
+    return 1
+
+
+def dispatch_batch(db: Session, batch_size: int = OUTBOX_BATCH_SIZE) -> int:
+    """Carry out up to batch_size due messages; returns how many were claimed"""
+    messages = _claim(db, batch_size)
+    if not messages:
+        db.rollback()
+        return 0
+    ids = [message.id for message in messages]
+    topics = [message.topic for message in messages]
+    try:
+        _handle(db, messages)
+        db.execute(delete(OutboxMessage).where(OutboxMessage.id.in_(ids)))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Outbox batch of {len(ids)} failed ({e}); retrying one at a time")
+        for message_id in ids:
+            _dispatch_one(db, message_id)
+        return len(ids)
+    for topic in topics:
+        _dispatched.inc(topic=topic)
+    return len(ids)
+
+
+def dispatch_pending() -> int:
+    """Drain every due message; the dispatcher's unit of work"""
+    db = SessionLocal()
+    total = 0
+    try:
+        while True:
+            claimed = dispatch_batch(db)
+            total += claimed
+            if claimed < OUTBOX_BATCH_SIZE:
+                return total
+    finally:
+        db.close()
+
+
+async def _run() -> None:
+    while True:
+        try:
+            await asyncio.wait_for(_wakeup.wait(), OUTBOX_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
+        try:
+            await run_in_threadpool(dispatch_pending)
+        except Exception as e:
+            logger.error(f"Outbox dispatcher failed: {e}")
+
+
+def start_dispatcher() -> asyncio.Task:
+    """Run the dispatcher on the current event loop, starting with whatever is already queued"""
+    global _wakeup, _loop
+    _loop = asyncio.get_running_loop()
+    _wakeup = asyncio.Event()
+    _wakeup.set()
+    return asyncio.create_task(_run(), name="outbox-dispatcher")
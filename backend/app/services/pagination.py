@@ -0,0 +1,110 @@
+"""
+Keyset (cursor) pagination, newest first, on (created_at, id).
+
+A cursor is an opaque token naming the last row of the previous page, so each page is an index
+range scan from that position: cost does not grow with depth, and rows inserted while a client
+pages through do not shift later pages. Lists are backed by composite (..., created_at, id)
+indexes declared on the models.
+"""
+import base64
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple, TypeVar
+
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.orm import Session
+
+T = TypeVar("T")
+
+COUNT_EXACT = "exact"
+COUNT_ESTIMATE = "estimate"
+COUNT_NONE = "none"
+COUNT_MODES = (COUNT_EXACT, COUNT_ESTIMATE, COUNT_NONE)
+# Estimated totals count at most this many rows; larger results are reported as a lower bound
+ESTIMATE_CAP = 1000
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+@dataclass
+class Page:
+    items: list = field(default_factory=list)
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+    total_is_estimate: bool = False
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    payload = json.dumps([created_at.isoformat(), row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError("Invalid pagination cursor") from e
+
+
+def encode_offset_cursor(offset: int) -> str:
+    """Cursor for orders without a stable key, such as search relevance, which page by offset"""
+    payload = json.dumps({"offset": offset}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_offset_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        offset = int(json.loads(base64.urlsafe_b64decode(padded))["offset"])
+    except (ValueError, TypeError, KeyError) as e:
+        raise InvalidCursorError("Invalid pagination cursor") from e
+    if offset < 0:
+        raise InvalidCursorError("Invalid pagination cursor")
+    return offset
+
+
+def paginate(query, model, limit: int, cursor: Optional[str] = None, offset: int = 0):
+    """
+    Order query newest first and restrict it to the page after cursor. One row beyond limit is
+    fetched so split_page can tell whether another page follows. offset is only honoured for
+    clients still paging by offset.
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.where(tuple_(model.created_at, model.id) < tuple_(created_at, row_id))
+    elif offset:
+        query = query.offset(offset)
+    return query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1)
+
+
+def split_page(rows: Sequence[T], limit: int) -> Tuple[List[T], Optional[str]]:
+    """The rows of a page from paginate() and the cursor of the next page, if there is one"""
+    rows = list(rows)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last.created_at, last.id)
+
+
+def count_total(db: Session, query, mode: str = COUNT_ESTIMATE) -> Tuple[Optional[int], bool]:
+    """
+    Total rows of query as (total, is_estimate). "estimate" stops counting at ESTIMATE_CAP so the
+    cost is bounded however large the result; past the cap the total is a lower bound.
+    """
+    if mode == COUNT_NONE:
+        return None, False
+    statement = query.statement if hasattr(query, "statement") else query
+    statement = statement.order_by(None)
+    if mode == COUNT_EXACT:
+        return db.execute(select(func.count()).select_from(statement.subquery())).scalar_one(), False
+    capped = statement.limit(ESTIMATE_CAP + 1).subquery()
+    total = db.execute(select(func.count()).select_from(capped)).scalar_one()
+    if total > ESTIMATE_CAP:
+        return ESTIMATE_CAP, True
+    return total, False
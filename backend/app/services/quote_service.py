@@ -1,206 +1,470 @@
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple, Union
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, insert, literal, select, delete, update, Select
 from app.models.quote_models import Quote, QuoteCreate, QuoteResponse
 from app.models.file_models import File
-from app.models.quote_notification_models import QuoteNotification
+from app.models.quote_notification_models import QuoteNotification, QuoteNotificationArchive
+from app.services import change_service, counter_service, event_service, outbox_service
+from app.services.change_service import CREATED, DELETED, QUOTE_NOTIFICATION, UPDATED
+from app.services.counter_service import BUYER_QUOTES, MANUFACTURER_QUOTES, QUOTE_NOTIFICATIONS, TOTAL, UNREAD
+from app.services.quote_stats_service import (
+    StatusCounts,
+    page_with_counts_query,
+    split_page_with_counts,
+    status_counts_query,
+    summarize_status_counts,
+)
+from app.services.notification_service import rejection_description
+from app.services.pagination import Page, paginate, split_page
+from app.config.settings import QUOTE_COUNTS_WINDOW
 from datetime import datetime
 
-class QuoteService:
-
-    @staticmethod
-    def create_quote(db: Session, quote_data: QuoteCreate, created_by: str) -> Quote:
-        subtotal = quote_data.material_cost + quote_data.labor_cost + quote_data.machine_time_cost
-        profit_amount = subtotal * (quote_data.profit_margin_percent / 100)
-        total_price = subtotal + profit_amount
-
-        quote = Quote(
-            notification_id=quote_data.notification_id,
-            file_id=quote_data.file_id,
-            part_name=quote_data.part_name,
-            part_number=quote_data.part_number,
-            material=quote_data.material,
-            quantity_unit=quote_data.quantity_unit,
-            material_cost=quote_data.material_cost,
-            labor_cost=quote_data.labor_cost,
-            machine_time_cost=quote_data.machine_time_cost,
-            subtotal=subtotal,
-            profit_margin_percent=quote_data.profit_margin_percent,
-            profit_amount=profit_amount,
-            total_price=total_price,
-            status='sent',
-            notes=quote_data.notes,
-            created_by=created_by
+
+# Statement builders, also used by the routes for ETags and list queries
+
+def quote_by_id(quote_id: int) -> Select:
+    return select(Quote).where(Quote.id == quote_id)
+
+
+def file_by_id(file_id: int) -> Select:
+    return select(File).where(File.id == file_id)
+
+
+def manufacturer_quotes_query(created_by: str, status: str = None) -> Select:
+    query = select(Quote).where(Quote.created_by == created_by)
+    if status and status != 'all':
+        query = query.where(Quote.status == status)
+    return query
+
+
+def buyer_quotes_query(buyer_username: str, status: str = None) -> Select:
+    query = select(Quote).join(File, Quote.file_id == File.id).where(File.created_by == buyer_username)
+    if status and status != 'all':
+        query = query.where(Quote.status == status)
+    return query
+
+
+def buyer_notifications_query(buyer_email: str) -> Select:
+    return select(QuoteNotification).where(QuoteNotification.sent_to == buyer_email)
+
+
+def _quote_values(quote_data: QuoteCreate, created_by: str) -> dict:
+    """Column values of a new quote, priced from its costs"""
+    subtotal = quote_data.material_cost + quote_data.labor_cost + quote_data.machine_time_cost
+    profit_amount = subtotal * (quote_data.profit_margin_percent / 100)
+    total_price = subtotal + profit_amount
+
+    return dict(
+        notification_id=quote_data.notification_id,
+        file_id=quote_data.file_id,
+        part_name=quote_data.part_name,
+        part_number=quote_data.part_number,
+        material=quote_data.material,
+        quantity_unit=quote_data.quantity_unit,
+        material_cost=quote_data.material_cost,
+        labor_cost=quote_data.labor_cost,
+        machine_time_cost=quote_data.machine_time_cost,
+        subtotal=subtotal,
+        profit_margin_percent=quote_data.profit_margin_percent,
+        profit_amount=profit_amount,
+        total_price=total_price,
+        status='sent',
+        notes=quote_data.notes,
+        created_by=created_by
+    )
+
+
+def _build_quote(quote_data: QuoteCreate, created_by: str) -> Quote:
+    return Quote(**_quote_values(quote_data, created_by))
+
+
+def _build_quote_notification(quote: Quote, file_record: File, created_by: str) -> QuoteNotification:
+    return QuoteNotification(
+        quote_id=quote.id,
+        file_id=quote.file_id,
+        sent_by=created_by,
+        sent_to=file_record.created_by or "buyer",
+        part_name=quote.part_name,
+        is_read=False
+    )
+
+
+def _rejection_notice(quote, object_key: str) -> dict:
+    """Outbox payload telling manufacturers a rejected quote's part is open for quoting again"""
+    return {
+        "file_id": quote.file_id,
+        "object_key": object_key,
+        "part_name": quote.part_name,
+        "material": quote.material,
+        "part_number": quote.part_number,
+        "quantity_unit": quote.quantity_unit,
+        "description": rejection_description(1),
+        "upload": False,  # Not merged into the buyer's upload digest
+    }
+
+
+def _batch_rejection_notice(rows: List[Tuple[Quote, str, Optional[str]]]) -> dict:
+    """
+    Outbox payload for one notice of the parts of all the (quote, object_key, rfq_id) rows a
+    batch rejected, showing the first part, counting the parts and listing their files
+    """
+    quote, object_key, _ = rows[0]
+    notice = _rejection_notice(quote, object_key)
+    file_ids = list(dict.fromkeys(quote.file_id for quote, _, _ in rows))
+    rfq_ids = {rfq_id for _, _, rfq_id in rows}
+    notice.update(
+        rfq_id=rfq_ids.pop() if len(rfq_ids) == 1 else None,
+        child_count=len(file_ids),
+        file_ids=file_ids,
+        description=rejection_description(len(file_ids)),
+    )
+    return notice
+
+
+def _notify_quote_rejected(db: Session, quote: Quote) -> None:
+    """Queue, in the rejection's transaction, a notice to manufacturers that the part is open for quoting again"""
+    file_record = db.execute(file_by_id(quote.file_id)).scalar_one_or_none()
+    if file_record:
+        outbox_service.enqueue(db, outbox_service.NOTIFICATION_CREATE, _rejection_notice(quote, file_record.object_key))
+
+
+def _publish_quote_event(db: Union[Session, AsyncSession], quote: Quote, type_: str, recipient: Optional[str]) -> None:
+    """Push a quote event to recipient once the caller's transaction commits"""
+    if recipient:
+        event_service.publish(
+            db, event_service.user_channel(recipient), type_,
+            {"quote_id": quote.id, "file_id": quote.file_id, "part_name": quote.part_name, "status": quote.status},
         )
-        db.add(quote)
+
+
+# Counter and change log maintenance, run inside the caller's transaction (AsyncSession callers use run_sync)
+
+def _quote_buyer(db: Session, quote: Quote) -> Optional[str]:
+    return db.execute(select(File.created_by).where(File.id == quote.file_id)).scalar_one_or_none()
+
+
+def _count_new_quote(db: Session, quote: Quote, notification: Optional[QuoteNotification]) -> None:
+    counter_service.increment(db, MANUFACTURER_QUOTES, quote.created_by, quote.status)
+    counter_service.increment(db, BUYER_QUOTES, _quote_buyer(db, quote), quote.status)
+    if notification is not None:
+        counter_service.adjust(db, QUOTE_NOTIFICATIONS, {(notification.sent_to, TOTAL): 1, (notification.sent_to, UNREAD): 1})
         db.flush()
-        
-        file_record = db.query(File).filter(File.id == quote_data.file_id).first()
+        change_service.record(db, QUOTE_NOTIFICATION, notification.sent_to, [notification.id], CREATED)
+
+
+def _count_status_change(db: Session, quote: Quote, old_status: Optional[str]) -> None:
+    counter_service.move(db, MANUFACTURER_QUOTES, quote.created_by, old_status, quote.status)
+    counter_service.move(db, BUYER_QUOTES, _quote_buyer(db, quote), old_status, quote.status)
+
+
+def _count_deleted_quote(db: Session, quote: Quote) -> None:
+    counter_service.increment(db, MANUFACTURER_QUOTES, quote.created_by, quote.status, -1)
+    counter_service.increment(db, BUYER_QUOTES, _quote_buyer(db, quote), quote.status, -1)
+
+
+def _count_notification_read(db: Session, buyer_email: str, notification_id: int) -> None:
+    counter_service.increment(db, QUOTE_NOTIFICATIONS, buyer_email, UNREAD, -1)
+    change_service.record(db, QUOTE_NOTIFICATION, buyer_email, [notification_id], UPDATED)
+
+
+def _count_deleted_notification(db: Session, notification: QuoteNotification) -> None:
+    deltas = {(notification.sent_to, TOTAL): -1}
+    if not notification.is_read:
+        deltas[(notification.sent_to, UNREAD)] = -1
+    counter_service.adjust(db, QUOTE_NOTIFICATIONS, deltas)
+    change_service.record(db, QUOTE_NOTIFICATION, notification.sent_to, [notification.id], DELETED)
+
+
+def _count_cleared_notifications(db: Session, buyer_email: str) -> None:
+    notifications = buyer_notifications_query(buyer_email)
+    counter_service.subtract_grouped(
+        db, QUOTE_NOTIFICATIONS,
+        notifications.with_only_columns(QuoteNotification.sent_to, literal(TOTAL), func.count()).group_by(QuoteNotification.sent_to),
+    )
+    counter_service.subtract_grouped(
+        db, QUOTE_NOTIFICATIONS,
+        notifications.where(QuoteNotification.is_read == False)
+        .with_only_columns(QuoteNotification.sent_to, literal(UNREAD), func.count())
+        .group_by(QuoteNotification.sent_to),
+    )
+
+
+def _create_quotes(db: Session, quotes_data: List[QuoteCreate], created_by: str) -> List[Quote]:
+    """
+    Insert quotes and their buyer notifications with one multi-row INSERT each, looking up the
+    buyers of all their files in one query, and count them in the caller's transaction
+    """
+    quotes = db.scalars(
+        insert(Quote).returning(Quote), [_quote_values(quote_data, created_by) for quote_data in quotes_data]
+    ).all()
+    buyers = dict(db.execute(
+        select(File.id, File.created_by).where(File.id.in_({quote.file_id for quote in quotes}))
+    ).all())
+
+    buyer_quotes: Dict[Tuple[str, str], int] = defaultdict(int)
+    for quote in quotes:
+        buyer_quotes[(buyers.get(quote.file_id), quote.status)] += 1
+    counter_service.adjust(db, MANUFACTURER_QUOTES, {(created_by, 'sent'): len(quotes)})
+    counter_service.adjust(db, BUYER_QUOTES, buyer_quotes)
+
+    notifications = [
+        {
+            "quote_id": quote.id,
+            "file_id": quote.file_id,
+            "sent_by": created_by,
+            "sent_to": buyers[quote.file_id] or "buyer",
+            "part_name": quote.part_name,
+            "is_read": False,
+        }
+        for quote in quotes if quote.file_id in buyers
+    ]
+    if notifications:
+        rows = db.execute(
+            insert(QuoteNotification).returning(QuoteNotification.sent_to, QuoteNotification.id), notifications
+        ).all()
+        deltas: Dict[Tuple[str, str], int] = defaultdict(int)
+        for sent_to, _ in rows:
+            deltas[(sent_to, TOTAL)] += 1
+            deltas[(sent_to, UNREAD)] += 1
+        counter_service.adjust(db, QUOTE_NOTIFICATIONS, deltas)
+        change_service.record_rows(db, QUOTE_NOTIFICATION, rows, CREATED)
+
+    # One event per buyer for the whole batch
+    quote_ids: Dict[str, List[int]] = defaultdict(list)
+    for notification in notifications:
+        quote_ids[notification["sent_to"]].append(notification["quote_id"])
+    for recipient, ids in quote_ids.items():
+        event_service.publish(db, event_service.user_channel(recipient), "quotes.created", {"quote_ids": ids})
+    return quotes
+
+
+def _set_status(db: Session, buyer: str, quote_ids: List[int], status: str, rejection_reason: Optional[str] = None) -> List[int]:
+    """
+    Accept or reject those of quote_ids that are quotes on buyer's files, in one UPDATE, in the
+    caller's transaction. The rows are locked first to read the statuses they move counters
+    from. Each manufacturer gets one event for all of their quotes, and the rejected parts are
+    announced, open for new quotes, in one notice. Returns the ids whose status changed.
+    """
+    rows = db.execute(
+        select(Quote, File.object_key, File.rfq_id)
+        .join(File, Quote.file_id == File.id)
+        .where(Quote.id.in_(quote_ids), File.created_by == buyer, Quote.status.is_distinct_from(status))
+        .order_by(Quote.id)
+        .with_for_update(of=Quote)
+    ).all()
+    if not rows:
+        return []
+    changed = [quote.id for quote, _, _ in rows]
+
+    now = datetime.utcnow()
+    values = {"status": status, "updated_at": now}
+    if status == 'accepted':
+        values["accepted_at"] = now
+    else:
+        values.update(rejected_at=now, rejection_reason=rejection_reason)
+    db.execute(
+        update(Quote).where(Quote.id.in_(changed)).values(**values),
+        execution_options={"synchronize_session": False},
+    )
+
+    manufacturer_quotes: Dict[Tuple[str, str], int] = defaultdict(int)
+    buyer_quotes: Dict[Tuple[str, str], int] = defaultdict(int)
+    by_manufacturer: Dict[str, List[int]] = defaultdict(list)
+    for quote, _, _ in rows:
+        manufacturer_quotes[(quote.created_by, quote.status)] -= 1
+        manufacturer_quotes[(quote.created_by, status)] += 1
+        buyer_quotes[(buyer, quote.status)] -= 1
+        buyer_quotes[(buyer, status)] += 1
+        by_manufacturer[quote.created_by].append(quote.id)
+    counter_service.adjust(db, MANUFACTURER_QUOTES, manufacturer_quotes)
+    counter_service.adjust(db, BUYER_QUOTES, buyer_quotes)
+
+    for manufacturer, ids in by_manufacturer.items():
+        event_service.publish(
+            db, event_service.user_channel(manufacturer), f"quotes.{status}", {"quote_ids": ids, "status": status}
+        )
+    if status == 'rejected':
+        outbox_service.enqueue(db, outbox_service.NOTIFICATION_CREATE, _batch_rejection_notice(rows))
+    return changed
+
+
+def _counted_status_counts(db: Session, counter_key: Tuple[str, str]) -> StatusCounts:
+    return summarize_status_counts(counter_service.get_counts(db, *counter_key).items())
+
+
+def quotes_version(db: Session, query: Select, counter_key: Tuple[str, str]) -> tuple:
+    """Version of a quote list: the newest updated_at among query's quotes and their status counts"""
+    newest = db.execute(query.with_only_columns(func.max(Quote.updated_at)).order_by(None)).scalar()
+    return newest, sorted(counter_service.get_counts(db, *counter_key).items())
+
+
+class AsyncQuoteService:
+    """Quote operations on AsyncSession; awaiting the driver keeps the event loop free during queries"""
+
+    @staticmethod
+    async def create_quote(db: AsyncSession, quote_data: QuoteCreate, created_by: str) -> Quote:
+        quote = _build_quote(quote_data, created_by)
+        db.add(quote)
+        await db.flush()
+
+        notification = None
+        file_record = (await db.execute(file_by_id(quote_data.file_id))).scalar_one_or_none()
         if file_record:
-            quote_notification = QuoteNotification(
-                quote_id=quote.id,
-                file_id=quote_data.file_id,
-                sent_by=created_by,
-                sent_to=file_record.created_by or "buyer",
-                part_name=quote_data.part_name,
-                is_read=False
-            )
-            db.add(quote_notification)
-        
-        db.commit()
-        db.refresh(quote)
+            notification = _build_quote_notification(quote, file_record, created_by)
+            db.add(notification)
+            _publish_quote_event(db, quote, "quote.created", notification.sent_to)
+        await db.run_sync(_count_new_quote, quote, notification)
+
+        await db.commit()
+        await db.refresh(quote)
         return quote
 
     @staticmethod
-    def get_quote(db: Session, quote_id: int) -> Quote:
-        return db.query(Quote).filter(Quote.id == quote_id).first()
-
-    @staticmethod
-    def get_quotes_by_notification(db: Session, notification_id: int) -> list[Quote]:
-        return db.query(Quote).filter(Quote.notification_id == notification_id).all()
-
-    @staticmethod
-    def get_quotes_by_file(db: Session, file_id: int) -> list[Quote]:
-        return db.query(Quote).filter(Quote.file_id == file_id).all()
-
-    @staticmethod
-    def get_all_quotes(db: Session, limit: int = 50, offset: int = 0, status: str = None) -> tuple[list[Quote], int]:
-        query = db.query(Quote)
-        
-        if status:
-            query = query.filter(Quote.status == status)
-        
-        total_count = query.count()
-        quotes = query.order_by(Quote.created_at.desc()).limit(limit).offset(offset).all()
-        
-        return quotes, total_count
-
-    @staticmethod
-    def get_manufacturer_quotes(db: Session, created_by: str, limit: int = 50, offset: int = 0, status: str = None) -> tuple[list[Quote], int]:
-        query = db.query(Quote).filter(Quote.created_by == created_by)
-        if status and status != 'all':
-            query = query.filter(Quote.status == status)
-        total_count = query.count()
-        quotes = query.order_by(Quote.created_at.desc()).limit(limit).offset(offset).all()
-        
-        return quotes, total_count
-
-    @staticmethod
-    def get_buyer_quotes(db: Session, buyer_username: str, limit: int = 50, offset: int = 0, status: str = None) -> tuple[list[Quote], int]:
-        query = db.query(Quote).join(File, Quote.file_id == File.id).filter(File.created_by == buyer_username)
-        if status and status != 'all':
-            query = query.filter(Quote.status == status)
-        total_count = query.count()
-        quotes = query.order_by(Quote.created_at.desc()).limit(limit).offset(offset).all()
-        return quotes, total_count
-
-    @staticmethod
-    def get_quote_stats(db: Session, created_by: str) -> dict:
-        stats = {
-            'total_quotes': db.query(func.count(Quote.id)).filter(Quote.created_by == created_by).scalar() or 0,
-            'pending_quotes': db.query(func.count(Quote.id)).filter(
-                Quote.created_by == created_by,
-                Quote.status == 'pending'
-            ).scalar() or 0,
-            'sent_quotes': db.query(func.count(Quote.id)).filter(
-                Quote.created_by == created_by,
-                Quote.status == 'sent'
-            ).scalar() or 0,
-            'accepted_quotes': db.query(func.count(Quote.id)).filter(
-                Quote.created_by == created_by,
-                Quote.status == 'accepted'
-            ).scalar() or 0,
-            'rejected_quotes': db.query(func.count(Quote.id)).filter(
-                Quote.created_by == created_by,
-                Quote.status == 'rejected'
-            ).scalar() or 0,
-        }
-        return stats
+    async def create_quotes(db: AsyncSession, quotes_data: List[QuoteCreate], created_by: str) -> List[Quote]:
+        quotes = await db.run_sync(_create_quotes, quotes_data, created_by)
+        await db.commit()
+        return quotes
+
+    @staticmethod
+    async def set_status(db: AsyncSession, buyer: str, quote_ids: List[int], status: str, rejection_reason: str = None) -> List[int]:
+        changed = await db.run_sync(_set_status, buyer, quote_ids, status, rejection_reason)
+        await db.commit()
+        return changed
+
+    @staticmethod
+    async def get_quote(db: AsyncSession, quote_id: int) -> Quote:
+        return (await db.execute(quote_by_id(quote_id))).scalar_one_or_none()
+
+    @staticmethod
+    async def get_quotes_by_notification(db: AsyncSession, notification_id: int) -> list[Quote]:
+        result = await db.execute(select(Quote).where(Quote.notification_id == notification_id))
+        return result.scalars().all()
+
+    @staticmethod
+    async def get_status_counts(db: AsyncSession, query: Select) -> StatusCounts:
+        return summarize_status_counts((await db.execute(status_counts_query(query))).all())
+
+    @staticmethod
+    async def list_quotes(db: AsyncSession, query: Select, status: str = None, limit: int = 50, offset: int = 0, counter_key: Tuple[str, str] = None, cursor: str = None, single_query: bool = QUOTE_COUNTS_WINDOW) -> tuple[Page, StatusCounts]:
+        """
+        A page of query filtered by status, with the status counts of the whole of query.
+        counter_key=(scope, owner) names maintained counters holding those counts.
+        """
+        counts = None
+        if single_query and counter_key is None:
+            rows = (await db.execute(page_with_counts_query(query, status, limit, offset, cursor))).all()
+            quotes, counts = split_page_with_counts(rows)
+        else:
+            page = query.where(Quote.status == status) if status and status != 'all' else query
+            quotes = (await db.execute(paginate(page, Quote, limit, cursor, offset))).scalars().all()
+        quotes, next_cursor = split_page(quotes, limit)
+        if counts is None:
+            if counter_key is not None:
+                counts = await db.run_sync(_counted_status_counts, counter_key)
+            else:
+                counts = await AsyncQuoteService.get_status_counts(db, query)
+        return Page(quotes, next_cursor, counts.total_for(status)), counts
+
+    @staticmethod
+    async def get_quote_stats(db: AsyncSession, created_by: str) -> dict:
+        return (await db.run_sync(_counted_status_counts, (MANUFACTURER_QUOTES, created_by))).as_stats()
 
     @staticmethod
-    def accept_quote(db: Session, quote_id: int) -> Quote:
-        quote = db.query(Quote).filter(Quote.id == quote_id).first()
+    async def accept_quote(db: AsyncSession, quote_id: int) -> Quote:
+        quote = await AsyncQuoteService.get_quote(db, quote_id)
         if quote:
+            old_status = quote.status
             quote.status = 'accepted'
             quote.accepted_at = datetime.utcnow()
-            db.commit()
-            db.refresh(quote)
+            await db.run_sync(_count_status_change, quote, old_status)
+            _publish_quote_event(db, quote, "quote.accepted", quote.created_by)
+            await db.commit()
+            await db.refresh(quote)
         return quote
 
     @staticmethod
-    def reject_quote(db: Session, quote_id: int, rejection_reason: str = None) -> Quote:
-        quote = db.query(Quote).filter(Quote.id == quote_id).first()
+    async def reject_quote(db: AsyncSession, quote_id: int, rejection_reason: str = None) -> Quote:
+        quote = await AsyncQuoteService.get_quote(db, quote_id)
         if quote:
+            old_status = quote.status
             quote.status = 'rejected'
             quote.rejected_at = datetime.utcnow()
             quote.rejection_reason = rejection_reason
-            db.commit()
-            db.refresh(quote)
-
-            try:
-                from app.services.notification_service import create_notification
-
-                file_record = db.query(File).filter(File.id == quote.file_id).first()
-                if file_record:
-                    create_notification(
-                        db=db,
-                        file_id=file_record.id,
-                        object_key=file_record.object_key,
-                        part_name=quote.part_name,
-                        material=quote.material,
-                        part_number=quote.part_number,
-                        quantity_unit=quote.quantity_unit,
-                        description="Quote rejected by buyer",
-                    )
-            except Exception:
-                pass
+            await db.run_sync(_count_status_change, quote, old_status)
+            _publish_quote_event(db, quote, "quote.rejected", quote.created_by)
+            await db.run_sync(_notify_quote_rejected, quote)
+            await db.commit()
+            await db.refresh(quote)
         return quote
 
     @staticmethod
-    def update_quote(db: Session, quote_id: int, update_data: dict) -> Quote:
-        quote = db.query(Quote).filter(Quote.id == quote_id).first()
+    async def delete_quote(db: AsyncSession, quote_id: int) -> bool:
+        quote = await AsyncQuoteService.get_quote(db, quote_id)
         if quote:
-            for key, value in update_data.items():
-                if hasattr(quote, key) and value is not None:
-                    setattr(quote, key, value)
-            db.commit()
-            db.refresh(quote)
-        return quote
-
-    @staticmethod
-    def delete_quote(db: Session, quote_id: int) -> bool:
-        quote = db.query(Quote).filter(Quote.id == quote_id).first()
-        if quote:
-            db.delete(quote)
-            db.commit()
+            await db.run_sync(_count_deleted_quote, quote)
+            await db.delete(quote)
+            await db.commit()
             return True
         return False
 
     @staticmethod
-    def get_buyer_quote_notifications(db: Session, buyer_email: str, limit: int = 50, offset: int = 0) -> tuple[list, int]:
-        from app.models.quote_notification_models import QuoteNotification
-        
-        query = db.query(QuoteNotification).filter(QuoteNotification.sent_to == buyer_email)
-        total_count = query.count()
-        notifications = query.order_by(QuoteNotification.created_at.desc()).limit(limit).offset(offset).all()
-        
-        return notifications, total_count
+    async def get_buyer_quote_notifications(db: AsyncSession, buyer_email: str, limit: int = 50, offset: int = 0, cursor: str = None) -> Page:
+        total_count = await db.run_sync(counter_service.get_count, QUOTE_NOTIFICATIONS, buyer_email, TOTAL)
+        rows = (await db.execute(
+            paginate(buyer_notifications_query(buyer_email), QuoteNotification, limit, cursor, offset)
+        )).scalars().all()
+        notifications, next_cursor = split_page(rows, limit)
+        return Page(notifications, next_cursor, total_count)
 
     @staticmethod
-    def mark_quote_notification_as_read(db: Session, notification_id: int) -> bool:
-        from app.models.quote_notification_models import QuoteNotification
-        
-        notification = db.query(QuoteNotification).filter(QuoteNotification.id == notification_id).first()
-        if notification:
-            notification.is_read = True
-            db.commit()
-            return True
-        return False
+    async def mark_quote_notification_as_read(db: AsyncSession, notification_id: int, buyer_email: str) -> bool:
+        """
+        Mark one of buyer_email's notifications as read; False if it is not theirs. Only the
+        request whose conditional UPDATE flips is_read moves the unread counter.
+        """
+        marked = (await db.execute(
+            update(QuoteNotification)
+            .where(
+                QuoteNotification.id == notification_id,
+                QuoteNotification.sent_to == buyer_email,
+                QuoteNotification.is_read == False,
+            )
+            .values(is_read=True)
+            .returning(QuoteNotification.id)
+        )).scalar_one_or_none()
+        if marked is None:
+            exists = (await db.execute(
+                buyer_notifications_query(buyer_email).where(QuoteNotification.id == notification_id)
+            )).scalar_one_or_none()
+            return exists is not None
+        await db.run_sync(_count_notification_read, buyer_email, notification_id)
+        await db.commit()
+        return True
+
+    @staticmethod
+    async def get_unread_quote_notifications_count(db: AsyncSession, buyer_email: str) -> int:
+        return await db.run_sync(counter_service.get_count, QUOTE_NOTIFICATIONS, buyer_email, UNREAD)
+
+    @staticmethod
+    async def delete_buyer_quote_notification(db: AsyncSession, notification_id: int, buyer_email: str) -> bool:
+        notification = (await db.execute(
+            buyer_notifications_query(buyer_email).where(QuoteNotification.id == notification_id)
+        )).scalar_one_or_none()
+        if not notification:
+            return False
+        await db.run_sync(_count_deleted_notification, notification)
+        await db.delete(notification)
+        await db.commit()
+        return True
 
     @staticmethod
-    def get_unread_quote_notifications_count(db: Session, buyer_email: str) -> int:
-        from app.models.quote_notification_models import QuoteNotification
-        
-        return db.query(QuoteNotification).filter(
-            QuoteNotification.sent_to == buyer_email,
-            QuoteNotification.is_read == False
-        ).count()
\ No newline at end of file
+    async def clear_buyer_quote_notifications(db: AsyncSession, buyer_email: str) -> None:
+        await db.run_sync(_count_cleared_notifications, buyer_email)
+        ids = (await db.execute(
+            delete(QuoteNotification).where(QuoteNotification.sent_to == buyer_email).returning(QuoteNotification.id)
+        )).scalars().all()
+        await db.run_sync(change_service.record, QUOTE_NOTIFICATION, buyer_email, ids, DELETED)
+        await db.execute(delete(QuoteNotificationArchive).where(QuoteNotificationArchive.sent_to == buyer_email))
+        await db.commit()
@@ -0,0 +1,89 @@
+"""
+Status aggregates for quote lists and dashboards.
+
+Every count comes from one pass over the filtered quotes: either a GROUP BY status next to the
+page query, or window functions evaluated inside the page query itself.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Select, case, func, select
+from sqlalchemy.orm import aliased
+
+from app.models.quote_models import Quote
+from app.services.pagination import paginate
+
+QUOTE_STATUSES = ['pending', 'sent', 'accepted', 'rejected']
+
+
+@dataclass
+class StatusCounts:
+    total: int = 0
+    by_status: Dict[str, int] = field(default_factory=lambda: {status: 0 for status in QUOTE_STATUSES})
+
+    def total_for(self, status: Optional[str]) -> int:
+        if not status or status == 'all':
+            return self.total
+        return self.by_status.get(status, 0)
+
+    def as_list_counts(self) -> dict:
+        return {f"{status}_count": count for status, count in self.by_status.items()}
+
+    def as_stats(self) -> dict:
+        return {
+            'total_quotes': self.total,
+            **{f"{status}_quotes": count for status, count in self.by_status.items()},
+        }
+
+
+def status_counts_query(query: Select) -> Select:
+    """Collapse a select(Quote) query, joins and filters included, into (status, count) groups"""
+    return (
+        query.with_only_columns(Quote.status, func.count(Quote.id))
+        .group_by(Quote.status)
+        .order_by(None)
+    )
+
+
+def summarize_status_counts(rows: Iterable[Tuple[Optional[str], int]]) -> StatusCounts:
+    counts = StatusCounts()
+    for status, count in rows:
+        counts.total += count
+        if status in counts.by_status:
+            counts.by_status[status] = count
+    return counts
+
+
+def _status_filter(quote, status: Optional[str]):
+    return None if not status or status == 'all' else quote.status == status
+
+
+def page_with_counts_query(query: Select, status: Optional[str], limit: int, offset: int = 0, cursor: Optional[str] = None) -> Select:
+    """
+    One statement returning a page of quotes with the status counts of the unfiltered set on
+    every row. The window aggregates run in a subquery so the status filter, ORDER BY and LIMIT
+    of the page do not narrow them.
+    """
+    windows = [
+        func.count(case((Quote.status == s, Quote.id))).over().label(f"{s}_count")
+        for s in QUOTE_STATUSES
+    ]
+    inner = query.add_columns(*windows, func.count().over().label("total_count")).subquery()
+    quote = aliased(Quote, inner)
+    stmt = select(quote, inner.c.total_count, *(inner.c[f"{s}_count"] for s in QUOTE_STATUSES))
+    condition = _status_filter(quote, status)
+    if condition is not None:
+        stmt = stmt.where(condition)
+    return paginate(stmt, quote, limit, cursor, offset)
+
+
+def split_page_with_counts(rows: List[tuple]) -> Tuple[List[Quote], Optional[StatusCounts]]:
+    """Quotes and counts from page_with_counts_query rows; counts are None for an empty page"""
+    if not rows:
+        return [], None
+    first = rows[0]
+    counts = StatusCounts(
+        total=first[1],
+        by_status={s: first[2 + i] for i, s in enumerate(QUOTE_STATUSES)},
+    )
+    return [row[0] for row in rows], counts
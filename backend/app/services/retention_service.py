@@ -0,0 +1,236 @@
+"""
+Notification retention.
+
+notifications and quote_notifications only ever grow, while readers want the newest rows. Read
+notifications older than NOTIFICATION_RETENTION_DAYS are moved to notifications_archive and
+quote_notifications_archive in batches; a manufacturer notification counts as read once no
+recipient has it unread in their inbox. Each batch is one transaction that copies the rows,
+takes them off the counters and deletes them, so the hot tables keep only unread and recent
+notifications.
+
+On PostgreSQL both hot tables are range partitioned by month on created_at (migration 0004).
+The job creates partitions for the coming months and drops past partitions once they have aged
+out of the retention window and been emptied, so newest-first scans stay in a few recent
+partitions.
+"""
+import logging
+import re
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import and_, delete, func, insert, literal, select, text
+from sqlalchemy.orm import Session
+
+from app import metrics
+from app.config.database import SessionLocal
+from app.config.settings import (
+    NOTIFICATION_ARCHIVE_BATCH_SIZE,
+    NOTIFICATION_ARCHIVE_MAX_BATCHES,
+    NOTIFICATION_CHANGES_RETENTION_HOURS,
+    NOTIFICATION_PARTITION_MONTHS_AHEAD,
+    NOTIFICATION_RETENTION_DAYS,
+)
+from app.models.notification_models import Notification, NotificationArchive, NotificationInbox
+from app.models.quote_notification_models import QuoteNotification, QuoteNotificationArchive
+from app.services import change_service, counter_service
+from app.services.change_service import DELETED, NOTIFICATION, QUOTE_NOTIFICATION
+from app.services.counter_service import QUOTE_NOTIFICATIONS, TOTAL
+from app.services.notification_service import delete_inbox_entries
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLES = ("notifications", "quote_notifications")
+
+_archived = metrics.counter("notifications_archived_total", "Read notifications moved to the archive tables")
+_partition_failures = metrics.counter(
+    "notification_partition_failures_total", "Monthly notification partitions that could not be created"
+)
+_default_partition_rows = metrics.gauge(
+    "notification_default_partition_rows", "Rows in the default partition of a notification table; should be 0"
+)
+
+
+class PartitionMaintenanceError(RuntimeError):
+    """Monthly partitions are missing, so rows are landing in the default partition"""
+
+
+def _month_start(moment: datetime) -> datetime:
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _next_month(month: datetime) -> datetime:
+    return (month + timedelta(days=32)).replace(day=1)
+
+
+def partition_name(table: str, month: datetime) -> str:
+    return f"{table}_p{month:%Y_%m}"
+
+
+def _partition_month(table: str, name: str) -> Optional[datetime]:
+    match = re.fullmatch(rf"{table}_p(\d{{4}})_(\d{{2}})", name)
+    return datetime(int(match[1]), int(match[2]), 1) if match else None
+
+
+def ensure_partitions(db: Session, months_ahead: int = NOTIFICATION_PARTITION_MONTHS_AHEAD) -> None:
+    """
+    Create the monthly partitions from the current month to months_ahead months out, and
+    publish how many rows sit in the default partitions. Raises PartitionMaintenanceError when
+    a partition cannot be created or a default partition holds rows: those rows escape
+    partition pruning and retention, and block creating their month's partition until moved
+    out of the default partition by hand.
+    """
+    failed = []
+    month = _month_start(datetime.utcnow())
+    for _ in range(months_ahead + 1):
+        for table in PARTITIONED_TABLES:
+            name = partition_name(table, month)
+            try:
+                with db.begin_nested():
+                    db.execute(text(
+                        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+                        f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{_next_month(month):%Y-%m-%d}')"
+                    ))
+            except Exception as e:
+                _partition_failures.inc(table=table)
+                failed.append(f"{name} ({e})")
+        month = _next_month(month)
+    db.commit()
+
+    stranded = []
+    for table in PARTITIONED_TABLES:
+        rows = db.execute(text(f"SELECT count(*) FROM {table}_default")).scalar()
+        _default_partition_rows.set(rows, table=table)
+        if rows:
+            stranded.append(f"{table}_default holds {rows} rows")
+    db.commit()
+    if failed or stranded:
+        message = "; ".join([f"could not create partition {failure}" for failure in failed] + stranded)
+        logger.critical(f"Notification partitions need attention: {message}")
+        raise PartitionMaintenanceError(message)
+
+
+def drop_expired_partitions(db: Session, cutoff: datetime) -> List[str]:
+    """Drop partitions that end before cutoff and hold no rows (unread ones keep theirs alive)"""
+    dropped = []
+    for table in PARTITIONED_TABLES:
+        names = db.execute(text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = :table"
+        ), {"table": table}).scalars().all()
+        for name in names:
+            month = _partition_month(table, name)
+            if month is None or _next_month(month) > cutoff:
+                continue
+            try:
+                # Fail fast instead of queueing every reader of the table behind the lock
+                db.execute(text("SET LOCAL lock_timeout = '2s'"))
+                db.execute(text(f"LOCK TABLE {name} IN ACCESS EXCLUSIVE MODE"))
+                if db.execute(text(f"SELECT 1 FROM {name} LIMIT 1")).first() is None:
+                    db.execute(text(f"DROP TABLE {name}"))
+                    dropped.append(name)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Could not drop partition {name}: {e}")
+    if dropped:
+        logger.info(f"Dropped expired notification partitions: {', '.join(dropped)}")
+    return dropped
+
+
+def _take_off_notifications(db: Session, batch) -> None:
+    """Archived notifications leave every recipient's inbox"""
+    change_service.record_rows(db, NOTIFICATION, delete_inbox_entries(db, batch), DELETED)
+
+
+def _take_off_quote_notifications(db: Session, batch) -> None:
+    # Archived rows are read, so only the totals move
+    counter_service.subtract_grouped(
+        db, QUOTE_NOTIFICATIONS,
+        select(QuoteNotification.sent_to, literal(TOTAL), func.count()).where(batch).group_by(QuoteNotification.sent_to),
+    )
+    rows = db.execute(select(QuoteNotification.sent_to, QuoteNotification.id).where(batch)).all()
+    change_service.record_rows(db, QUOTE_NOTIFICATION, rows, DELETED)
+
+
+def _archive_batch(db: Session, model, archive, read, take_off, cutoff: datetime, batch_size: int) -> int:
+    """
+    Move up to batch_size rows older than cutoff matching read from model to archive in one
+    transaction. take_off(db, condition) removes the rows from counters and the change log.
+    """
+    # created_at < cutoff on every statement lets PostgreSQL skip the recent partitions
+    expired = (read, model.created_at < cutoff)
+    ids = db.execute(
+        select(model.id).where(*expired).order_by(model.created_at).limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+    if not ids:
+        db.rollback()
+        return 0
+
+    batch = and_(*expired, model.id.in_(ids))
+    columns = [column.name for column in model.__table__.columns]
+    db.execute(
+        insert(archive).from_select(
+            columns + ["archived_at"],
+            select(*model.__table__.columns, literal(datetime.utcnow())).where(batch),
+        )
+    )
+    take_off(db, batch)
+    deleted = db.execute(delete(model).where(batch)).rowcount
+    db.commit()
+    return deleted
+
+
+def archive_read_notifications(
+    retention_days: int = NOTIFICATION_RETENTION_DAYS,
+    batch_size: int = NOTIFICATION_ARCHIVE_BATCH_SIZE,
+    max_batches: int = NOTIFICATION_ARCHIVE_MAX_BATCHES,
+) -> int:
+    """
+    Retention job: archive expired read notifications, prune the notification change log and
+    maintain PostgreSQL partitions. A retention_days of 0 keeps every notification but still creates upcoming partitions.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    archives = [
+        # Manufacturer notifications once no recipient has them unread
+        (Notification, NotificationArchive, ~select(NotificationInbox.notification_id).where(
+            NotificationInbox.notification_id == Notification.id, NotificationInbox.read_at.is_(None)
+        ).exists(), _take_off_notifications),
+        (QuoteNotification, QuoteNotificationArchive, QuoteNotification.is_read == True, _take_off_quote_notifications),
+    ]
+    db = SessionLocal()
+    partition_error = None
+    try:
+        partitioned = db.get_bind().dialect.name == "postgresql"
+        if partitioned:
+            try:
+                ensure_partitions(db)
+            except PartitionMaintenanceError as e:
+                # Retention still runs; the job fails once it is done
+                partition_error = e
+        change_service.prune_changes(db, datetime.utcnow() - timedelta(hours=NOTIFICATION_CHANGES_RETENTION_HOURS))
+
+        archived = 0
+        if retention_days <= 0:
+            return archived
+        for model, archive, read, take_off in archives:
+            moved_total = 0
+            for _ in range(max_batches):
+                moved = _archive_batch(db, model, archive, read, take_off, cutoff, batch_size)
+                moved_total += moved
+                if moved < batch_size:
+                    break
+            if moved_total:
+                _archived.inc(moved_total, table=model.__tablename__)
+                logger.info(f"Archived {moved_total} read {model.__tablename__} older than {retention_days} days")
+            archived += moved_total
+
+        if partitioned:
+            drop_expired_partitions(db, cutoff)
+        return archived
+    finally:
+        db.close()
+        if partition_error is not None:
+            raise partition_error
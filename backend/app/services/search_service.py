@@ -0,0 +1,168 @@
+"""
+Indexed full-text search over file metadata.
+
+The searchable document of a file is its name, part number, material and description.
+
+PostgreSQL: a GIN tsvector index (weighted: name and part number over material over description)
+answers word queries with ts_rank_cd ranking, and a pg_trgm GIN index over the concatenated
+document answers substring ILIKE and, when fuzzy, typo-tolerant word_similarity matches.
+
+SQLite: files_fts is an FTS5 external-content table with the trigram tokenizer mirroring the
+searchable columns, kept in sync by triggers on files; MATCH answers substring queries of three
+or more characters, ranked with bm25. Shorter terms fall back to LIKE. So do common queries
+when listing: ranking every file containing e.g. "bracket" costs far more than a LIKE scan in
+list order, which stops as soon as the page is full, so they are unranked and list newest
+first. The trigram tokenizer needs SQLite 3.34; older versions search with LIKE only.
+
+Other dialects get an unindexed ILIKE over the same columns. The indexes, FTS table and triggers
+are created by migration 0002_file_search.
+"""
+import logging
+import re
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import Select, String, column, func, literal, literal_column, or_, select, table, text
+from sqlalchemy.orm import Session
+
+from app.models.file_models import File
+from app.services import counter_service
+
+logger = logging.getLogger(__name__)
+
+SEARCH_COLUMNS = ("original_name", "part_number", "material", "description")
+# Trigram tokens are three characters; shorter terms cannot use the FTS5 index
+MIN_TRIGRAM_TERM = 3
+# SQLite release that added the FTS5 trigram tokenizer
+MIN_TRIGRAM_SQLITE = (3, 34, 0)
+# Queries matching this share of all files, and at least COMMON_QUERY_ROWS, are matched with LIKE
+# instead of ranked through FTS5: a LIKE scan then fills a page or the count after few rows
+COMMON_QUERY_FRACTION = 0.05
+COMMON_QUERY_ROWS = 2000
+FACET_LIMIT = 20
+
+# Queries must repeat the index expressions of migration 0002 verbatim for the planner to match
+# them, so they are spelled out as SQL rather than built with bound parameters.
+PG_DOCUMENT = "(" + " || ' ' || ".join(f"coalesce({name}, '')" for name in SEARCH_COLUMNS) + ")"
+PG_VECTOR = " || ".join(
+    f"setweight(to_tsvector('simple'::regconfig, coalesce({name}, '')), '{weight}')"
+    for name, weight in zip(SEARCH_COLUMNS, "AABC")
+)
+
+files_fts = table("files_fts", column("rowid"))
+# bm25 weights in SEARCH_COLUMNS order
+_BM25_WEIGHTS = (10.0, 10.0, 4.0, 1.0)
+
+# Database URL -> whether files_fts can be queried there
+_fts_available: Dict[str, bool] = {}
+
+
+def _like_pattern(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _any_column_like(term: str):
+    pattern = _like_pattern(term)
+    return or_(*(getattr(File, name).ilike(pattern, escape="\\") for name in SEARCH_COLUMNS))
+
+
+def _fts5_phrase(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _postgres_match(query: Select, q: str, fuzzy: bool) -> Tuple[Select, object]:
+    document = literal_column(PG_DOCUMENT, String)
+    vector = literal_column(f"({PG_VECTOR})")
+    tsquery = func.websearch_to_tsquery(literal_column("'simple'::regconfig"), q)
+    conditions = [
+        vector.op("@@")(tsquery),
+        document.ilike(literal(_like_pattern(q), String), escape="\\"),
+    ]
+    if fuzzy:
+        conditions.append(literal(q, String).op("<%")(document))
+    rank = func.ts_rank_cd(vector, tsquery) + func.word_similarity(q, document)
+    return query.where(or_(*conditions)), rank
+
+
+def sqlite_fts_available(db: Session) -> bool:
+    """
+    Whether files_fts can serve searches: it needs SQLite 3.34 for the trigram tokenizer, and
+    migration 0002 does not create it on older versions. Checked once per database.
+    """
+    key = str(db.get_bind().url)
+    if key not in _fts_available:
+        version = db.execute(text("SELECT sqlite_version()")).scalar()
+        supported = tuple(int(part) for part in version.split(".")[:3]) >= MIN_TRIGRAM_SQLITE
+        exists = db.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'files_fts'")).first() is not None
+        if exists and not supported:
+            logger.error(
+                f"SQLite {version} lacks the trigram tokenizer files_fts was created with; "
+                f"file writes fail until SQLite is upgraded to {'.'.join(map(str, MIN_TRIGRAM_SQLITE))}"
+            )
+        elif not exists:
+            logger.warning(f"files_fts is missing on SQLite {version}; file search falls back to unindexed LIKE")
+        _fts_available[key] = supported and exists
+    return _fts_available[key]
+
+
+def _is_common(db: Session, fts_query: str) -> bool:
+    """Whether fts_query matches enough files to count as common; FTS5 stops counting there"""
+    files = counter_service.get_count(db, counter_service.FILES, counter_service.ALL_OWNERS, counter_service.TOTAL)
+    threshold = max(COMMON_QUERY_ROWS, int(files * COMMON_QUERY_FRACTION))
+    matches = (
+        select(files_fts.c.rowid)
+        .where(literal_column("files_fts").op("MATCH")(fts_query))
+        .limit(threshold)
+        .subquery()
+    )
+    return db.execute(select(func.count()).select_from(matches)).scalar_one() >= threshold
+
+
+def _sqlite_match(db: Session, query: Select, q: str, scan_common: bool) -> Tuple[Select, Optional[object]]:
+    terms: List[str] = re.findall(r"\S+", q)
+    if not sqlite_fts_available(db):
+        return query.where(*(_any_column_like(term) for term in terms)), None
+    indexed = [term for term in terms if len(term) >= MIN_TRIGRAM_TERM]
+    for term in terms:
+        if len(term) < MIN_TRIGRAM_TERM:
+            query = query.where(_any_column_like(term))
+    if not indexed:
+        return query, None
+    fts_query = " ".join(_fts5_phrase(term) for term in indexed)
+    if scan_common and _is_common(db, fts_query):
+        return query.where(*(_any_column_like(term) for term in indexed)), None
+    fts = literal_column("files_fts")
+    query = query.join(files_fts, files_fts.c.rowid == File.id).where(fts.op("MATCH")(fts_query))
+    # bm25 is lower for better matches
+    return query, -func.bm25(fts, *_BM25_WEIGHTS)
+
+
+def text_match(
+    db: Session, query: Select, q: str, fuzzy: bool = False, scan_common: bool = True
+) -> Tuple[Select, Optional[object]]:
+    """
+    Restrict a select(File) query to files matching q and return it with a relevance expression,
+    higher is better, or None when the match is unranked. fuzzy adds trigram similarity matches
+    where the dialect supports them. scan_common=False keeps common queries on the index, for
+    facet counts and other queries that visit every match anyway.
+    """
+    q = q.strip()
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return _postgres_match(query, q, fuzzy)
+    if dialect == "sqlite":
+        return _sqlite_match(db, query, q, scan_common)
+    return query.where(_any_column_like(q)), None
+
+
+def facet_counts(db, query: Select, facet) -> List[dict]:
+    """The most common values of facet among the files query selects, with their counts"""
+    count = func.count().label("count")
+    rows = db.execute(
+        query.with_only_columns(facet, count)
+        .where(facet.isnot(None))
+        .group_by(facet)
+        .order_by(count.desc(), facet)
+        .limit(FACET_LIMIT)
+    ).all()
+    return [{"value": value, "count": n} for value, n in rows]
@@ -5,12 +5,12 @@ from typing import Tuple
 
 from sqlalchemy.orm import Session
 
-from app.config.settings import MINIO_BUCKET
 from app.models.file_models import File
-from app.storage.minio_client import minio_client, ensure_bucket
+from app.storage.factory import get_storage
 
 
-def _mesh_object_key(object_key: str) -> str:
+def mesh_object_key(object_key: str) -> str:
+    """Storage key of the GLB mesh converted from object_key"""
     safe_key = object_key.replace('/', '__')
     return f"mesh/{safe_key}.glb"
 
@@ -20,17 +20,12 @@ def generate_mesh_url(object_key: str, db: Session) -> Tuple[str, str]:
     if not file_record:
         raise ValueError(f"STP file not found in database: {object_key}")
 
-    ensure_bucket()
-    mesh_key = _mesh_object_key(object_key)
+    storage = get_storage()
+    mesh_key = mesh_object_key(object_key)
 
     try:
-        minio_client.stat_object(MINIO_BUCKET, mesh_key)
-        mesh_url = minio_client.presigned_get_object(
-            MINIO_BUCKET,
-            mesh_key,
-            expires=timedelta(hours=1)
-        )
-        return mesh_url, mesh_key
+        if storage.exists(mesh_key):
+            return storage.presign_get(mesh_key, expires=timedelta(hours=1)), mesh_key
     except Exception:
         pass
 
@@ -63,19 +58,9 @@ def generate_mesh_url(object_key: str, db: Session) -> Tuple[str, str]:
             with open(glb_path, "wb") as handle:
                 handle.write(glb_bytes)
 
-            # Upload GLB to MinIO
-            minio_client.fput_object(
-                MINIO_BUCKET,
-                mesh_key,
-                glb_path,
-                content_type="model/gltf-binary"
-            )
-
-            mesh_url = minio_client.presigned_get_object(
-                MINIO_BUCKET,
-                mesh_key,
-                expires=timedelta(hours=1)
-            )
+            # Upload GLB to object storage
+            storage.put_file(mesh_key, glb_path, content_type="model/gltf-binary")
+            mesh_url = storage.presign_get(mesh_key, expires=timedelta(hours=1))
 
         except Exception as exc:
             raise RuntimeError(f"Mesh generation failed: {exc}") from exc
@@ -0,0 +1,159 @@
+import asyncio
+import hashlib
+import io
+import logging
+import queue
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.storage.factory import get_storage, invalidate_cached
+
+logger = logging.getLogger(__name__)
+
+# Request chunks buffered between the event loop and the storage upload thread
+MAX_BUFFERED_CHUNKS = 16
+_EOF = object()
+
+
+class UploadTooLargeError(ValueError):
+    pass
+
+
+class UploadAborted(IOError):
+    pass
+
+
+@dataclass
+class StreamedUpload:
+    size: int
+    sha256: str
+
+
+class _AsyncFedReader(io.RawIOBase):
+    """
+    Blocking file-like reader for the storage thread, fed from the event loop through a
+    bounded queue. When the queue is full the feeding coroutine waits, which stops reading
+    the request body and lets TCP flow control slow the client down.
+    """
+
+    def __init__(self, max_chunks: int = MAX_BUFFERED_CHUNKS):
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_chunks)
+        self._pending = b""
+        self._done = False
+        self.consumer_stopped = False
+
+    def readable(self) -> bool:
+        return True
+
+    async def feed(self, chunk) -> None:
+        while True:
+            try:
+                self._queue.put_nowait(chunk)
+                return
+            except queue.Full:
+                pass
+            if self.consumer_stopped:
+                raise UploadAborted("Storage upload stopped before the request body was consumed")
+            try:
+                await run_in_threadpool(self._queue.put, chunk, True, 0.5)
+                return
+            except queue.Full:
+                continue
+
+    async def finish(self, error: Optional[BaseException] = None) -> None:
+        await self.feed(error if error is not None else _EOF)
+
+    def read(self, size: int = -1) -> bytes:
+        parts = [self._pending] if self._pending else []
+        have = len(self._pending)
+        self._pending = b""
+        while not self._done and (size is None or size < 0 or have < size):
+            item = self._queue.get()
+            if item is _EOF:
+                self._done = True
+                break
+            if isinstance(item, BaseException):
+                self._done = True
+                raise UploadAborted(str(item)) from item
+            parts.append(item)
+            have += len(item)
+        data = b"".join(parts)
+        if size is not None and size >= 0 and len(data) > size:
+            data, self._pending = data[:size], data[size:]
+        return data
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def drain(self) -> None:
+        """Discard buffered chunks so an abort marker can be queued without blocking"""
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                return
+
+
+async def discard_object(object_key: str) -> None:
+    """Delete an object whose upload failed or was not registered, logging instead of raising"""
+    try:
+        await run_in_threadpool(get_storage().delete, object_key)
+        invalidate_cached(object_key)
+    except Exception as e:
+        logger.warning(f"Failed to delete unregistered upload {object_key}: {e}")
+
+
+async def stream_to_storage(
+    chunks: AsyncIterator[bytes],
+    object_key: str,
+    content_type: str,
+    max_bytes: int,
+) -> StreamedUpload:
+    """
+    Forward an async byte stream to object storage while hashing it and enforcing max_bytes,
+    without holding more than a bounded number of chunks and in-flight parts in memory. On any
+    failure, including the client disconnecting, whatever was written is deleted.
+    """
+    storage = get_storage()
+    reader = _AsyncFedReader()
+    hasher = hashlib.sha256()
+    size = 0
+    upload = asyncio.ensure_future(
+        run_in_threadpool(storage.put, object_key, reader, -1, content_type)
+    )
+    upload.add_done_callback(lambda _: setattr(reader, "consumer_stopped", True))
+
+    try:
+        async for chunk in chunks:
+            if upload.done():
+                break
+            if not chunk:
+                continue
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLargeError(f"File exceeds the maximum size of {max_bytes // (1024 * 1024)} MB")
+            hasher.update(chunk)
+            await reader.feed(chunk)
+        try:
+            if not upload.done():
+                await reader.finish()
+        except UploadAborted:
+            pass
+        await upload
+    except BaseException as e:
+        if not upload.done():
+            reader.drain()
+            await reader.finish(e)
+        try:
+            await upload
+        except BaseException:
+            pass
+        await discard_object(object_key)
+        raise
+
+    invalidate_cached(object_key)
+    return StreamedUpload(size=size, sha256=hasher.hexdigest())
@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session
 from app.models.user_models import User
 from app.auth import get_password_hash, verify_password
+from app.services.notification_service import add_recipient
 from typing import Optional
 
 
@@ -15,6 +16,8 @@ def create_user(db: Session, username: str, password: str, role: str):
     db.add(user)
     db.commit()
     db.refresh(user)
+    if role == "manufacturer":
+        add_recipient(db, username)
     return user
 
 
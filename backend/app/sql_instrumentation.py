@@ -0,0 +1,166 @@
+"""
+Per-request SQL instrumentation.
+
+Cursor execution events on every Engine (sync engines and the sync side of async ones) add
+each statement to the QueryStats of the current request, held in a context variable that
+QueryStatsMiddleware sets. At the end of the request the middleware
+
+- sends a Server-Timing header: db;dur=<ms>;desc="<n> queries"
+- logs a JSON line for requests whose database time reaches SQL_SLOW_REQUEST_MS (or every
+  request when SQL_LOG_ALL_REQUESTS is set), with the slowest statements
+- flags N+1 patterns: the same statement text run SQL_N_PLUS_ONE_THRESHOLD or more times in one
+  request, which is what loading related rows one by one in a loop looks like
+"""
+import json
+import logging
+import re
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+from app import metrics
+from app.config.settings import (
+    SQL_INSTRUMENTATION,
+    SQL_LOG_ALL_REQUESTS,
+    SQL_N_PLUS_ONE_THRESHOLD,
+    SQL_SLOW_REQUEST_MS,
+    SQL_SLOWEST_STATEMENTS,
+)
+
+logger = logging.getLogger(__name__)
+
+MAX_LOGGED_SQL = 300
+
+_queries = metrics.histogram(
+    "sql_queries_per_request", "SQL statements executed per HTTP request", (0, 1, 2, 3, 5, 10, 20, 50, 100)
+)
+_n_plus_one = metrics.counter("sql_n_plus_one_total", "Requests that repeated one statement past the N+1 threshold")
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    seconds: float = 0.0
+    # statement -> [executions, total seconds, slowest execution seconds]
+    statements: Dict[str, list] = field(default_factory=dict)
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.count += 1
+        self.seconds += elapsed
+        entry = self.statements.setdefault(statement, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += elapsed
+        entry[2] = max(entry[2], elapsed)
+
+    def slowest(self, n: int) -> List[Tuple[str, float]]:
+        ranked = sorted(self.statements.items(), key=lambda item: item[1][2], reverse=True)
+        return [(statement, entry[2]) for statement, entry in ranked[:n]]
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        if threshold <= 0:
+            return []
+        return [
+            (statement, entry[0])
+            for statement, entry in self.statements.items()
+            if entry[0] >= threshold
+        ]
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.seconds * 1000:.1f};desc="{self.count} queries"'
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("sql_query_stats", default=None)
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _current.get()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = conn.info.get("query_started")
+    if stats is not None and started:
+        stats.record(statement, time.perf_counter() - started.pop())
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started"):
+        connection.info["query_started"].pop()
+
+
+def _short(statement: str) -> str:
+    statement = re.sub(r"\s+", " ", statement).strip()
+    return statement if len(statement) <= MAX_LOGGED_SQL else statement[:MAX_LOGGED_SQL] + "..."
+
+
+def _report(scope, status: Optional[int], stats: QueryStats, elapsed: float) -> None:
+    route = getattr(scope.get("route"), "path", None) or scope.get("path", "")
+    _queries.observe(stats.count, route=route)
+    repeated = stats.repeated(SQL_N_PLUS_ONE_THRESHOLD)
+    db_ms = stats.seconds * 1000
+    if not (repeated or SQL_LOG_ALL_REQUESTS or (SQL_SLOW_REQUEST_MS and db_ms >= SQL_SLOW_REQUEST_MS)):
+        return
+
+    record = {
+        "method": scope.get("method"),
+        "route": route,
+        "status": status,
+        "duration_ms": round(elapsed * 1000, 1),
+        "queries": stats.count,
+        "db_ms": round(db_ms, 1),
+        "slowest": [
+            {"sql": _short(statement), "ms": round(seconds * 1000, 1)}
+            for statement, seconds in stats.slowest(SQL_SLOWEST_STATEMENTS)
+        ],
+    }
+    if repeated:
+        _n_plus_one.inc(route=route)
+        record["n_plus_one"] = [{"sql": _short(statement), "count": count} for statement, count in repeated]
+        logger.warning(json.dumps(record))
+    else:
+        logger.info(json.dumps(record))
+
+
+class QueryStatsMiddleware:
+    """ASGI middleware collecting QueryStats for each HTTP request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not SQL_INSTRUMENTATION:
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        status = None
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if stats.count:
+                    MutableHeaders(scope=message).append("Server-Timing", stats.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            _report(scope, status, stats, time.perf_counter() - started)
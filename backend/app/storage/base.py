@@ -0,0 +1,110 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import BinaryIO, Dict, Iterator, Optional
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class ObjectNotFoundError(FileNotFoundError):
+    """Raised when a storage key does not exist"""
+
+
+@dataclass
+class ObjectStat:
+    key: str
+    size: int
+    etag: str
+    content_type: str
+    last_modified: Optional[datetime] = None
+    # User metadata with lower-case keys and no transport prefix (e.g. "codec")
+    metadata: Dict[str, str] = field(default_factory=dict)
+
+
+class StorageBackend(ABC):
+    """Object storage used for CAD files and generated meshes"""
+
+    name = "base"
+
+    @abstractmethod
+    def put(
+        self,
+        key: str,
+        data: BinaryIO,
+        length: int = -1,
+        content_type: str = "application/octet-stream",
+        metadata: Optional[Dict[str, str]] = None,
+    ) -> ObjectStat:
+        """Store a readable stream under key; length -1 means unknown"""
+
+    @abstractmethod
+    def put_file(
+        self,
+        key: str,
+        file_path: str,
+        content_type: str = "application/octet-stream",
+        metadata: Optional[Dict[str, str]] = None,
+    ) -> ObjectStat:
+        """Store a local file under key"""
+
+    @abstractmethod
+    def get(self, key: str, offset: int = 0, length: Optional[int] = None) -> BinaryIO:
+        """Open the stored bytes of key for reading; the caller must close it"""
+
+    @abstractmethod
+    def stat(self, key: str) -> ObjectStat:
+        """Return object metadata or raise ObjectNotFoundError"""
+
+    @abstractmethod
+    def presign_get(
+        self,
+        key: str,
+        expires: timedelta = timedelta(hours=1),
+        response_headers: Optional[Dict[str, str]] = None,
+    ) -> str:
+        """URL a client can GET without credentials"""
+
+    @abstractmethod
+    def presign_put(self, key: str, expires: timedelta = timedelta(minutes=15)) -> str:
+        """URL a client can PUT the object body to without credentials"""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove key; missing keys are ignored"""
+
+    @abstractmethod
+    def copy(self, source_key: str, key: str, metadata: Optional[Dict[str, str]] = None) -> None:
+        """Server-side copy, replacing user metadata when given"""
+
+    @abstractmethod
+    def list(self, prefix: str = "") -> Iterator[ObjectStat]:
+        """Iterate objects under prefix, including user metadata"""
+
+    def stream(
+        self,
+        key: str,
+        offset: int = 0,
+        length: Optional[int] = None,
+        chunk_size: int = CHUNK_SIZE,
+    ) -> Iterator[bytes]:
+        """Yield the stored bytes of key in chunks"""
+        handle = self.get(key, offset=offset, length=length)
+        try:
+            while True:
+                chunk = handle.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            handle.close()
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.stat(key)
+            return True
+        except ObjectNotFoundError:
+            return False
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Filesystem path of the stored bytes when the backend keeps them on local disk"""
+        return None
@@ -0,0 +1,131 @@
+import hashlib
+import logging
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+from uuid import uuid4
+
+from app import metrics
+from app.storage.base import StorageBackend
+from app.storage.codecs import decoded_size, iter_decoded
+
+logger = logging.getLogger(__name__)
+
+cache_hits = metrics.counter("storage_cache_hits_total", "Read-through cache hits")
+cache_misses = metrics.counter("storage_cache_misses_total", "Read-through cache misses")
+cache_evictions = metrics.counter("storage_cache_evictions_total", "Objects evicted from the read-through cache")
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class ReadThroughCache:
+    """
+    LRU disk cache of decoded objects in front of a remote backend.
+
+    Entries are keyed by storage key and validated against the remote ETag on every
+    lookup, so a HEAD request replaces a full download when the object is hot.
+    """
+
+    def __init__(self, storage: StorageBackend, root: Path, max_bytes: int, max_object_bytes: int):
+        self.storage = storage
+        self.root = self._prepare_root(Path(root))
+        self.max_bytes = max_bytes
+        self.max_object_bytes = max_object_bytes
+        self._entries: "OrderedDict[str, tuple[str, int, str]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        metrics.gauge("storage_cache_bytes", "Bytes held by the read-through cache", lambda: {(): self._size})
+        metrics.gauge("storage_cache_entries", "Objects held by the read-through cache", lambda: {(): len(self._entries)})
+
+    def _file_name(self, key: str, etag: str) -> str:
+        digest = hashlib.sha1(key.encode()).hexdigest()
+        version = hashlib.sha1(etag.encode()).hexdigest()[:16]
+        return f"{digest}-{version}"
+
+    def _prepare_root(self, base: Path) -> Path:
+        # Each worker process owns a subdirectory; directories of dead workers are removed
+        base.mkdir(parents=True, exist_ok=True)
+        for entry in base.iterdir():
+            if entry.is_dir() and entry.name.isdigit() and not _pid_alive(int(entry.name)):
+                shutil.rmtree(entry, ignore_errors=True)
+        root = base / str(os.getpid())
+        shutil.rmtree(root, ignore_errors=True)
+        root.mkdir()
+        return root
+
+    def _evict(self) -> None:
+        while self._size > self.max_bytes and self._entries:
+            _, (path, size, _) = self._entries.popitem(last=False)
+            self._size -= size
+            cache_evictions.inc()
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry:
+                self._size -= entry[1]
+        if entry:
+            try:
+                os.remove(entry[0])
+            except FileNotFoundError:
+                pass
+
+    def get_path(self, key: str) -> Optional[str]:
+        """Local path of the decoded object, or None when it is too large to cache"""
+        stat = self.storage.stat(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[2] == stat.etag and os.path.exists(entry[0]):
+                self._entries.move_to_end(key)
+                cache_hits.inc()
+                return entry[0]
+
+        cache_misses.inc()
+        expected_size = decoded_size(stat)
+        if expected_size is not None and expected_size > self.max_object_bytes:
+            return None
+
+        path = self.root / self._file_name(key, stat.etag)
+        tmp_path = self.root / f".{uuid4()}"
+        size = 0
+        try:
+            with open(tmp_path, "wb") as handle:
+                for chunk in iter_decoded(self.storage, key, stat):
+                    size += len(chunk)
+                    if size > self.max_object_bytes:
+                        return None
+                    handle.write(chunk)
+            os.replace(tmp_path, path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous:
+                self._size -= previous[1]
+                if previous[0] != str(path):
+                    try:
+                        os.remove(previous[0])
+                    except FileNotFoundError:
+                        pass
+            self._entries[key] = (str(path), size, stat.etag)
+            self._size += size
+            self._evict()
+        logger.info(f"Cached {key} ({size} bytes)")
+        return str(path)
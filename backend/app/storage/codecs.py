@@ -0,0 +1,53 @@
+from typing import Iterator, Optional
+
+from app.storage.base import CHUNK_SIZE, ObjectStat, StorageBackend
+
+CODEC_META_KEY = "codec"
+ORIGINAL_SIZE_META_KEY = "original-size"
+ZSTD = "zstd"
+
+
+def zstd_module():
+    try:
+        import zstandard
+    except Exception as exc:
+        raise RuntimeError("zstandard is required for STEP compression. Run: pip install zstandard") from exc
+    return zstandard
+
+
+def get_codec(stat: ObjectStat) -> Optional[str]:
+    """Storage codec recorded in object metadata, or None when the object is stored as-is"""
+    return stat.metadata.get(CODEC_META_KEY)
+
+
+def decoded_size(stat: ObjectStat) -> Optional[int]:
+    """Size of the original bytes, when known without reading the object"""
+    if not get_codec(stat):
+        return stat.size
+    original = stat.metadata.get(ORIGINAL_SIZE_META_KEY)
+    return int(original) if original else None
+
+
+def accepts_zstd(accept_encoding: Optional[str]) -> bool:
+    if not accept_encoding:
+        return False
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding.strip().lower() == ZSTD:
+            return params.replace(" ", "") not in ("q=0", "q=0.0")
+    return False
+
+
+def iter_decoded(storage: StorageBackend, key: str, stat: Optional[ObjectStat] = None) -> Iterator[bytes]:
+    """Yield the original bytes of an object, decompressing zstd objects on the fly"""
+    stat = stat or storage.stat(key)
+    if get_codec(stat) != ZSTD:
+        yield from storage.stream(key)
+        return
+
+    handle = storage.get(key)
+    try:
+        decompressor = zstd_module().ZstdDecompressor()
+        yield from decompressor.read_to_iter(handle, read_size=CHUNK_SIZE, write_size=CHUNK_SIZE)
+    finally:
+        handle.close()
@@ -0,0 +1,70 @@
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from app.config.settings import (
+    STORAGE_BACKEND,
+    STORAGE_LOCAL_DIR,
+    STORAGE_CACHE_ENABLED,
+    STORAGE_CACHE_DIR,
+    STORAGE_CACHE_MAX_MB,
+    STORAGE_CACHE_MAX_OBJECT_MB,
+)
+from app.storage.base import StorageBackend
+from app.storage.cache import ReadThroughCache
+from app.storage.codecs import get_codec, iter_decoded
+
+
+@lru_cache(maxsize=1)
+def get_storage() -> StorageBackend:
+    """The configured object storage backend"""
+    if STORAGE_BACKEND == "filesystem":
+        from app.storage.local_storage import FilesystemBackend, UPLOAD_DIR
+        return FilesystemBackend(Path(STORAGE_LOCAL_DIR) if STORAGE_LOCAL_DIR else UPLOAD_DIR)
+    if STORAGE_BACKEND == "minio":
+        from app.storage.minio_backend import MinioBackend
+        return MinioBackend()
+    raise ValueError(f"Unknown STORAGE_BACKEND: {STORAGE_BACKEND}")
+
+
+@lru_cache(maxsize=1)
+def get_cache() -> Optional[ReadThroughCache]:
+    """Read-through disk cache in front of remote storage; None for local backends or when disabled"""
+    storage = get_storage()
+    if not STORAGE_CACHE_ENABLED or storage.name == "filesystem":
+        return None
+    return ReadThroughCache(
+        storage,
+        Path(STORAGE_CACHE_DIR),
+        max_bytes=STORAGE_CACHE_MAX_MB * 1024 * 1024,
+        max_object_bytes=STORAGE_CACHE_MAX_OBJECT_MB * 1024 * 1024,
+    )
+
+
+def local_copy(key: str, fallback_path: str) -> str:
+    """
+    Path of the decoded object on local disk: the stored file itself, a cache entry,
+    or a fresh download to fallback_path. Callers must treat the result as read-only.
+    """
+    storage = get_storage()
+    stat = storage.stat(key)
+    path = storage.local_path(key)
+    if path and not get_codec(stat):
+        return path
+
+    cache = get_cache()
+    if cache:
+        cached = cache.get_path(key)
+        if cached:
+            return cached
+
+    with open(fallback_path, "wb") as handle:
+        for chunk in iter_decoded(storage, key, stat):
+            handle.write(chunk)
+    return fallback_path
+
+
+def invalidate_cached(key: str) -> None:
+    cache = get_cache()
+    if cache:
+        cache.invalidate(key)
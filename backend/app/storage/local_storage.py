@@ -1,53 +1,201 @@
+import io
+import json
 import os
+import shutil
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, Optional
+from urllib.parse import quote
 from uuid import uuid4
 
+from app.auth import create_object_token
+from app.config.settings import PUBLIC_API_URL
+from app.storage.base import CHUNK_SIZE, ObjectNotFoundError, ObjectStat, StorageBackend
+
 
 UPLOAD_DIR = Path(__file__).parent.parent.parent / "uploads"
+META_DIR_NAME = ".meta"
+TMP_DIR_NAME = ".tmp"
 
 
 def ensure_upload_dir():
     UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
 
-def save_file_locally(file_data: bytes, filename: str) -> str:
-    """Save file to local filesystem and return path"""
-    ensure_upload_dir()
-    
-    unique_name = f"{uuid4()}_{filename}"
-    file_path = UPLOAD_DIR / unique_name
-    
-    with open(file_path, 'wb') as f:
-        f.write(file_data)
-    
-    return str(file_path)
-
-
-def get_local_file_url(file_path: str) -> str:
-    """Get a URL to access the locally stored file"""
-    if os.path.exists(file_path):
-        return f"http://localhost:8000/files/local/{Path(file_path).name}"
-    return None
-
-
-def get_file_from_local(filename: str) -> bytes:
-    """Read file from local storage"""
-    file_path = UPLOAD_DIR / filename
-    
-    if not file_path.exists():
-        raise FileNotFoundError(f"File not found: {filename}")
-    
-    with open(file_path, 'rb') as f:
-        return f.read()
-
-
-def delete_local_file(file_path: str) -> bool:
-    """Delete a file from local storage"""
-    try:
-        if os.path.exists(file_path):
-            os.remove(file_path)
-            return True
-        return False
-    except Exception as e:
-        print(f"Error deleting file: {e}")
-        return False
+def signed_content_url(key: str, expires: timedelta, action: str = "get") -> str:
+    """URL of the backend content route for key, authorised by a signed token"""
+    token = create_object_token(key, expires, action)
+    return f"{PUBLIC_API_URL}/files/content/{quote(key)}?token={token}"
+
+
+def get_local_file_url(file_path: str, expires: timedelta = timedelta(hours=1)) -> Optional[str]:
+    """Get a signed URL to the range-capable content route for a file under UPLOAD_DIR"""
+    path = Path(file_path).resolve()
+    if not path.is_file() or UPLOAD_DIR.resolve() not in path.parents:
+        return None
+    return signed_content_url(path.relative_to(UPLOAD_DIR.resolve()).as_posix(), expires)
+
+
+class _RangeReader(io.RawIOBase):
+    """Reads at most length bytes of an open file from its current position"""
+
+    def __init__(self, handle: BinaryIO, length: Optional[int]):
+        self._handle = handle
+        self._remaining = length
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        if self._remaining is not None:
+            if self._remaining <= 0:
+                return b""
+            size = self._remaining if size is None or size < 0 else min(size, self._remaining)
+        data = self._handle.read(size)
+        if self._remaining is not None:
+            self._remaining -= len(data)
+        return data
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self) -> None:
+        self._handle.close()
+        super().close()
+
+
+class FilesystemBackend(StorageBackend):
+    """Stores objects as plain files under root; user metadata lives in JSON sidecars under .meta/"""
+
+    name = "filesystem"
+
+    def __init__(self, root: Path = UPLOAD_DIR):
+        self.root = Path(root).resolve()
+        self.meta_root = self.root / META_DIR_NAME
+        self.tmp_root = self.root / TMP_DIR_NAME
+
+    def _path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if self.root not in path.parents or path.name.startswith(".") or META_DIR_NAME in path.parts:
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def _meta_path(self, key: str) -> Path:
+        return self.meta_root / f"{key}.json"
+
+    def _write_meta(self, key: str, content_type: str, metadata: Optional[Dict[str, str]]) -> None:
+        meta_path = self._meta_path(key)
+        meta_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(meta_path, "w") as handle:
+            json.dump({"content_type": content_type, "metadata": dict(metadata or {})}, handle)
+
+    def _read_meta(self, key: str) -> dict:
+        try:
+            with open(self._meta_path(key)) as handle:
+                return json.load(handle)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _tmp_path(self) -> Path:
+        self.tmp_root.mkdir(parents=True, exist_ok=True)
+        return self.tmp_root / str(uuid4())
+
+    def _commit(self, tmp_path: Path, key: str, content_type: str, metadata) -> ObjectStat:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._write_meta(key, content_type, metadata)
+        os.replace(tmp_path, path)
+        return self.stat(key)
+
+    def put(self, key, data, length=-1, content_type="application/octet-stream", metadata=None) -> ObjectStat:
+        self._path(key)
+        tmp_path = self._tmp_path()
+        try:
+            with open(tmp_path, "wb") as handle:
+                remaining = length if length >= 0 else None
+                while remaining is None or remaining > 0:
+                    chunk = data.read(CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    handle.write(chunk)
+                    if remaining is not None:
+                        remaining -= len(chunk)
+            return self._commit(tmp_path, key, content_type, metadata)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+    def put_file(self, key, file_path, content_type="application/octet-stream", metadata=None) -> ObjectStat:
+        self._path(key)
+        tmp_path = self._tmp_path()
+        try:
+            shutil.copyfile(file_path, tmp_path)
+            return self._commit(tmp_path, key, content_type, metadata)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+    def get(self, key: str, offset: int = 0, length: Optional[int] = None) -> BinaryIO:
+        try:
+            handle = open(self._path(key), "rb")
+        except FileNotFoundError as e:
+            raise ObjectNotFoundError(key) from e
+        if offset:
+            handle.seek(offset)
+        return _RangeReader(handle, length)
+
+    def stat(self, key: str) -> ObjectStat:
+        try:
+            result = os.stat(self._path(key))
+        except FileNotFoundError as e:
+            raise ObjectNotFoundError(key) from e
+        meta = self._read_meta(key)
+        return ObjectStat(
+            key=key,
+            size=result.st_size,
+            etag=f"{result.st_size:x}-{result.st_mtime_ns:x}",
+            content_type=meta.get("content_type") or "application/octet-stream",
+            last_modified=datetime.fromtimestamp(result.st_mtime, tz=timezone.utc),
+            metadata=meta.get("metadata") or {},
+        )
+
+    def presign_get(self, key, expires=timedelta(hours=1), response_headers=None) -> str:
+        return signed_content_url(key, expires, "get")
+
+    def presign_put(self, key, expires=timedelta(minutes=15)) -> str:
+        return signed_content_url(key, expires, "put")
+
+    def delete(self, key: str) -> None:
+        for path in (self._path(key), self._meta_path(key)):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def copy(self, source_key: str, key: str, metadata: Optional[Dict[str, str]] = None) -> None:
+        source = self.stat(source_key)
+        self.put_file(
+            key,
+            str(self._path(source_key)),
+            content_type=source.content_type,
+            metadata=source.metadata if metadata is None else metadata,
+        )
+
+    def list(self, prefix: str = "") -> Iterator[ObjectStat]:
+        if not self.root.exists():
+            return
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if d not in (META_DIR_NAME, TMP_DIR_NAME)]
+            for filename in filenames:
+                key = Path(dirpath, filename).relative_to(self.root).as_posix()
+                if key.startswith(prefix):
+                    try:
+                        yield self.stat(key)
+                    except ObjectNotFoundError:
+                        continue
+
+    def local_path(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        return str(path) if path.exists() else None
@@ -0,0 +1,154 @@
+import io
+from datetime import timedelta
+from typing import BinaryIO, Dict, Iterator, Optional
+
+from minio.commonconfig import CopySource, REPLACE
+from minio.error import S3Error
+
+from app.config.settings import MINIO_BUCKET, UPLOAD_PART_SIZE_MB, UPLOAD_MAX_INFLIGHT_PARTS
+from app.storage.base import ObjectNotFoundError, ObjectStat, StorageBackend
+from app.storage.minio_client import minio_client, ensure_bucket
+
+# MinIO uploads at most UPLOAD_MAX_INFLIGHT_PARTS parts of this size concurrently for streams of unknown length
+PART_SIZE = max(UPLOAD_PART_SIZE_MB, 5) * 1024 * 1024
+META_PREFIX = "x-amz-meta-"
+NOT_FOUND_CODES = {"NoSuchKey", "NoSuchObject", "NoSuchBucket"}
+
+
+def _user_metadata(headers) -> Dict[str, str]:
+    metadata = {}
+    for key, value in (headers or {}).items():
+        key = key.lower()
+        if key.startswith(META_PREFIX):
+            metadata[key[len(META_PREFIX):]] = value
+    return metadata
+
+
+class _ObjectReader(io.RawIOBase):
+    """File-like wrapper that returns the MinIO connection to the pool on close"""
+
+    def __init__(self, response):
+        self._response = response
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        return self._response.read(None if size is None or size < 0 else size)
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self) -> None:
+        if not self.closed:
+            self._response.close()
+            self._response.release_conn()
+        super().close()
+
+
+class MinioBackend(StorageBackend):
+    name = "minio"
+
+    def __init__(self, client=minio_client, bucket: str = MINIO_BUCKET):
+        self.client = client
+        self.bucket = bucket
+        self._bucket_ready = False
+
+    def _ensure_bucket(self) -> None:
+        if not self._bucket_ready:
+            self._bucket_ready = ensure_bucket()
+
+    def put(self, key, data, length=-1, content_type="application/octet-stream", metadata=None) -> ObjectStat:
+        self._ensure_bucket()
+        self.client.put_object(
+            self.bucket,
+            key,
+            data,
+            length=length,
+            content_type=content_type,
+            metadata=dict(metadata) if metadata else None,
+            part_size=PART_SIZE if length < 0 else 0,
+            num_parallel_uploads=UPLOAD_MAX_INFLIGHT_PARTS,
+        )
+        return self.stat(key)
+
+    def put_file(self, key, file_path, content_type="application/octet-stream", metadata=None) -> ObjectStat:
+        self._ensure_bucket()
+        self.client.fput_object(
+            self.bucket,
+            key,
+            file_path,
+            content_type=content_type,
+            metadata=dict(metadata) if metadata else None,
+        )
+        return self.stat(key)
+
+    def get(self, key: str, offset: int = 0, length: Optional[int] = None) -> BinaryIO:
+        try:
+            response = self.client.get_object(self.bucket, key, offset=offset, length=length or 0)
+        except S3Error as e:
+            if e.code in NOT_FOUND_CODES:
+                raise ObjectNotFoundError(key) from e
+            raise
+        return _ObjectReader(response)
+
+    def stat(self, key: str) -> ObjectStat:
+        try:
+            result = self.client.stat_object(self.bucket, key)
+        except S3Error as e:
+            if e.code in NOT_FOUND_CODES:
+                raise ObjectNotFoundError(key) from e
+            raise
+        return ObjectStat(
+            key=key,
+            size=result.size,
+            etag=result.etag,
+            content_type=result.content_type or "application/octet-stream",
+            last_modified=result.last_modified,
+            metadata=_user_metadata(result.metadata),
+        )
+
+    def presign_get(self, key, expires=timedelta(hours=1), response_headers=None) -> str:
+        self._ensure_bucket()
+        return self.client.presigned_get_object(
+            self.bucket,
+            key,
+            expires=expires,
+            response_headers=response_headers,
+        )
+
+    def presign_put(self, key, expires=timedelta(minutes=15)) -> str:
+        self._ensure_bucket()
+        return self.client.presigned_put_object(self.bucket, key, expires=expires)
+
+    def delete(self, key: str) -> None:
+        self.client.remove_object(self.bucket, key)
+
+    def copy(self, source_key: str, key: str, metadata: Optional[Dict[str, str]] = None) -> None:
+        if metadata is None:
+            self.client.copy_object(self.bucket, key, CopySource(self.bucket, source_key))
+            return
+        source = self.stat(source_key)
+        self.client.copy_object(
+            self.bucket,
+            key,
+            CopySource(self.bucket, source_key),
+            metadata={"Content-Type": source.content_type, **metadata},
+            metadata_directive=REPLACE,
+        )
+
+    def list(self, prefix: str = "") -> Iterator[ObjectStat]:
+        objects = self.client.list_objects(self.bucket, prefix=prefix, recursive=True, include_user_meta=True)
+        for obj in objects:
+            if obj.is_dir:
+                continue
+            yield ObjectStat(
+                key=obj.object_name,
+                size=obj.size,
+                etag=obj.etag,
+                content_type=obj.content_type or "application/octet-stream",
+                last_modified=obj.last_modified,
+                metadata=_user_metadata(obj.metadata),
+            )
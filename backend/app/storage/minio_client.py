@@ -14,10 +14,12 @@ minio_client = Minio(
     secure=MINIO_SECURE,
 )
 
-def ensure_bucket():
+def ensure_bucket() -> bool:
     """Ensure the bucket exists. Call this when needed, not at import time."""
     try:
         if not minio_client.bucket_exists(MINIO_BUCKET):
             minio_client.make_bucket(MINIO_BUCKET)
+        return True
     except Exception as e:
         print(f"Warning: Could not connect to MinIO: {e}")
+        return False
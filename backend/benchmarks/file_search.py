@@ -0,0 +1,132 @@
+"""
+File search benchmark at scale.
+
+Seeds the database named by DATABASE_URL with synthetic files, then times search_files for a set
+of queries and the old name-only ILIKE scan they replace, reporting latency percentiles:
+
+    export DATABASE_URL=sqlite:////tmp/search.db   # or postgresql://...
+    alembic upgrade head
+    python benchmarks/file_search.py --seed 1000000
+
+Seeding is skipped when the database already holds --seed files, so later runs only measure.
+Run from the backend directory.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, insert, select  # noqa: E402
+
+from app.config.database import SessionLocal, init_db  # noqa: E402
+from app.models.file_models import File, FileSearchRequest  # noqa: E402
+from app.services.file_service import search_files  # noqa: E402
+
+PARTS = ["bracket", "housing", "flange", "shaft", "gear", "spacer", "cover", "hinge", "clamp", "manifold"]
+VARIANTS = ["left", "right", "upper", "lower", "rev", "mk", "proto", "final"]
+MATERIALS = ["aluminium 6061", "steel s235", "stainless 316", "brass", "pom", "titanium gr5", "abs", "copper"]
+EXTENSIONS = [".step", ".stp", ".igs", ".stl"]
+USERS = [f"buyer{i}" for i in range(50)]
+WORDS = ["machined", "anodised", "welded", "turned", "milled", "assembly", "prototype", "tolerance", "thread", "polished"]
+
+DEFAULT_QUERIES = ["bracket", "flange left", "316", "hsg", "manifold proto", "anodised", "brcket"]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def synthetic_files(start: int, count: int, rng: random.Random):
+    now = datetime.utcnow()
+    for i in range(start, start + count):
+        part = rng.choice(PARTS)
+        name = f"{part}_{rng.choice(VARIANTS)}_{i}{rng.choice(EXTENSIONS)}"
+        created_at = now - timedelta(seconds=i)
+        yield {
+            "object_key": f"stp/bench_{name}",
+            "original_name": name,
+            "content_type": "application/octet-stream",
+            "description": " ".join(rng.sample(WORDS, 3)) + f" {part}",
+            "material": rng.choice(MATERIALS),
+            "part_number": f"{part[:3].upper()}-{i:07d}",
+            "quantity_unit": "pieces",
+            "created_by": rng.choice(USERS),
+            "created_at": created_at,
+            "updated_at": created_at,
+        }
+
+
+def seed(db, target: int, batch: int) -> None:
+    existing = db.execute(select(func.count()).select_from(File)).scalar_one()
+    if existing >= target:
+        print(f"{existing} files present, skipping seed")
+        return
+    rng = random.Random(42)
+    started = time.perf_counter()
+    for start in range(existing, target, batch):
+        db.execute(insert(File), list(synthetic_files(start, min(batch, target - start), rng)))
+        db.commit()
+    print(f"seeded {target - existing} files in {time.perf_counter() - started:.1f}s")
+
+
+def measure(label: str, run, repeat: int) -> None:
+    run()  # warm caches
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = run()
+        latencies.append(time.perf_counter() - started)
+    print(
+        f"{label:<40} rows={result:<5} "
+        f"p50={percentile(latencies, 0.50) * 1000:8.1f}ms "
+        f"p95={percentile(latencies, 0.95) * 1000:8.1f}ms "
+        f"mean={statistics.mean(latencies) * 1000:8.1f}ms"
+    )
+
+
+def main(args):
+    init_db()
+    db = SessionLocal()
+    try:
+        if args.seed:
+            seed(db, args.seed, args.batch)
+
+        for q in args.queries:
+            def legacy(q=q):
+                return len(db.execute(
+                    select(File).where(File.original_name.ilike(f"%{q}%"))
+                    .order_by(File.created_at.desc(), File.id.desc()).limit(args.limit)
+                ).scalars().all())
+
+            def indexed(q=q, **extra):
+                params = FileSearchRequest(query=q, limit=args.limit, count=args.count, **extra)
+                return len(search_files(params, db)[0].items)
+
+            measure(f"legacy ilike   {q!r}", legacy, args.repeat)
+            measure(f"search         {q!r}", indexed, args.repeat)
+            measure(f"search+facets  {q!r}", lambda q=q: indexed(q, facets=True), args.repeat)
+            if args.fuzzy:
+                measure(f"search fuzzy   {q!r}", lambda q=q: indexed(q, fuzzy=True), args.repeat)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seed", type=int, default=0, help="Ensure at least this many files exist")
+    parser.add_argument("--batch", type=int, default=10000, help="Rows per seeding insert")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--count", choices=["exact", "estimate", "none"], default="estimate")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--fuzzy", action="store_true", help="Also time fuzzy matching (PostgreSQL)")
+    parser.add_argument("--query", dest="queries", action="append", help="Query to time; repeatable")
+    args = parser.parse_args()
+    args.queries = args.queries or DEFAULT_QUERIES
+    main(args)
@@ -0,0 +1,90 @@
+"""
+Concurrency benchmark for the quote endpoints.
+
+Fires requests from N parallel clients at a running API and reports latency percentiles.
+Run it against a build from before and after a change to compare, e.g.:
+
+    uvicorn app.main:app --port 8000 --workers 1
+    python benchmarks/quotes_concurrency.py --username manufacturer --password secret --clients 200
+
+Use a single worker so the numbers show how one event loop copes with concurrent requests.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+DEFAULT_PATHS = ["/quotes?limit=50", "/quotes/manufacturer/stats", "/quotes/status/all"]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def login(client: httpx.AsyncClient, username: str, password: str) -> str:
+    response = await client.post("/auth/login", json={"username": username, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def run_client(client: httpx.AsyncClient, paths, requests_per_client, latencies, errors):
+    for i in range(requests_per_client):
+        path = paths[i % len(paths)]
+        started = time.perf_counter()
+        try:
+            response = await client.get(path)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - started)
+
+
+async def main(args):
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout) as client:
+        token = args.token or await login(client, args.username, args.password)
+        client.headers["Authorization"] = f"Bearer {token}"
+
+        # Warm the connection pools on both sides before measuring
+        await asyncio.gather(*(client.get(args.paths[0]) for _ in range(min(args.clients, 20))))
+
+        latencies, errors = [], []
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            run_client(client, args.paths, args.requests, latencies, errors)
+            for _ in range(args.clients)
+        ))
+        elapsed = time.perf_counter() - started
+
+    print(f"clients={args.clients} requests={len(latencies)} errors={len(errors)} elapsed={elapsed:.2f}s")
+    print(f"throughput={len(latencies) / elapsed:.1f} req/s")
+    print(
+        "latency ms: "
+        f"p50={percentile(latencies, 0.50) * 1000:.1f} "
+        f"p95={percentile(latencies, 0.95) * 1000:.1f} "
+        f"p99={percentile(latencies, 0.99) * 1000:.1f} "
+        f"max={max(latencies) * 1000:.1f} "
+        f"mean={statistics.mean(latencies) * 1000:.1f}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--token", help="Bearer token; otherwise --username/--password are used to log in")
+    parser.add_argument("--username")
+    parser.add_argument("--password")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=20, help="Requests per client")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--path", dest="paths", action="append", help="Endpoint to hit; repeatable")
+    args = parser.parse_args()
+    args.paths = args.paths or DEFAULT_PATHS
+    if not args.token and not (args.username and args.password):
+        parser.error("pass --token or --username and --password")
+    asyncio.run(main(args))
@@ -0,0 +1,78 @@
+import re
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine, pool
+
+from app.config.settings import DATABASE_URL
+from app.models.file_models import Base
+from app.models import (  # noqa: F401  register every table on Base.metadata
+    counter_models,
+    material_price_models,
+    notification_models,
+    outbox_models,
+    quote_models,
+    quote_notification_models,
+    user_models,
+)
+
+config = context.config
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+# Search structures are managed by hand in migrations rather than declared on the models
+UNMANAGED_PREFIXES = ("files_fts", "ix_files_search_")
+# PostgreSQL partitions of the notification tables, created by the retention job
+PARTITION = re.compile(r"(notifications|quote_notifications)_(p\d{4}_\d{2}|default)")
+
+
+def include_name(name, type_, parent_names):
+    if not name:
+        return True
+    if type_ == "table" and PARTITION.fullmatch(name):
+        return False
+    return not name.startswith(UNMANAGED_PREFIXES)
+
+
+def _database_url() -> str:
+    url = config.get_main_option("sqlalchemy.url") or DATABASE_URL
+    if not url:
+        raise RuntimeError("Set DATABASE_URL to run migrations")
+    return url
+
+
+def run_migrations_offline() -> None:
+    url = _database_url()
+    context.configure(
+        url=url,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        include_name=include_name,
+        render_as_batch=url.startswith("sqlite"),
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    connectable = create_engine(_database_url(), poolclass=pool.NullPool)
+
+    with connectable.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_name=include_name,
+            # SQLite cannot ALTER most constraints; batch mode recreates the table instead
+            render_as_batch=connection.dialect.name == "sqlite",
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,202 @@
+"""baseline schema
+
+The schema as init_db used to create it. Databases created that way are adopted in place:
+tables and indexes that already exist are left alone, and files.created_by, which init_db
+added with an ALTER on every startup, is added and backfilled if missing.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 07:36:03.951891
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _existing_tables():
+    # Offline (--sql) runs cannot inspect the database and script a fresh one
+    if context.is_offline_mode():
+        return set()
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def _create_table(existing, name, *columns):
+    if name not in existing:
+        op.create_table(name, *columns)
+
+
+def _create_indexes(table, indexes):
+    present = set()
+    if not context.is_offline_mode() and table in _existing_tables():
+        present = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+    for name, columns, unique in indexes:
+        if name not in present:
+            op.create_index(name, table, columns, unique=unique)
+
+
+def upgrade() -> None:
+    existing = _existing_tables()
+
+    _create_table(existing, 'counters',
+        sa.Column('scope', sa.String(length=64), nullable=False),
+        sa.Column('owner', sa.String(length=255), nullable=False),
+        sa.Column('metric', sa.String(length=64), nullable=False),
+        sa.Column('value', sa.BigInteger(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('scope', 'owner', 'metric'),
+    )
+
+    _create_table(existing, 'files',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('object_key', sa.String(), nullable=False),
+        sa.Column('original_name', sa.String(), nullable=False),
+        sa.Column('content_type', sa.String(), nullable=False),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.Column('material', sa.String(), nullable=True),
+        sa.Column('part_number', sa.String(), nullable=True),
+        sa.Column('quantity_unit', sa.String(), nullable=True),
+        sa.Column('created_by', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    if 'files' in existing:
+        columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('files')}
+        if 'created_by' not in columns:
+            op.add_column('files', sa.Column('created_by', sa.String(), nullable=True))
+        # Files uploaded before uploads were attributed belong to the single buyer of the time
+        op.execute("UPDATE files SET created_by = 'buyer' WHERE created_by IS NULL")
+    _create_indexes('files', [
+        ('ix_files_created_at', ['created_at'], False),
+        ('ix_files_created_at_id', ['created_at', 'id'], False),
+        ('ix_files_created_by_created_at_id', ['created_by', 'created_at', 'id'], False),
+        ('ix_files_id', ['id'], False),
+        ('ix_files_object_key', ['object_key'], True),
+        ('ix_files_original_name', ['original_name'], False),
+    ])
+
+    _create_table(existing, 'material_prices',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('material_name', sa.String(), nullable=False),
+        sa.Column('base_price_per_unit', sa.Float(), nullable=False),
+        sa.Column('currency', sa.String(), nullable=False),
+        sa.Column('unit', sa.String(), nullable=False),
+        sa.Column('machining_complexity_factor', sa.Float(), nullable=False),
+        sa.Column('minimum_order_quantity', sa.Integer(), nullable=False),
+        sa.Column('bulk_discount_threshold', sa.Integer(), nullable=False),
+        sa.Column('bulk_discount_percentage', sa.Float(), nullable=False),
+        sa.Column('labor_cost_per_hour', sa.Float(), nullable=False),
+        sa.Column('estimated_hours_per_unit', sa.Float(), nullable=False),
+        sa.Column('markup_percentage', sa.Float(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    _create_indexes('material_prices', [
+        ('ix_material_prices_id', ['id'], False),
+        ('ix_material_prices_material_name', ['material_name'], True),
+    ])
+
+    _create_table(existing, 'quotes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('notification_id', sa.Integer(), nullable=False),
+        sa.Column('file_id', sa.Integer(), nullable=False),
+        sa.Column('part_name', sa.String(length=255), nullable=False),
+        sa.Column('part_number', sa.String(length=100), nullable=True),
+        sa.Column('material', sa.String(length=100), nullable=True),
+        sa.Column('quantity_unit', sa.String(length=50), nullable=True),
+        sa.Column('material_cost', sa.Float(), nullable=False),
+        sa.Column('labor_cost', sa.Float(), nullable=False),
+        sa.Column('machine_time_cost', sa.Float(), nullable=False),
+        sa.Column('subtotal', sa.Float(), nullable=False),
+        sa.Column('profit_margin_percent', sa.Float(), nullable=True),
+        sa.Column('profit_amount', sa.Float(), nullable=False),
+        sa.Column('total_price', sa.Float(), nullable=False),
+        sa.Column('status', sa.String(length=50), nullable=True),
+        sa.Column('notes', sa.Text(), nullable=True),
+        sa.Column('created_by', sa.String(length=255), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('accepted_at', sa.DateTime(), nullable=True),
+        sa.Column('rejected_at', sa.DateTime(), nullable=True),
+        sa.Column('rejection_reason', sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    _create_indexes('quotes', [
+        ('ix_quotes_created_at_id', ['created_at', 'id'], False),
+        ('ix_quotes_created_by_created_at_id', ['created_by', 'created_at', 'id'], False),
+        ('ix_quotes_file_id_created_at_id', ['file_id', 'created_at', 'id'], False),
+    ])
+
+    _create_table(existing, 'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('username', sa.String(length=255), nullable=False),
+        sa.Column('password_hash', sa.String(length=255), nullable=False),
+        sa.Column('role', sa.String(length=50), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    _create_indexes('users', [
+        ('ix_users_username', ['username'], True),
+    ])
+
+    _create_table(existing, 'notifications',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('file_id', sa.Integer(), nullable=False),
+        sa.Column('object_key', sa.String(), nullable=False),
+        sa.Column('part_name', sa.String(), nullable=False),
+        sa.Column('material', sa.String(), nullable=True),
+        sa.Column('part_number', sa.String(), nullable=True),
+        sa.Column('quantity_unit', sa.String(), nullable=True),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.Column('is_read', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['file_id'], ['files.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    _create_indexes('notifications', [
+        ('ix_notifications_created_at', ['created_at'], False),
+        ('ix_notifications_created_at_id', ['created_at', 'id'], False),
+        ('ix_notifications_file_id', ['file_id'], False),
+        ('ix_notifications_id', ['id'], False),
+    ])
+
+    _create_table(existing, 'quote_notifications',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('quote_id', sa.Integer(), nullable=False),
+        sa.Column('file_id', sa.Integer(), nullable=False),
+        sa.Column('sent_by', sa.String(), nullable=False),
+        sa.Column('sent_to', sa.String(), nullable=False),
+        sa.Column('part_name', sa.String(), nullable=False),
+        sa.Column('is_read', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['file_id'], ['files.id'], ),
+        sa.ForeignKeyConstraint(['quote_id'], ['quotes.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    _create_indexes('quote_notifications', [
+        ('ix_quote_notifications_created_at', ['created_at'], False),
+        ('ix_quote_notifications_file_id', ['file_id'], False),
+        ('ix_quote_notifications_id', ['id'], False),
+        ('ix_quote_notifications_quote_id', ['quote_id'], False),
+        ('ix_quote_notifications_sent_to_created_at_id', ['sent_to', 'created_at', 'id'], False),
+    ])
+
+
+def downgrade() -> None:
+    op.drop_table('quote_notifications')
+    op.drop_table('notifications')
+    op.drop_table('users')
+    op.drop_table('quotes')
+    op.drop_table('material_prices')
+    op.drop_table('files')
+    op.drop_table('counters')
@@ -0,0 +1,106 @@
+"""file search indexes
+
+Full-text search structures used by app.services.search_service; see its docstring. The index
+expressions must stay identical to PG_DOCUMENT and PG_VECTOR there for the planner to use them.
+
+PostgreSQL indexes are built CONCURRENTLY so uploads are not blocked while files is indexed.
+The SQLite FTS5 table needs the trigram tokenizer of SQLite 3.34; on older versions it is
+skipped and search falls back to LIKE.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 07:52:10.412337
+"""
+import logging
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+MIN_TRIGRAM_SQLITE = (3, 34, 0)
+
+PG_VECTOR = (
+    "setweight(to_tsvector('simple'::regconfig, coalesce(original_name, '')), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, coalesce(part_number, '')), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, coalesce(material, '')), 'B') || "
+    "setweight(to_tsvector('simple'::regconfig, coalesce(description, '')), 'C')"
+)
+PG_DOCUMENT = (
+    "(coalesce(original_name, '') || ' ' || coalesce(part_number, '') || ' ' || "
+    "coalesce(material, '') || ' ' || coalesce(description, ''))"
+)
+PG_INDEXES = {
+    'ix_files_search_vector': f"ON files USING gin (({PG_VECTOR}))",
+    'ix_files_search_trgm': f"ON files USING gin ({PG_DOCUMENT} gin_trgm_ops)",
+}
+
+FTS_COLUMNS = "original_name, part_number, material, description"
+NEW_VALUES = "new.original_name, new.part_number, new.material, new.description"
+OLD_VALUES = "old.original_name, old.part_number, old.material, old.description"
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS files_fts USING fts5("
+    f"{FTS_COLUMNS}, content='files', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS files_fts_ai AFTER INSERT ON files BEGIN "
+    f"INSERT INTO files_fts(rowid, {FTS_COLUMNS}) VALUES (new.id, {NEW_VALUES}); END",
+    "CREATE TRIGGER IF NOT EXISTS files_fts_ad AFTER DELETE ON files BEGIN "
+    f"INSERT INTO files_fts(files_fts, rowid, {FTS_COLUMNS}) VALUES ('delete', old.id, {OLD_VALUES}); END",
+    f"CREATE TRIGGER IF NOT EXISTS files_fts_au AFTER UPDATE OF {FTS_COLUMNS} ON files BEGIN "
+    f"INSERT INTO files_fts(files_fts, rowid, {FTS_COLUMNS}) VALUES ('delete', old.id, {OLD_VALUES}); "
+    f"INSERT INTO files_fts(rowid, {FTS_COLUMNS}) VALUES (new.id, {NEW_VALUES}); END",
+    # Index the files that already exist
+    "INSERT INTO files_fts(files_fts) VALUES ('rebuild')",
+]
+
+
+def _drop_invalid_index(name):
+    """A failed CONCURRENTLY build leaves an invalid index that IF NOT EXISTS would keep"""
+    if context.is_offline_mode():
+        return
+    invalid = op.get_bind().execute(sa.text(
+        "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = :name AND NOT i.indisvalid"
+    ), {"name": name}).first()
+    if invalid:
+        op.execute(f"DROP INDEX CONCURRENTLY {name}")
+
+
+def _sqlite_has_trigram():
+    if context.is_offline_mode():
+        return True
+    version = op.get_bind().execute(sa.text("SELECT sqlite_version()")).scalar()
+    if tuple(int(part) for part in version.split(".")[:3]) >= MIN_TRIGRAM_SQLITE:
+        return True
+    logger.warning(f"SQLite {version} has no trigram tokenizer; skipping files_fts, search will use LIKE")
+    return False
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        with op.get_context().autocommit_block():
+            for name, definition in PG_INDEXES.items():
+                _drop_invalid_index(name)
+                op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} {definition}")
+    elif dialect == 'sqlite' and _sqlite_has_trigram():
+        for statement in SQLITE_DDL:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        with op.get_context().autocommit_block():
+            for name in PG_INDEXES:
+                op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+    elif dialect == 'sqlite':
+        for trigger in ('files_fts_ai', 'files_fts_ad', 'files_fts_au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS files_fts")
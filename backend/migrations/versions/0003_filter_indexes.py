@@ -0,0 +1,62 @@
+"""filter indexes
+
+Indexes for the hot filters: quotes by manufacturer and status, quotes by notification,
+unread quote notifications per buyer and unread manufacturer notifications. Quotes by file and
+files by uploader are already served by the (file_id | created_by, created_at, id) indexes.
+
+On PostgreSQL they are built CONCURRENTLY, outside the migration transaction, so reads and
+writes continue while they build.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 07:37:16.821240
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_quotes_created_by_status_created_at_id', 'quotes', ['created_by', 'status', 'created_at', 'id']),
+    ('ix_quotes_notification_id', 'quotes', ['notification_id']),
+    ('ix_quote_notifications_sent_to_is_read', 'quote_notifications', ['sent_to', 'is_read']),
+    ('ix_notifications_is_read', 'notifications', ['is_read']),
+]
+
+
+def _drop_invalid_index(name):
+    """A failed CONCURRENTLY build leaves an invalid index that IF NOT EXISTS would keep"""
+    if context.is_offline_mode():
+        return
+    invalid = op.get_bind().execute(sa.text(
+        "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = :name AND NOT i.indisvalid"
+    ), {"name": name}).first()
+    if invalid:
+        op.execute(f"DROP INDEX CONCURRENTLY {name}")
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for name, table, columns in INDEXES:
+                _drop_invalid_index(name)
+                op.create_index(name, table, columns, if_not_exists=True, postgresql_concurrently=True)
+    else:
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for name, table, _ in INDEXES:
+                op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
+    else:
+        for name, table, _ in INDEXES:
+            op.drop_index(name, table_name=table, if_exists=True)
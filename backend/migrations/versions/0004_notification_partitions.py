@@ -0,0 +1,245 @@
+"""notification partitions and archive
+
+Archive tables for read notifications moved out by app.services.retention_service.
+
+On PostgreSQL, notifications and quote_notifications become tables range partitioned by month
+on created_at, with a default partition for rows outside the created months. A partitioned
+table's primary key must include the partition key, so it becomes (id, created_at); ids still
+come from the original sequence and stay unique. The retention job creates partitions for later
+months.
+
+Each table is rebuilt without blocking writes for the copy: an empty shadow table gets the new
+layout, keys and indexes (instant while it is empty), a trigger mirrors writes on the table
+into it, and the rows are copied over in id batches of BATCH_SIZE, each its own transaction.
+Only the final swap takes an exclusive lock, for as long as renames take. If the swap cannot
+get the lock within LOCK_TIMEOUT the upgrade fails and can be run again.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 09:12:44.305187
+"""
+from datetime import datetime, timedelta
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+MONTHS_AHEAD = 3
+BATCH_SIZE = 10000
+LOCK_TIMEOUT = '5s'
+
+TABLES = {
+    'notifications': {
+        'columns': [
+            'id', 'file_id', 'object_key', 'part_name', 'material', 'part_number', 'quantity_unit',
+            'description', 'is_read', 'created_at', 'updated_at',
+        ],
+        'foreign_keys': [('file_id', 'files')],
+        'indexes': [
+            ('ix_notifications_created_at', ['created_at']),
+            ('ix_notifications_created_at_id', ['created_at', 'id']),
+            ('ix_notifications_file_id', ['file_id']),
+            ('ix_notifications_id', ['id']),
+            ('ix_notifications_is_read', ['is_read']),
+        ],
+    },
+    'quote_notifications': {
+        'columns': [
+            'id', 'quote_id', 'file_id', 'sent_by', 'sent_to', 'part_name', 'is_read', 'created_at', 'updated_at',
+        ],
+        'foreign_keys': [('quote_id', 'quotes'), ('file_id', 'files')],
+        'indexes': [
+            ('ix_quote_notifications_created_at', ['created_at']),
+            ('ix_quote_notifications_file_id', ['file_id']),
+            ('ix_quote_notifications_id', ['id']),
+            ('ix_quote_notifications_quote_id', ['quote_id']),
+            ('ix_quote_notifications_sent_to_created_at_id', ['sent_to', 'created_at', 'id']),
+            ('ix_quote_notifications_sent_to_is_read', ['sent_to', 'is_read']),
+        ],
+    },
+}
+
+
+def _next_month(month):
+    return (month + timedelta(days=32)).replace(day=1)
+
+
+def _first_month(table):
+    """Month of the oldest row, so every existing row lands in a monthly partition"""
+    month = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    if context.is_offline_mode():
+        return month
+    oldest = op.get_bind().execute(sa.text(f"SELECT min(created_at) FROM {table}")).scalar()
+    if oldest is not None:
+        month = min(month, oldest.replace(day=1, hour=0, minute=0, second=0, microsecond=0))
+    return month
+
+
+def _serial_sequence(table):
+    if context.is_offline_mode():
+        return f"{table}_id_seq"
+    return op.get_bind().execute(sa.text(f"SELECT pg_get_serial_sequence('{table}', 'id')")).scalar()
+
+
+def _create_partitions(table, parent, month):
+    """Monthly partitions of parent named after table, which parent replaces once filled"""
+    last = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    for _ in range(MONTHS_AHEAD):
+        last = _next_month(last)
+    while month <= last:
+        op.execute(
+            f"CREATE TABLE {table}_p{month:%Y_%m} PARTITION OF {parent} "
+            f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{_next_month(month):%Y-%m-%d}')"
+        )
+        month = _next_month(month)
+    op.execute(f"CREATE TABLE {table}_default PARTITION OF {parent} DEFAULT")
+
+
+def _create_shadow(table, shadow, partitioned):
+    """Empty copy of table in the new layout, with a trigger on table mirroring writes into it"""
+    spec = TABLES[table]
+    columns = spec['columns']
+    key_columns = ["id", "created_at"] if partitioned else ["id"]
+    primary_key = ", ".join(key_columns)
+    # Leftovers of an earlier run that failed before the swap
+    op.execute(f"DROP TRIGGER IF EXISTS {table}_sync ON {table}")
+    op.execute(f"DROP FUNCTION IF EXISTS {table}_sync()")
+    op.execute(f"DROP TABLE IF EXISTS {shadow}")
+
+    partition_clause = " PARTITION BY RANGE (created_at)" if partitioned else ""
+    op.execute(f"CREATE TABLE {shadow} (LIKE {table} INCLUDING DEFAULTS){partition_clause}")
+    if partitioned:
+        _create_partitions(table, shadow, _first_month(table))
+    op.execute(f"ALTER TABLE {shadow} ADD CONSTRAINT {shadow}_pkey PRIMARY KEY ({primary_key})")
+    for column, target in spec['foreign_keys']:
+        op.create_foreign_key(f"{shadow}_{column}_fkey", shadow, target, [column], ['id'])
+    for name, index_columns in spec['indexes']:
+        op.create_index(f"{name}_new", shadow, index_columns)
+
+    column_list = ", ".join(columns)
+    # A row the batch copy wrote before an update reached the trigger is overwritten, not duplicated
+    upsert = (
+        f"INSERT INTO {shadow} ({column_list}) VALUES ({', '.join(f'NEW.{c}' for c in columns)}) "
+        f"ON CONFLICT ({primary_key}) DO UPDATE SET "
+        f"{', '.join(f'{c} = EXCLUDED.{c}' for c in columns if c not in key_columns)}"
+    )
+    op.execute(
+        f"CREATE FUNCTION {table}_sync() RETURNS trigger LANGUAGE plpgsql AS $$\n"
+        f"BEGIN\n"
+        f"    IF TG_OP <> 'INSERT' THEN DELETE FROM {shadow} WHERE id = OLD.id; END IF;\n"
+        f"    IF TG_OP <> 'DELETE' THEN {upsert}; END IF;\n"
+        f"    RETURN NULL;\n"
+        f"END $$"
+    )
+    op.execute(
+        f"CREATE TRIGGER {table}_sync AFTER INSERT OR UPDATE OR DELETE ON {table} "
+        f"FOR EACH ROW EXECUTE FUNCTION {table}_sync()"
+    )
+
+
+def _copy_rows(table, shadow):
+    """
+    Copy table's rows into shadow in id batches, one transaction each. FOR SHARE makes a
+    concurrent update or delete wait for the batch, so its trigger then sees the copied row.
+    """
+    column_list = ", ".join(TABLES[table]['columns'])
+    copy = (
+        f"WITH batch AS (SELECT {column_list} FROM {table} WHERE id > :last ORDER BY id LIMIT :size FOR SHARE), "
+        f"copied AS (INSERT INTO {shadow} ({column_list}) SELECT {column_list} FROM batch ON CONFLICT DO NOTHING) "
+        f"SELECT max(id) FROM batch"
+    )
+    if context.is_offline_mode():
+        op.execute(f"INSERT INTO {shadow} ({column_list}) SELECT {column_list} FROM {table} ON CONFLICT DO NOTHING")
+        return
+    bind = op.get_bind()
+    last = 0
+    while True:
+        last = bind.execute(sa.text(copy), {"last": last, "size": BATCH_SIZE}).scalar()
+        if last is None:
+            return
+
+
+def _swap(table, shadow, sequence):
+    """Replace table by its filled shadow under a short exclusive lock"""
+    spec = TABLES[table]
+    op.execute(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'")
+    op.execute(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE")
+    op.execute(f"DROP TRIGGER {table}_sync ON {table}")
+    op.execute(f"DROP FUNCTION {table}_sync()")
+    # Keep the id sequence alive while the table that owns it is dropped
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY NONE")
+    op.execute(f"DROP TABLE {table}")
+    op.execute(f"ALTER TABLE {shadow} RENAME TO {table}")
+    op.execute(f"ALTER TABLE {table} RENAME CONSTRAINT {shadow}_pkey TO {table}_pkey")
+    for column, _ in spec['foreign_keys']:
+        op.execute(f"ALTER TABLE {table} RENAME CONSTRAINT {shadow}_{column}_fkey TO {table}_{column}_fkey")
+    for name, _ in spec['indexes']:
+        op.execute(f"ALTER INDEX {name}_new RENAME TO {name}")
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id")
+
+
+def _rebuild(table, partitioned):
+    """Recreate table, partitioned by month or plain, with its rows, keys and indexes"""
+    shadow = f"{table}_new"
+    sequence = _serial_sequence(table)
+    _create_shadow(table, shadow, partitioned)
+    # Commits the shadow and trigger first, so writers mirror into it while the rows are copied
+    with op.get_context().autocommit_block():
+        _copy_rows(table, shadow)
+    _swap(table, shadow, sequence)
+
+
+def upgrade() -> None:
+    op.create_table('notifications_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('file_id', sa.Integer(), nullable=False),
+        sa.Column('object_key', sa.String(), nullable=False),
+        sa.Column('part_name', sa.String(), nullable=False),
+        sa.Column('material', sa.String(), nullable=True),
+        sa.Column('part_number', sa.String(), nullable=True),
+        sa.Column('quantity_unit', sa.String(), nullable=True),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.Column('is_read', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_notifications_archive_created_at', 'notifications_archive', ['created_at'])
+    op.create_index('ix_notifications_archive_file_id', 'notifications_archive', ['file_id'])
+
+    op.create_table('quote_notifications_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('quote_id', sa.Integer(), nullable=False),
+        sa.Column('file_id', sa.Integer(), nullable=False),
+        sa.Column('sent_by', sa.String(), nullable=False),
+        sa.Column('sent_to', sa.String(), nullable=False),
+        sa.Column('part_name', sa.String(), nullable=False),
+        sa.Column('is_read', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_quote_notifications_archive_quote_id', 'quote_notifications_archive', ['quote_id'])
+    op.create_index(
+        'ix_quote_notifications_archive_sent_to_created_at', 'quote_notifications_archive', ['sent_to', 'created_at']
+    )
+
+    if op.get_bind().dialect.name == 'postgresql':
+        for table in TABLES:
+            _rebuild(table, partitioned=True)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        for table in TABLES:
+            _rebuild(table, partitioned=False)
+    op.drop_table('quote_notifications_archive')
+    op.drop_table('notifications_archive')
@@ -0,0 +1,36 @@
+"""notification change log
+
+notification_changes, read by GET /notifications/changes; see app.services.change_service.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 10:02:31.118420
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('notification_changes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('sequence', sa.BigInteger(), nullable=False),
+        sa.Column('kind', sa.String(length=32), nullable=False),
+        sa.Column('owner', sa.String(length=255), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('operation', sa.String(length=16), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_notification_changes_created_at', 'notification_changes', ['created_at'])
+    op.create_index('ix_notification_changes_owner_sequence', 'notification_changes', ['owner', 'sequence'])
+    op.create_index('ix_notification_changes_sequence', 'notification_changes', ['sequence'])
+
+
+def downgrade() -> None:
+    op.drop_table('notification_changes')
@@ -0,0 +1,59 @@
+"""list version indexes
+
+Indexes that let the list ETags (app.etag) read the newest updated_at of a manufacturer's quotes
+and of all files from the end of an index. A buyer's quotes are reached through
+ix_files_created_by_created_at_id and ix_quotes_file_id_created_at_id.
+
+On PostgreSQL they are built CONCURRENTLY, like those of 0003.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 11:24:08.530194
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_quotes_created_by_updated_at', 'quotes', ['created_by', 'updated_at']),
+    ('ix_files_updated_at', 'files', ['updated_at']),
+]
+
+
+def _drop_invalid_index(name):
+    """A failed CONCURRENTLY build leaves an invalid index that IF NOT EXISTS would keep"""
+    if context.is_offline_mode():
+        return
+    invalid = op.get_bind().execute(sa.text(
+        "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = :name AND NOT i.indisvalid"
+    ), {"name": name}).first()
+    if invalid:
+        op.execute(f"DROP INDEX CONCURRENTLY {name}")
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for name, table, columns in INDEXES:
+                _drop_invalid_index(name)
+                op.create_index(name, table, columns, if_not_exists=True, postgresql_concurrently=True)
+    else:
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for name, table, _ in INDEXES:
+                op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
+    else:
+        for name, table, _ in INDEXES:
+            op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,36 @@
+"""outbox
+
+Messages drained by the outbox dispatcher; see app.services.outbox_service.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 12:41:52.907316
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('outbox',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('topic', sa.String(length=64), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('available_at', sa.DateTime(), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('failed_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_outbox_failed_at_available_at_id', 'outbox', ['failed_at', 'available_at', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_outbox_failed_at_available_at_id', table_name='outbox')
+    op.drop_table('outbox')
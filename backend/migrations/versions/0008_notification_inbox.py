@@ -0,0 +1,76 @@
+"""notification inbox
+
+Per-recipient read state for manufacturer notifications (notification_inbox), replacing the
+shared notifications.is_read flag. Every active manufacturer gets an entry for every existing
+notification, read if the notification was read. The notifications counters become per
+recipient and are recomputed from the entries; change-log rows kept for all manufacturers are
+dropped, since clients now follow their own entries.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 14:05:37.662091
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def _recount(owner, source, unread, group_by=''):
+    op.execute("DELETE FROM counters WHERE scope = 'notifications'")
+    for metric, condition in (('total', ''), ('unread', f'WHERE {unread}')):
+        op.execute(
+            f"INSERT INTO counters (scope, owner, metric, value, updated_at) "
+            f"SELECT 'notifications', {owner}, '{metric}', count(*), CURRENT_TIMESTAMP "
+            f"FROM {source} {condition} {group_by}"
+        )
+
+
+def upgrade() -> None:
+    op.create_table('notification_inbox',
+        sa.Column('recipient', sa.String(length=255), nullable=False),
+        sa.Column('notification_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('read_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('recipient', 'notification_id'),
+    )
+    op.execute(
+        "INSERT INTO notification_inbox (recipient, notification_id, created_at, read_at) "
+        "SELECT users.username, notifications.id, notifications.created_at, "
+        "CASE WHEN notifications.is_read THEN coalesce(notifications.updated_at, notifications.created_at) END "
+        "FROM notifications CROSS JOIN users WHERE users.role = 'manufacturer' AND users.is_active"
+    )
+    # After the backfill, so the rows are not inserted one index at a time
+    op.create_index(
+        'ix_notification_inbox_recipient_created_at', 'notification_inbox',
+        ['recipient', 'created_at', 'notification_id'],
+    )
+    op.create_index(
+        'ix_notification_inbox_recipient_read_at', 'notification_inbox',
+        ['recipient', 'read_at', 'created_at', 'notification_id'],
+    )
+    op.create_index('ix_notification_inbox_notification_id', 'notification_inbox', ['notification_id'])
+
+    _recount('recipient', 'notification_inbox', 'read_at IS NULL', 'GROUP BY recipient')
+    op.execute("DELETE FROM notification_changes WHERE kind = 'notification' AND owner = '*'")
+
+    op.drop_index('ix_notifications_is_read', table_name='notifications')
+    op.drop_column('notifications', 'is_read')
+    op.drop_column('notifications_archive', 'is_read')
+
+
+def downgrade() -> None:
+    op.add_column('notifications_archive', sa.Column('is_read', sa.Boolean(), server_default=sa.true(), nullable=False))
+    op.add_column('notifications', sa.Column('is_read', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.execute(
+        "UPDATE notifications SET is_read = NOT EXISTS ("
+        "SELECT 1 FROM notification_inbox WHERE notification_inbox.notification_id = notifications.id "
+        "AND notification_inbox.read_at IS NULL)"
+    )
+    op.create_index('ix_notifications_is_read', 'notifications', ['is_read'])
+    _recount("'*'", 'notifications', 'NOT is_read')
+    op.drop_table('notification_inbox')
@@ -0,0 +1,106 @@
+"""notification digests
+
+A notification becomes a digest of a buyer's uploads: created_by names the buyer, child_count
+the uploads merged into it, and files.notification_id links each upload to the notification
+announcing it. Existing notifications are digests of their one file.
+
+On PostgreSQL the indexes are built CONCURRENTLY, like those of 0003. notifications is
+partitioned there (0004), which CONCURRENTLY does not support, so its index is created ON ONLY
+the parent, built concurrently on each partition and attached to it.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 15:32:18.204617
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_notifications_created_by_created_at', 'notifications', ['created_by', 'created_at']),
+    ('ix_files_notification_id_created_at_id', 'files', ['notification_id', 'created_at', 'id']),
+]
+
+
+def _drop_invalid_index(name):
+    """A failed CONCURRENTLY build leaves an invalid index that IF NOT EXISTS would keep"""
+    if context.is_offline_mode():
+        return
+    invalid = op.get_bind().execute(sa.text(
+        "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = :name AND NOT i.indisvalid"
+    ), {"name": name}).first()
+    if invalid:
+        op.execute(f"DROP INDEX CONCURRENTLY {name}")
+
+
+def _partitions(table):
+    if context.is_offline_mode():
+        return []
+    return op.get_bind().execute(sa.text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = CAST(:table AS regclass) ORDER BY c.relname"
+    ), {"table": table}).scalars().all()
+
+
+def _create_index_concurrently(name, table, columns):
+    """
+    An index on a partitioned table starts invalid ON ONLY the parent and becomes valid once
+    an index built concurrently on every partition is attached to it
+    """
+    partitions = _partitions(table)
+    if not partitions:
+        _drop_invalid_index(name)
+        op.create_index(name, table, columns, if_not_exists=True, postgresql_concurrently=True)
+        return
+    op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON ONLY {table} ({', '.join(columns)})")
+    for partition in partitions:
+        partition_index = f"{name}_{partition[len(table) + 1:]}"
+        _drop_invalid_index(partition_index)
+        op.create_index(partition_index, partition, columns, if_not_exists=True, postgresql_concurrently=True)
+        op.execute(f"ALTER INDEX {name} ATTACH PARTITION {partition_index}")
+
+
+def upgrade() -> None:
+    for table in ('notifications', 'notifications_archive'):
+        op.add_column(table, sa.Column('created_by', sa.String(length=255), nullable=True))
+        op.add_column(table, sa.Column('child_count', sa.Integer(), server_default='1', nullable=False))
+        op.execute(
+            f"UPDATE {table} SET created_by = "
+            f"(SELECT files.created_by FROM files WHERE files.id = {table}.file_id)"
+        )
+    op.add_column('files', sa.Column('notification_id', sa.Integer(), nullable=True))
+    op.execute(
+        "UPDATE files SET notification_id = "
+        "(SELECT max(notifications.id) FROM notifications WHERE notifications.file_id = files.id)"
+    )
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for name, table, columns in INDEXES:
+                _create_index_concurrently(name, table, columns)
+    else:
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for name, table, _ in INDEXES:
+                # Dropping the parent's index drops its partitions'; CONCURRENTLY cannot do that
+                op.drop_index(
+                    name, table_name=table, if_exists=True, postgresql_concurrently=not _partitions(table)
+                )
+    else:
+        for name, table, _ in INDEXES:
+            op.drop_index(name, table_name=table)
+    op.drop_column('files', 'notification_id')
+    for table in ('notifications_archive', 'notifications'):
+        op.drop_column(table, 'child_count')
+        op.drop_column(table, 'created_by')
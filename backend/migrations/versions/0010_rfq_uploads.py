@@ -0,0 +1,54 @@
+"""rfq uploads
+
+files.rfq_id groups the files uploaded together by POST /files/upload/batch; notifications
+carry it so each RFQ gets its own digest.
+
+On PostgreSQL ix_files_rfq_id is built CONCURRENTLY, like the indexes of 0003.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19 16:48:09.551376
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+
+def _drop_invalid_index(name):
+    """A failed CONCURRENTLY build leaves an invalid index that IF NOT EXISTS would keep"""
+    if context.is_offline_mode():
+        return
+    invalid = op.get_bind().execute(sa.text(
+        "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = :name AND NOT i.indisvalid"
+    ), {"name": name}).first()
+    if invalid:
+        op.execute(f"DROP INDEX CONCURRENTLY {name}")
+
+
+def upgrade() -> None:
+    op.add_column('files', sa.Column('rfq_id', sa.String(length=32), nullable=True))
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            _drop_invalid_index('ix_files_rfq_id')
+            op.create_index('ix_files_rfq_id', 'files', ['rfq_id'], if_not_exists=True, postgresql_concurrently=True)
+    else:
+        op.create_index('ix_files_rfq_id', 'files', ['rfq_id'])
+    op.add_column('notifications', sa.Column('rfq_id', sa.String(length=32), nullable=True))
+    op.add_column('notifications_archive', sa.Column('rfq_id', sa.String(length=32), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('notifications_archive', 'rfq_id')
+    op.drop_column('notifications', 'rfq_id')
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.drop_index('ix_files_rfq_id', table_name='files', if_exists=True, postgresql_concurrently=True)
+    else:
+        op.drop_index('ix_files_rfq_id', table_name='files')
+    op.drop_column('files', 'rfq_id')
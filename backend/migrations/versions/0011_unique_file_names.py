@@ -0,0 +1,87 @@
+"""unique file names
+
+Uploads check for an existing file of the same name before storing theirs; a unique index on
+files.original_name stops two concurrent uploads of one name from both being registered.
+
+That check could race before, so the names may already repeat: every file but the oldest of a
+name is renamed to <name>_<id><extension> first, and each rename is logged. On PostgreSQL the
+unique index is then built CONCURRENTLY under a new name and swapped in for the plain
+ix_files_original_name, so uploads continue while it builds. An upload repeating a name during
+the build makes it fail; run the upgrade again, which renames the new duplicate.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-19 18:05:41.730264
+"""
+import logging
+import os
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+INDEX = 'ix_files_original_name'
+UNIQUE_INDEX = 'ix_files_original_name_unique'
+
+
+def _rename_duplicates():
+    if context.is_offline_mode():
+        return
+    bind = op.get_bind()
+    duplicates = bind.execute(sa.text(
+        "SELECT id, original_name FROM files f WHERE EXISTS ("
+        "SELECT 1 FROM files older WHERE older.original_name = f.original_name AND older.id < f.id"
+        ") ORDER BY id"
+    )).all()
+    for file_id, name in duplicates:
+        stem, extension = os.path.splitext(name)
+        renamed = f"{stem}_{file_id}{extension}"
+        bind.execute(
+            sa.text("UPDATE files SET original_name = :renamed WHERE id = :id"), {"renamed": renamed, "id": file_id}
+        )
+        logger.warning(f"Renamed duplicate file {file_id} from '{name}' to '{renamed}'")
+
+
+def _drop_invalid_index(name):
+    """A failed CONCURRENTLY build leaves an invalid index that IF NOT EXISTS would keep"""
+    if context.is_offline_mode():
+        return
+    invalid = op.get_bind().execute(sa.text(
+        "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = :name AND NOT i.indisvalid"
+    ), {"name": name}).first()
+    if invalid:
+        op.execute(f"DROP INDEX CONCURRENTLY {name}")
+
+
+def upgrade() -> None:
+    _rename_duplicates()
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            _drop_invalid_index(UNIQUE_INDEX)
+            op.create_index(
+                UNIQUE_INDEX, 'files', ['original_name'], unique=True, if_not_exists=True, postgresql_concurrently=True
+            )
+            op.drop_index(INDEX, table_name='files', if_exists=True, postgresql_concurrently=True)
+            op.execute(f"ALTER INDEX {UNIQUE_INDEX} RENAME TO {INDEX}")
+    else:
+        op.drop_index(INDEX, table_name='files')
+        op.create_index(INDEX, 'files', ['original_name'], unique=True)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.create_index(UNIQUE_INDEX, 'files', ['original_name'], if_not_exists=True, postgresql_concurrently=True)
+            op.drop_index(INDEX, table_name='files', if_exists=True, postgresql_concurrently=True)
+            op.execute(f"ALTER INDEX {UNIQUE_INDEX} RENAME TO {INDEX}")
+    else:
+        op.drop_index(INDEX, table_name='files')
+        op.create_index(INDEX, 'files', ['original_name'])
@@ -0,0 +1,45 @@
+"""notification change sequence
+
+On PostgreSQL, change-log sequence values come from the notification_change_sequence sequence
+instead of the changes/sequence counter row, which every committing writer had to lock. The
+sequence continues from the counter, and the counter row is dropped; SQLite keeps using it.
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-19 20:12:09.518364
+"""
+from alembic import op
+
+
+revision = '0012'
+down_revision = '0011'
+branch_labels = None
+depends_on = None
+
+SEQUENCE = 'notification_change_sequence'
+COUNTER = "scope = 'changes' AND owner = '*' AND metric = 'sequence'"
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute(f"CREATE SEQUENCE {SEQUENCE}")
+    # Continue after the highest value handed out; setval cannot go below 1, so an unused
+    # sequence is set to 1 with is_called false
+    op.execute(
+        f"SELECT setval('{SEQUENCE}', GREATEST(v, 1), v > 0) FROM (SELECT GREATEST("
+        f"COALESCE((SELECT value FROM counters WHERE {COUNTER}), 0), "
+        f"COALESCE((SELECT max(sequence) FROM notification_changes), 0)) AS v) head"
+    )
+    op.execute(f"DELETE FROM counters WHERE {COUNTER}")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute(
+        f"INSERT INTO counters (scope, owner, metric, value, updated_at) "
+        f"SELECT 'changes', '*', 'sequence', CASE WHEN is_called THEN last_value ELSE 0 END, CURRENT_TIMESTAMP "
+        f"FROM {SEQUENCE}"
+    )
+    op.execute(f"DROP SEQUENCE {SEQUENCE}")
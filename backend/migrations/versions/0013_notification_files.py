@@ -0,0 +1,39 @@
+"""notification files
+
+notification_files lists the files of notices that are not upload digests, such as one notice
+for a batch of rejected quotes, so deleting one of the files moves the notice on to another
+instead of deleting it. Existing notices that no file links to list their own file.
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-19 21:03:44.190825
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0013'
+down_revision = '0012'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('notification_files',
+        sa.Column('notification_id', sa.Integer(), nullable=False),
+        sa.Column('file_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['file_id'], ['files.id'], ),
+        sa.PrimaryKeyConstraint('notification_id', 'file_id'),
+    )
+    op.create_index('ix_notification_files_file_id', 'notification_files', ['file_id'])
+    op.execute(
+        "INSERT INTO notification_files (notification_id, file_id) "
+        "SELECT n.id, n.file_id FROM notifications n "
+        "WHERE NOT EXISTS (SELECT 1 FROM files f WHERE f.notification_id = n.id) "
+        "AND EXISTS (SELECT 1 FROM files f WHERE f.id = n.file_id)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_notification_files_file_id', table_name='notification_files')
+    op.drop_table('notification_files')
@@ -9,6 +9,7 @@ import CostManagement from './pages/manufacturer/CostManagement';
 import CadViewerPage from './pages/manufacturer/CadViewerPage';
 import NotificationCenter from './components/NotificationCenter';
 import { fileService } from './api/fileService';
+import { subscribeEvents } from './api/eventStream';
 
 function ManufacturerApp({ onLogout }) {
   // Always default to Dashboard on first load (ignore localStorage)
@@ -53,8 +54,11 @@ function ManufacturerApp({ onLogout }) {
     };
 
     checkNotifications();
-    const interval = setInterval(checkNotifications, 60000);
-    return () => clearInterval(interval);
+    return subscribeEvents((type) => {
+      if (type === 'notification.created' || type === 'ready' || type === 'resync') {
+        checkNotifications();
+      }
+    });
   }, []);
 
   const renderContent = () => {
@@ -0,0 +1,89 @@
+import { API_BASE_URL } from './fileService';
+
+// One shared connection to GET /events/stream per page, read with fetch so the auth header can
+// be sent (EventSource cannot). Handlers get (type, data); "ready" arrives on every (re)connect
+// and "resync" after the server dropped events, both meaning "reload what you show".
+// "unauthorized" means the token was rejected; the stream resumes once a new token is stored.
+const handlers = new Set();
+let controller = null;
+let retryMs = 5000;
+
+function dispatch(type, data) {
+  handlers.forEach((handler) => {
+    try {
+      handler(type, data);
+    } catch (err) {
+      console.error('Event handler failed:', err);
+    }
+  });
+}
+
+function handleBlock(block) {
+  let type = 'message';
+  let data = '';
+  block.split('\n').forEach((line) => {
+    if (line.startsWith('event:')) type = line.slice(6).trim();
+    else if (line.startsWith('data:')) data += line.slice(5).trim();
+    else if (line.startsWith('retry:')) retryMs = Number(line.slice(6)) || retryMs;
+  });
+  if (!data) return;
+  try {
+    dispatch(type, JSON.parse(data));
+  } catch {
+    dispatch(type, data);
+  }
+}
+
+async function connect() {
+  const current = new AbortController();
+  controller = current;
+  let rejectedToken;
+  while (!current.signal.aborted) {
+    try {
+      const token = localStorage.getItem('auth_token');
+      if (rejectedToken !== undefined && token === rejectedToken) {
+        // Still the token the server turned away: wait for login to store a fresh one
+        await new Promise((resolve) => setTimeout(resolve, retryMs));
+        continue;
+      }
+      rejectedToken = undefined;
+      const response = await fetch(`${API_BASE_URL}/events/stream`, {
+        headers: token ? { Authorization: `Bearer ${token}` } : {},
+        signal: current.signal,
+      });
+      if (response.status === 401) {
+        rejectedToken = token;
+        dispatch('unauthorized', {});
+        continue;
+      }
+      if (!response.ok) throw new Error(`Event stream returned ${response.status}`);
+
+      const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+      let buffer = '';
+      for (;;) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += value;
+        const blocks = buffer.split('\n\n');
+        buffer = blocks.pop();
+        blocks.forEach(handleBlock);
+      }
+    } catch (err) {
+      if (current.signal.aborted) return;
+      console.error('Event stream disconnected:', err);
+    }
+    await new Promise((resolve) => setTimeout(resolve, retryMs));
+  }
+}
+
+export function subscribeEvents(handler) {
+  handlers.add(handler);
+  if (!controller) connect();
+  return () => {
+    handlers.delete(handler);
+    if (handlers.size === 0 && controller) {
+      controller.abort();
+      controller = null;
+    }
+  };
+}
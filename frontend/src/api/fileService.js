@@ -1,6 +1,6 @@
 import axios from 'axios';
 
-const API_BASE_URL = 'http://127.0.0.1:8000';
+export const API_BASE_URL = 'http://127.0.0.1:8000';
 
 const api = axios.create({
   baseURL: API_BASE_URL,
@@ -50,8 +50,9 @@ export const fileService = {
   },
 
   // Get list of files
-  listFiles: async (limit = 50, offset = 0) => {
-    const params = { limit, offset };
+  listFiles: async (limit = 50, cursor = null) => {
+    const params = { limit };
+    if (cursor) params.cursor = cursor;
     const response = await api.get('/files/list', { params });
     return response.data;
   },
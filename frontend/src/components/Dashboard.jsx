@@ -11,7 +11,7 @@ export default function Dashboard({ onBrowseAll }) {
     const load = async () => {
       setLoading(true);
       try {
-        const response = await fileService.listFiles(50, 0);
+        const response = await fileService.listFiles(50);
         setFiles(response.files || []);
       } catch {
         setFiles([]);
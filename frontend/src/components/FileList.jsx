@@ -10,8 +10,12 @@ export default function FileList({ refreshTrigger }) {
   const [activeSearch, setActiveSearch] = useState('');
   const [sortOrder, setSortOrder] = useState('newest');
   const [showFilters, setShowFilters] = useState(false);
-  const [pagination, setPagination] = useState({ limit: 20, offset: 0 });
+  // cursors[i] is the cursor that loads page i; the first page needs none
+  const [pagination, setPagination] = useState({ limit: 20, cursors: [null], page: 0 });
+  const [nextCursor, setNextCursor] = useState(null);
   const [total, setTotal] = useState(0);
+  const [totalIsEstimate, setTotalIsEstimate] = useState(false);
+  const cursor = pagination.cursors[pagination.page];
 
   const loadFiles = async (search = '') => {
     setLoading(true);
@@ -23,13 +27,15 @@ export default function FileList({ refreshTrigger }) {
         response = await fileService.searchFiles({
           query: search,
           limit: pagination.limit,
-          offset: pagination.offset,
+          cursor,
         });
       } else {
-        response = await fileService.listFiles(pagination.limit, pagination.offset);
+        response = await fileService.listFiles(pagination.limit, cursor);
       }
       setFiles(response.files || []);
       setTotal(response.total || 0);
+      setTotalIsEstimate(Boolean(response.total_is_estimate));
+      setNextCursor(response.next_cursor || null);
     } catch (err) {
       setError(err.message || 'Failed to load files');
     } finally {
@@ -39,11 +45,11 @@ export default function FileList({ refreshTrigger }) {
 
   useEffect(() => {
     loadFiles(activeSearch);
-  }, [refreshTrigger, pagination.offset, pagination.limit, activeSearch]);
+  }, [refreshTrigger, cursor, pagination.limit, activeSearch]);
 
   const handleSearch = (e) => {
     e.preventDefault();
-    setPagination({ ...pagination, offset: 0 });
+    setPagination({ ...pagination, cursors: [null], page: 0 });
     setActiveSearch(searchQuery);
   };
 
@@ -70,8 +76,17 @@ export default function FileList({ refreshTrigger }) {
     }
   };
 
-  const currentPage = Math.floor(pagination.offset / pagination.limit) + 1;
-  const totalPages = Math.ceil(total / pagination.limit);
+  const offset = pagination.page * pagination.limit;
+  const currentPage = pagination.page + 1;
+  const totalPages = Math.max(currentPage, Math.ceil(total / pagination.limit));
+  const goToNextPage = () => {
+    if (!nextCursor) return;
+    setPagination({
+      ...pagination,
+      cursors: [...pagination.cursors.slice(0, pagination.page + 1), nextCursor],
+      page: pagination.page + 1,
+    });
+  };
   const sortedFiles = [...files].sort((a, b) => {
     const dateA = new Date(a.created_at).getTime();
     const dateB = new Date(b.created_at).getTime();
@@ -255,26 +270,22 @@ export default function FileList({ refreshTrigger }) {
       {!loading && files.length > 0 && (
         <div className="mt-6 flex items-center justify-between">
           <p className="text-slate-600">
-            Showing {pagination.offset + 1} to {Math.min(pagination.offset + pagination.limit, total)} of {total}
+            Showing {offset + 1} to {offset + files.length} of {totalIsEstimate ? `${total}+` : total}
           </p>
           <div className="flex gap-2">
             <button
-              onClick={() => setPagination({ ...pagination, offset: Math.max(0, pagination.offset - pagination.limit) })}
-              disabled={pagination.offset === 0}
+              onClick={() => setPagination({ ...pagination, page: Math.max(0, pagination.page - 1) })}
+              disabled={pagination.page === 0}
               className="bg-slate-100 hover:bg-slate-200 disabled:opacity-50 text-slate-700 py-2 px-4 rounded transition"
             >
               Previous
             </button>
             <span className="py-2 px-4 text-slate-700">
-              Page {currentPage} of {totalPages}
+              Page {currentPage} of {totalIsEstimate ? `${totalPages}+` : totalPages}
             </span>
             <button
-              onClick={() => {
-                if (pagination.offset + pagination.limit < total) {
-                  setPagination({ ...pagination, offset: pagination.offset + pagination.limit });
-                }
-              }}
-              disabled={pagination.offset + pagination.limit >= total}
+              onClick={goToNextPage}
+              disabled={!nextCursor}
               className="bg-slate-100 hover:bg-slate-200 disabled:opacity-50 text-slate-700 py-2 px-4 rounded transition"
             >
               Next
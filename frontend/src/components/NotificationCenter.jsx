@@ -1,6 +1,7 @@
 import { useEffect, useState } from 'react';
 import { FiBell, FiX, FiCheck, FiTrash2 } from 'react-icons/fi';
 import { fileService } from '../api/fileService';
+import { subscribeEvents } from '../api/eventStream';
 
 export default function NotificationCenter({ onClose, onNotificationClick }) {
   const [notifications, setNotifications] = useState([]);
@@ -9,8 +10,12 @@ export default function NotificationCenter({ onClose, onNotificationClick }) {
 
   useEffect(() => {
     loadNotifications();
-    const interval = setInterval(loadNotifications, 30000);
-    return () => clearInterval(interval);
+    // Reload when the server pushes a new notification instead of polling
+    return subscribeEvents((type) => {
+      if (type === 'notification.created' || type === 'ready' || type === 'resync') {
+        loadNotifications();
+      }
+    });
   }, []);
 
   const loadNotifications = async () => {